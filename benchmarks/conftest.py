@@ -0,0 +1,38 @@
+"""Shared fixtures of the benchmarks, see also the fixtures shared with the tests in ../conftest.py.
+The size of the synthetic data is set on the command line, e.g.
+    python -m pytest benchmarks --images 200 --shapes 50 --vertices 32 --benchmark-json results.json"""
+import pytest
+
+try:
+    import pytest_benchmark
+except ImportError:
+    # the benchmarks timed by pytest-benchmark are skipped without it
+    collect_ignore = ["test_analytics.py", "test_database.py", "test_journal.py", "test_rendering.py"]
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("taplt benchmarks")
+    group.addoption("--images", type=int, default=50, help="number of images of the synthetic project")
+    group.addoption("--shapes", type=int, default=20, help="number of polygons per image")
+    group.addoption("--vertices", type=int, default=16, help="number of vertices per polygon")
+
+
+def pytest_benchmark_update_json(config, benchmarks, output_json):
+    """stores the size of the synthetic data with the results, so that only comparable runs are compared"""
+    output_json["synthetic_data"] = {name: config.getoption(name) for name in ("images", "shapes", "vertices")}
+
+
+@pytest.fixture(scope="session")
+def sizes(request) -> dict:
+    return {name: request.config.getoption(name) for name in ("images", "shapes", "vertices")}
+
+
+@pytest.fixture(scope="session")
+def label_dicts(sizes) -> list:
+    from taplt.utils.synthetic import label_dicts
+    return label_dicts(sizes["shapes"], sizes["vertices"])
+
+
+@pytest.fixture(scope="module")
+def project(create_project, sizes):
+    return create_project(images=sizes["images"], polygons=sizes["shapes"], vertices=sizes["vertices"])
@@ -0,0 +1,63 @@
+"""Checks and benchmarks of the geometry analytics: the measures of all shapes are computed at once,
+the IoU only for pairs of shapes whose bounding boxes overlap"""
+import math
+
+import pytest
+
+SQUARE = {"points": [[0.0, 0.0], [2.0, 0.0], [2.0, 2.0], [0.0, 2.0]], "shape_type": "polygon"}
+SHIFTED = {"points": [[1.0, 0.0], [3.0, 0.0], [3.0, 2.0], [1.0, 2.0]], "shape_type": "rectangle"}
+ELLIPSE = {"points": [[0.0, 0.0], [4.0, 0.0], [4.0, 2.0], [0.0, 2.0]], "shape_type": "circle"}
+LINE = {"points": [[0.0, 0.0], [2.0, 0.0]], "shape_type": "polygon"}
+EMPTY = {"points": [], "shape_type": "polygon"}
+
+
+def test_measures():
+    from taplt.utils.analytics import MEASURES, ShapeArrays, measures
+
+    result = measures(ShapeArrays.from_label_dicts([SQUARE, EMPTY, ELLIPSE, LINE]))
+    assert dict(zip(MEASURES, result[0])) == {"area": 4, "perimeter": 8, "cx": 1, "cy": 1,
+                                               "xmin": 0, "ymin": 0, "xmax": 2, "ymax": 2}
+    assert not result[1].any()
+    assert result[2, :4] == pytest.approx([2 * math.pi, 9.6884, 2, 1], abs=1e-4)
+    assert result[3, :4] == pytest.approx([0, 4, 1, 0])
+
+
+def test_overlaps():
+    from taplt.utils.analytics import ShapeArrays, candidate_pairs, measures, overlaps
+    import numpy as np
+
+    shapes = ShapeArrays.from_label_dicts([SQUARE, SHIFTED, ELLIPSE, SQUARE])
+    result = measures(shapes)
+    first, second = candidate_pairs(result[:, 4:], np.array([0, 0, 0, 1]))
+    assert sorted(tuple(sorted(pair)) for pair in zip(first.tolist(), second.tolist())) == [(0, 1), (0, 2), (1, 2)]
+    ious = {tuple(sorted((i, j))): iou for i, j, iou in overlaps(shapes, result[:, 0], result[:, 4:], first, second)}
+    assert ious[(0, 1)] == pytest.approx(1 / 3)
+    assert ious[(0, 2)] == pytest.approx(math.pi / (4 + math.pi), rel=1e-2)  # half of the ellipse
+    assert sorted(pair for pair, iou in ious.items() if iou > 0.4) == [(0, 2), (1, 2)]
+
+
+def test_geometry_cache(project):
+    database_geometry = project.get_geometry()
+    assert len(database_geometry["area"]) == project.cursor.execute("SELECT COUNT(*) FROM annotations").fetchone()[0]
+    assert project.update_geometry() == 0
+
+    # saving a file replaces its annotations, only their measures are computed again
+    file_row = project.get_file(1)
+    label_dicts = project.get_annotations(file_row[1], file_row[2])
+    entries = [project.create_annotation_entry(file_row[3], label_dict, label_dict["label"], file_row)
+               for label_dict in label_dicts[1:]]
+    project.update_file_annotations(file_row[1], file_row[2], entries)
+    assert project.update_geometry() == len(label_dicts) - 1
+
+
+def test_measures_benchmark(benchmark, sizes):
+    from taplt.utils.analytics import ShapeArrays, measures
+    from taplt.utils.synthetic import label_dicts
+
+    shapes = ShapeArrays.from_label_dicts(label_dicts(sizes["images"] * sizes["shapes"], sizes["vertices"]))
+    benchmark(measures, shapes)
+
+
+def test_overlaps_benchmark(benchmark, project):
+    project.update_geometry()
+    benchmark.pedantic(project.get_overlaps, args=(0.5,), rounds=3)
@@ -0,0 +1,26 @@
+"""Benchmarks of the database hot paths: storing the annotations of a file and loading a file for display"""
+import itertools
+
+import pytest
+
+
+@pytest.fixture(scope="module")
+def shapes(qapp, label_dicts):
+    from PyQt6.QtCore import QSize
+    from taplt.ui.shape import Shape
+    return [Shape(QSize(512, 512), label_dict=label_dict) for label_dict in label_dicts]
+
+
+def test_save(benchmark, project, shapes):
+    file_uid = project.get_first_file()
+    benchmark(project.save, shapes, file_uid)
+
+
+def test_update_gui(benchmark, project):
+    """loads the files one after the other, including their annotations"""
+    files = itertools.cycle([file[2] for file in project.prepare_files()])
+    benchmark(lambda: project.update_gui(next(files)))
+
+
+def test_update_file_list(benchmark, project):
+    benchmark(project.update_file_list)
@@ -0,0 +1,44 @@
+"""Benchmark of journaling an edit of the annotations, see ../tests/test_journal_replay.py for the replay.
+Appending a record only queues it, so an edit must stay far below a millisecond even with thousands of shapes"""
+import time
+
+import pytest
+
+SHAPES = 2000
+EDIT_BUDGET = 0.001  # s
+RUNS = 100  # edits timed if pytest-benchmark does not time them
+
+
+@pytest.fixture(scope="module")
+def group(qapp, project):
+    from PyQt6.QtCore import QSize
+    from PyQt6.QtGui import QColor
+    from PyQt6.QtWidgets import QGraphicsScene
+    from taplt.ui.annotation_group import AnnotationGroup
+    from taplt.ui.shape import Shape
+    from taplt.utils.synthetic import label_dicts
+
+    scene = QGraphicsScene()
+    group = AnnotationGroup()
+    scene.addItem(group)
+    group.update_annotations([Shape(QSize(512, 512), label_dict=label_dict, color=QColor("#ff0000"))
+                              for label_dict in label_dicts(SHAPES, 16)])
+    group.sJournal.connect(lambda operation, delta: project.append_journal(1, 0, operation, delta))
+    yield scene, group
+    project.clear_journal(1)
+
+
+def test_journal_edit(benchmark, group):
+    """moves the last shape of a file with thousands of shapes"""
+    _, group = group
+    shape = group.annotations[SHAPES - 1]
+    benchmark(shape.sMoved.emit, 1.0, 1.0)
+    if benchmark.stats is None:  # with --benchmark-disable, the edit runs once without being timed
+        start = time.perf_counter()
+        for _ in range(RUNS):
+            shape.sMoved.emit(1.0, 1.0)
+        mean = (time.perf_counter() - start) / RUNS
+    else:
+        mean = benchmark.stats.stats.mean
+    assert mean < EDIT_BUDGET
+
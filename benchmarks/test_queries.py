@@ -0,0 +1,96 @@
+"""Checks of the number of statements per operation with the query profiler of the database.
+The operations must not run a query per file or per shape (N+1 pattern), so the counts must not depend
+on the size of the project"""
+import pytest
+
+SIZES = (10, 40)
+
+
+@pytest.fixture(scope="module")
+def databases(create_project) -> dict:
+    return {size: create_project(profile=True, images=size, polygons=size) for size in SIZES}
+
+
+def count_queries(database, operation, *args) -> int:
+    with database.profiler.measure() as queries:
+        operation(*args)
+    return len(queries)
+
+
+@pytest.mark.parametrize("operation", ["prepare_files", "update_file_list", "update_gui"])
+def test_query_count_independent_of_project_size(databases, operation):
+    counts = {size: count_queries(database, getattr(database, operation)) for size, database in databases.items()}
+    assert len(set(counts.values())) == 1, counts
+
+
+def test_save_query_count_independent_of_shapes(databases):
+    from PyQt6.QtCore import QSize
+    from taplt.ui.shape import Shape
+    from taplt.utils.synthetic import label_dicts
+    counts = dict()
+    for size, database in databases.items():
+        shapes = [Shape(QSize(512, 512), label_dict=label_dict) for label_dict in label_dicts(size, 8)]
+        database.save(shapes, database.get_first_file())  # the label classes exist from now on
+        counts[size] = count_queries(database, database.save, shapes, database.get_first_file())
+    assert len(set(counts.values())) == 1, counts
+
+
+def test_no_full_scans_when_displaying_files(databases):
+    database = databases[SIZES[-1]]
+    database.profiler.reset()
+    for file in database.prepare_files():
+        database.update_gui(file[2])
+    assert not database.profiler.full_scans(), database.profiler.report()
+
+
+def test_statistics_match_annotations(databases):
+    """the summary tables are kept up to date by triggers, reading the statistics does not scan the annotations"""
+    database = databases[SIZES[0]]
+    files = database.prepare_files()
+    database.save([], files[1][2])
+    database.delete_file(files[2][0].split("/")[-1], files[0][2])
+
+    with database.profiler.measure() as queries:
+        statistics = database.get_statistics()
+    assert not any("FROM annotations" in query.sql for query in queries)
+
+    labels = database.cursor.execute("""SELECT l.label_class, COUNT(a.uid) FROM labels AS l
+                                        LEFT JOIN annotations AS a ON a.label = l.uid
+                                        GROUP BY l.uid ORDER BY l.uid""").fetchall()
+    patients = database.cursor.execute("""SELECT p.some_id, COUNT(a.uid) FROM patients AS p
+                                          LEFT JOIN annotations AS a ON a.patient = p.uid
+                                          GROUP BY p.uid ORDER BY p.uid""").fetchall()
+    assert statistics['labels'] == labels
+    assert statistics['patients'] == patients
+    assert statistics['modalities'][1] == ("images", len(files) - 1, sum(populated for _, populated, _, _ in files) - 2)
+    assert [populated for _, populated, _, _ in database.prepare_files()][:2] == [True, False]
+
+
+def test_search_matches_annotations(databases):
+    """the search reads the full-text index and the summary tables, the results match the annotations"""
+    database = databases[SIZES[-1]]
+    file_row = database.get_file(database.get_first_file())
+    label_dicts = database.get_annotations(file_row[1], file_row[2])
+    label_dicts[0]['comment'] = "zebra stripes"
+    database.update_file_annotations(file_row[1], file_row[2], [
+        database.create_annotation_entry(file_row[3], label_dict, label_dict['label'], file_row)
+        for label_dict in label_dicts])
+
+    def expected(text: str, label_class: str, min_annotations: int) -> list:
+        files = dict()
+        for uid, _, _, filename, _ in [database.get_file(file[2]) for file in database.prepare_files()]:
+            file_row = database.get_file(uid)
+            annotations = database.get_annotations(file_row[1], file_row[2])
+            if (any(text in annotation['comment'].split() for annotation in annotations) and
+                    any(annotation['label'] == label_class for annotation in annotations) and
+                    len(annotations) >= min_annotations):
+                files[uid] = filename
+        return list(files.values())
+
+    for text, label_class in [("zebra", "Class 1"), ("artifact", "Class 2"), ("pathologist", "Class 0")]:
+        with database.profiler.measure() as queries:
+            results = database.search(text, label_class, min_annotations=SIZES[-1])
+        assert not any("FROM annotations" in query.sql for query in queries)
+        assert [filename for _, _, filename, _, _ in results] == expected(text, label_class, SIZES[-1])
+    assert database.search("zebr")[0][0] == file_row[0]
+
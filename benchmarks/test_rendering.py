@@ -0,0 +1,46 @@
+"""Benchmarks of displaying the annotations of a file: creating and adding the shapes,
+painting them and filling the annotation tree"""
+import pytest
+
+
+@pytest.fixture(scope="module")
+def make_shapes(qapp, label_dicts):
+    from PyQt6.QtCore import QSize
+    from PyQt6.QtGui import QColor
+    from taplt.ui.shape import Shape
+
+    def make():
+        return [Shape(QSize(512, 512), label_dict=label_dict, color=QColor("#ff0000")) for label_dict in label_dicts]
+    return make
+
+
+def test_update_annotations(benchmark, make_shapes):
+    from PyQt6.QtWidgets import QGraphicsScene
+    from taplt.ui.annotation_group import AnnotationGroup
+
+    scene = QGraphicsScene()
+    group = AnnotationGroup()
+    scene.addItem(group)
+    benchmark.pedantic(group.update_annotations, setup=lambda: ((make_shapes(),), {}), rounds=20)
+
+
+def test_shape_paint(benchmark, make_shapes):
+    """paints all shapes of a file"""
+    from PyQt6.QtGui import QImage, QPainter
+
+    shapes = make_shapes()
+    image = QImage(512, 512, QImage.Format.Format_ARGB32_Premultiplied)
+    painter = QPainter(image)
+
+    def paint():
+        for shape in shapes:
+            shape.paint(painter)
+    benchmark(paint)
+    painter.end()
+
+
+def test_update_polygons(benchmark, make_shapes):
+    from taplt.ui.annotation_tree import AnnotationTree
+
+    tree = AnnotationTree()
+    benchmark(tree.update_polygons, make_shapes())
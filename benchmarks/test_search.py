@@ -0,0 +1,45 @@
+"""Benchmark of the search in a large project. The search starts from the full-text index of the comments or
+the summary tables, so finding a few files takes as long in a large project as in a small one; scanning the files
+in the file list order would read all of them. Run with 'python -m pytest benchmarks/test_search.py -s' to print
+the measured times."""
+import time
+
+import pytest
+
+IMAGES = 20000
+RARE_FILES = 5  # files at the end of the file list with a rare label class and comment
+RUNS = 5
+
+# budget in seconds, the best of RUNS searches has to stay below it
+SEARCH_BUDGET = 0.002
+
+
+@pytest.fixture(scope="module")
+def large_project(create_project):
+    database = create_project(images=IMAGES, polygons=5, vertices=4, sparse=True)
+    database.add_label("Rare")
+    for file in database.prepare_files()[-RARE_FILES:]:
+        file_row = database.get_file(file[2])
+        label_dicts = database.get_annotations(file_row[1], file_row[2])
+        label_dicts[0].update(label="Rare", comment="zebra stripes")
+        database.update_file_annotations(file_row[1], file_row[2], [
+            database.create_annotation_entry(file_row[3], label_dict, label_dict["label"], file_row)
+            for label_dict in label_dicts])
+    return database
+
+
+@pytest.mark.parametrize("criteria", [{"text": "zebra"},
+                                      {"label_class": "Rare"},
+                                      {"text": "zebra", "label_class": "Class 1"},
+                                      {"label_class": "Rare", "max_annotations": 1},
+                                      {"min_annotations": 6}])
+def test_search_large_project(large_project, criteria):
+    times = list()
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        results = large_project.search(**criteria)
+        times.append(time.perf_counter() - start)
+    print("\n{}: {} files in {:.2f}ms (budget {}ms)".format(criteria, len(results), min(times) * 1e3,
+                                                            SEARCH_BUDGET * 1e3))
+    assert len(results) <= RARE_FILES
+    assert min(times) < SEARCH_BUDGET
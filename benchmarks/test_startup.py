@@ -0,0 +1,67 @@
+"""Startup benchmark: measures (in a fresh interpreter) how long importing the application and showing the
+welcome screen takes, and checks that the heavy dependencies are only loaded once a project is opened.
+Run with 'python -m pytest benchmarks/test_startup.py -s' to print the measured times."""
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+pytest.importorskip("PyQt6.QtWidgets")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RUNS = 3
+
+# budgets in seconds, the best of RUNS runs has to stay below them
+IMPORT_BUDGET = 0.25
+STARTUP_BUDGET = 1.0
+
+# modules which must not be executed before a project is opened
+DEFERRED_MODULES = ["numpy", "PIL.Image", "av", "filetype",
+                    "taplt.ui.dialogs", "taplt.ui.image_display", "taplt.ui.shape"]
+
+SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+from taplt.src.main_logic import MainLogic
+imported = time.perf_counter()
+from PyQt6.QtWidgets import QApplication
+app = QApplication(sys.argv)
+logic = MainLogic()
+app.processEvents()
+shown = time.perf_counter()
+loaded = [name for name, module in sys.modules.items() if type(module).__name__ == "module"]
+print(json.dumps({"import": imported - start, "startup": shown - start, "modules": loaded}))
+"""
+
+
+def measure() -> dict:
+    env = dict(os.environ, QT_QPA_PLATFORM="offscreen", PYTHONPATH=ROOT)
+    output = subprocess.run([sys.executable, "-c", SCRIPT], cwd=ROOT, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+@pytest.fixture(scope="module")
+def startup():
+    runs = [measure() for _ in range(RUNS)]
+    result = {"import": min(run["import"] for run in runs),
+              "startup": min(run["startup"] for run in runs),
+              "modules": runs[0]["modules"]}
+    print("\nimport: {:.3f}s (budget {}s), startup: {:.3f}s (budget {}s)".format(
+        result["import"], IMPORT_BUDGET, result["startup"], STARTUP_BUDGET))
+    return result
+
+
+def test_import_time(startup):
+    assert startup["import"] < IMPORT_BUDGET
+
+
+def test_startup_time(startup):
+    assert startup["startup"] < STARTUP_BUDGET
+
+
+def test_heavy_modules_deferred(startup):
+    loaded = [name for name in DEFERRED_MODULES if name in startup["modules"]]
+    assert not loaded, "loaded before a project was opened: {}".format(loaded)
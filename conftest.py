@@ -0,0 +1,44 @@
+"""Fixtures shared by the tests in ./tests and the benchmarks in ./benchmarks. They run headless on the Qt
+offscreen platform and use synthetic projects."""
+import os
+
+import pytest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+
+@pytest.fixture(scope="session")
+def qapp():
+    from PyQt6.QtWidgets import QApplication
+    return QApplication.instance() or QApplication([])
+
+
+@pytest.fixture(scope="session")
+def create_project(qapp, tmp_path_factory):
+    """returns a function which generates a synthetic project and opens it, the projects are closed
+    at the end of the session"""
+    from taplt.utils.database import SQLiteDatabase
+    from taplt.utils.synthetic import generate_project
+    databases = list()
+
+    def create(user: str = None, profile: bool = None, initialize: bool = True, **options) -> SQLiteDatabase:
+        """
+        :param user: the annotator of the database
+        :param profile: record the statements with the query profiler
+        :param initialize: open the project like the application, otherwise only connect to it like
+        the command line tools
+        :param options: the content of the project, see generate_project
+        """
+        database = SQLiteDatabase(profile=profile, user=user)
+        database_path = generate_project(str(tmp_path_factory.mktemp("project")), **options)
+        if initialize:
+            database.initialize(database_path)
+        else:
+            database.connect(database_path)
+        databases.append(database)
+        return database
+
+    yield create
+    for database in databases:
+        database.close_journal()
+        database.connection.close()
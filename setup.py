@@ -37,6 +37,9 @@ setup(
                       "Pillow>=2.8.0",
                       "PyQt6",
                       "filetype"],
+    extras_require={"video": ["av"],
+                    "tests": ["pytest"],
+                    "benchmarks": ["pytest", "pytest-benchmark"]},
     license="GPLv3",
     keywords="Image Annotation, Machine Learning",
     classifiers=[
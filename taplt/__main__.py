@@ -1,18 +1,169 @@
 import argparse
+import os
 import sys
 
-from PyQt6.QtWidgets import QApplication
-from taplt.src.main_logic import MainLogic
 
+def main(args):
+    from PyQt6.QtWidgets import QApplication
+    from taplt.src.main_logic import MainLogic
+    from taplt.utils import instrumentation
 
-def main(_args):
+    if args.trace:
+        instrumentation.enable()
+    if args.profile_sql:
+        os.environ["TAPLT_PROFILE_SQL"] = "1"
     app = QApplication(sys.argv)
-    _ = MainLogic()  # the labeling window
-    sys.exit(app.exec())
+    logic = MainLogic()  # the labeling window
+    exit_code = app.exec()
+    logic.database.release_claims()
+    logic.database.close_journal()
+    if args.trace:
+        instrumentation.dump_chrome_trace(args.trace)
+    if args.profile_sql:
+        print(logic.database.profiler.report())
+    sys.exit(exit_code)
+
+
+def generate(args):
+    """creates a synthetic project, e.g. for load tests"""
+    import time
+    from taplt.utils.synthetic import generate_project
+
+    start = time.perf_counter()
+    database_path = generate_project(args.project, images=args.images, patients=args.patients, labels=args.labels,
+                                     polygons=args.polygons, vertices=args.vertices, sparse=args.sparse,
+                                     seed=args.seed)
+    print("created {} in {:.1f}s".format(database_path, time.perf_counter() - start))
+
+
+def maintain(args):
+    """checks and compacts the database of a project"""
+    from taplt.utils import maintenance
+    from taplt.utils.project_structure import Structure
+
+    def progress(done: int, total: int, step: str):
+        print("\r{:<60}{}".format(step, " {:>6.1%}".format(done / total) if total else ""), end="", flush=True)
+
+    unknown = set(args.operations) - set(maintenance.OPERATIONS)
+    if unknown:
+        sys.exit("unknown operations: {}".format(", ".join(sorted(unknown))))
+    report = maintenance.run(args.project + Structure.DATABASE_DEFAULT_NAME, args.operations or
+                             list(maintenance.OPERATIONS), progress, repair=args.repair)
+    print("\r{:<70}\r".format("") + "\n".join(report))
+
+
+def queue(args):
+    """adds the images matching the filter to the work queue of a project and prints its state"""
+    from taplt.utils.database import SQLiteDatabase
+    from taplt.utils.project_structure import Structure
+
+    database = SQLiteDatabase()
+    database.connect(args.project + Structure.DATABASE_DEFAULT_NAME)
+    database.create_initial_tables()
+    if args.filter is not None:
+        print("queued {:,} images".format(database.queue_files(args.filter)))
+    open_files, _, done = database.get_work_queue()
+    claims = database.get_claims()
+    database.connection.close()
+
+    print("{:,} open, {:,} done".format(open_files, done))
+    for user, count in claims:
+        print("  {:<40} {:>10,} claimed".format(user, count))
+
+
+def restore(args):
+    """recreates a project from a snapshot"""
+    from taplt.utils.snapshot import restore_snapshot
+
+    restore_snapshot(args.snapshot, args.project, progress=print_progress)
+    print("\nrestored {}".format(args.project))
+
+
+def snapshot(args):
+    """stores a snapshot of a project in a backup directory"""
+    import time
+    from taplt.utils.snapshot import create_snapshot
+
+    start = time.perf_counter()
+    snapshot_path = create_snapshot(args.project, args.backup, progress=print_progress)
+    print("\ncreated {} in {:.1f}s".format(snapshot_path, time.perf_counter() - start))
+
+
+def print_progress(done: int, total: int, step: str):
+    print("\r{:>10,} / {:,} {:<60.60}".format(done, total - 1, step), end="", flush=True)
+
+
+def stats(args):
+    """prints the statistics of the annotations of a project"""
+    from taplt.utils.database import SQLiteDatabase
+    from taplt.utils.project_structure import Structure
+
+    database = SQLiteDatabase()
+    database.connect(args.project + Structure.DATABASE_DEFAULT_NAME)
+    database.create_initial_tables()  # projects created before the summary tables existed are migrated
+    statistics = database.get_statistics()
+    database.connection.close()
+
+    print("{:,} annotations".format(statistics['annotations']))
+    for modality, files, annotated in statistics['modalities']:
+        print("{}: {:,} files, {:,} annotated, {:,} not annotated".format(modality, files, annotated,
+                                                                          files - annotated))
+    for title, rows in (("label classes", statistics['labels']), ("patients", statistics['patients']),
+                        ("most annotated files", statistics['files'][:args.top])):
+        print("\n{}:".format(title))
+        for name, count in rows:
+            print("  {:<40} {:>10,}".format(str(name), count))
 
 
 if __name__ == "__main__":
     # Add arguments to argument parser
     parser = argparse.ArgumentParser()
+    parser.add_argument("--trace", metavar="FILE", help="record the timings of the hot paths as Chrome trace")
+    parser.add_argument("--profile-sql", action="store_true",
+                        help="record all statements of the database and print a summary on exit")
+    parser.set_defaults(command=main)
+    commands = parser.add_subparsers(title="commands")
+
+    generate_parser = commands.add_parser("generate", help="create a synthetic project")
+    generate_parser.add_argument("project", help="directory of the project")
+    generate_parser.add_argument("--images", type=int, default=1000)
+    generate_parser.add_argument("--patients", type=int, default=10)
+    generate_parser.add_argument("--labels", type=int, default=5, help="number of label classes")
+    generate_parser.add_argument("--polygons", type=int, default=10, help="number of polygons per image")
+    generate_parser.add_argument("--vertices", type=int, default=8, help="number of vertices per polygon")
+    generate_parser.add_argument("--sparse", action="store_true", help="create sparse files instead of images")
+    generate_parser.add_argument("--seed", type=int, default=0)
+    generate_parser.set_defaults(command=generate)
+
+    maintain_parser = commands.add_parser("maintain", help="check the database, find annotations of deleted files "
+                                                           "and missing files, release unused space")
+    maintain_parser.add_argument("project", help="directory of the project")
+    maintain_parser.add_argument("operations", nargs="*", metavar="OPERATION",
+                                 help="integrity, orphans, missing, analyze and/or vacuum (default: all)")
+    maintain_parser.add_argument("--repair", action="store_true", help="delete the annotations of deleted files")
+    maintain_parser.set_defaults(command=maintain)
+
+    queue_parser = commands.add_parser("queue", help="add images to the work queue and print its state")
+    queue_parser.add_argument("project", help="directory of the project")
+    queue_parser.add_argument("--filter", metavar="EXPRESSION",
+                              help="queue the images matching the filter, e.g. 'annotations:0'")
+    queue_parser.set_defaults(command=queue)
+
+    snapshot_parser = commands.add_parser("snapshot", help="back up a project, copying only files which changed "
+                                                           "since the last snapshot")
+    snapshot_parser.add_argument("project", help="directory of the project")
+    snapshot_parser.add_argument("backup", help="backup directory, holding the snapshots of the project")
+    snapshot_parser.set_defaults(command=snapshot)
+
+    restore_parser = commands.add_parser("restore", help="recreate a project from a snapshot")
+    restore_parser.add_argument("snapshot", help="directory of the snapshot, BACKUP/snapshots/NAME")
+    restore_parser.add_argument("project", help="directory of the restored project, which must not exist")
+    restore_parser.set_defaults(command=restore)
+
+    stats_parser = commands.add_parser("stats", help="print the number of annotations per label, patient and file")
+    stats_parser.add_argument("project", help="directory of the project")
+    stats_parser.add_argument("--top", type=int, default=10, help="number of most annotated files to print")
+    stats_parser.set_defaults(command=stats)
+
     args = parser.parse_args()
-    main(args)
+    args.command(args)
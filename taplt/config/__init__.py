@@ -1,3 +1,8 @@
 # TODO: IMPLEMENT A PROPER CONFIG SETUP USING THE USER'S HOME DIRECTORY AND A YAML FILE!!!!
 VERTEX_SIZE = 2 # this has to be adapted in the future to be dependent on the image size
-SCALING_INITIAL = 5 # this has to be adapted in the future to be dependent on the image size
\ No newline at end of file
+SCALING_INITIAL = 5 # this has to be adapted in the future to be dependent on the image size
+UNDO_LIMIT = 200 # number of edits of the displayed file which can be undone
+JOURNAL_INTERVAL = 1.0 # seconds between two writes of the journal of unsaved edits
+SQLITE_JOURNAL_MODE = "WAL" # concurrent readers and writers; "DELETE" for projects on network file systems, which lack WAL
+BUSY_TIMEOUT = 30.0 # seconds a write waits while another annotator's process holds the lock of the database
+LEASE_DURATION = 1800.0 # seconds an image of the work queue stays claimed by an annotator without being saved
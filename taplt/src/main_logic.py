@@ -1,3 +1,5 @@
+from PyQt6.QtCore import QObject
+
 from taplt.utils.database import SQLiteDatabase
 from taplt.ui.main_window import LabelingMainWindow
 
@@ -8,41 +10,76 @@ class MainLogic:
         # active elements
         self.main_window = LabelingMainWindow()
         self.database = SQLiteDatabase()
+        self.connections = list()
         self.connect_events()
+        self.main_window.sDisconnect.connect(self.disconnect)
 
         self.main_window.show()
 
     def connect_events(self):
+        """connects the main window to the current database, the connections are kept to release them again"""
+        self.connections = [
+            # main window -> database
+            self.main_window.sCreateNewProject.connect(self.database.initialize),
+            self.main_window.sOpenProject.connect(self.database.initialize),
+            self.main_window.sSaveToDatabase.connect(self.database.save),
+            self.main_window.sForceSave.connect(self.database.overwrite),
+            self.main_window.sAddFile.connect(self.database.import_file),
+            self.main_window.sAddPatient.connect(self.database.add_patient),
+            self.main_window.sRequestUpdate.connect(self.database.update_gui),
+            self.main_window.sRequestFrame.connect(self.database.update_gui),
+            self.main_window.sDeleteFile.connect(self.database.delete_file),
+            self.main_window.sUpdateSettings.connect(self.database.update_settings),
+            self.main_window.sStoreFileHash.connect(self.database.set_file_hash),
+            self.main_window.sJournalRecord.connect(self.database.append_journal),
+            self.main_window.sDiscardJournal.connect(self.database.clear_journal),
+            self.main_window.sSearch.connect(self.database.send_search_results),
+            self.main_window.sFetchFiles.connect(self.database.send_file_page),
+            self.main_window.sNextQueued.connect(self.database.next_queued_file),
+            self.main_window.sQueueImages.connect(self.database.start_campaign),
+            self.main_window.sCreateSnapshot.connect(self.database.create_snapshot),
+            self.main_window.sMaintenance.connect(self.database.run_maintenance),
 
-        # main window -> database
-        self.main_window.image_display.hide_button.clicked.connect(self.main_window.hide_toolbar)
-        self.main_window.sCreateNewProject.connect(self.database.initialize)
-        self.main_window.sOpenProject.connect(self.database.initialize)
-        self.main_window.sSaveToDatabase.connect(self.database.save)
-        self.main_window.sAddFile.connect(self.database.add_file)
-        self.main_window.sAddPatient.connect(self.database.add_patient)
-        self.main_window.sRequestUpdate.connect(self.database.update_gui)
-        self.main_window.sDeleteFile.connect(self.database.delete_file)
-        self.main_window.sUpdateSettings.connect(self.database.update_settings)
-        self.main_window.sDisconnect.connect(self.disconnect)
-
-        # main window's menubar -> database
-        self.main_window.menubar.sRequestImport.connect(self.database.send_import_info)
-        self.main_window.menubar.sRequestSettings.connect(self.database.open_settings)
-        self.main_window.menubar.sPreviewDatabase.connect(self.database.preview_database)
+            # main window's menubar -> database
+            self.main_window.menubar.sRequestImport.connect(self.database.send_import_info),
+            self.main_window.menubar.sRequestSettings.connect(self.database.open_settings),
+            self.main_window.menubar.sPreviewDatabase.connect(self.database.preview_database),
+            self.main_window.menubar.sShowStatistics.connect(self.database.open_statistics),
 
-        # macros -> database
-        # self.main_window.macros.sNewProject.connect(self.database.initialize)
+            # macros -> database
+            # self.main_window.macros.sNewProject.connect(self.database.initialize)
 
-        # database -> main window
-        self.database.sUpdate.connect(self.main_window.update_window)
-        self.database.sImportFile.connect(self.main_window.import_file)
-        self.database.sOpenSettings.connect(self.main_window.open_settings)
-        self.database.sApplySettings.connect(self.main_window.apply_settings)
-        self.database.sPreviewDatabase.connect(self.main_window.preview_database)
+            # database -> main window
+            self.database.sUpdateFile.connect(self.main_window.update_file),
+            self.database.sUpdateVideo.connect(self.main_window.update_video),
+            self.database.sUpdateFileList.connect(self.main_window.update_file_list),
+            self.database.sUpdateFileState.connect(self.main_window.set_file_state),
+            self.database.sSaveConflict.connect(self.main_window.save_conflict),
+            self.database.sProjectOpened.connect(self.main_window.set_project_location),
+            self.database.sUpdateClasses.connect(self.main_window.update_label_classes),
+            self.database.sImportFile.connect(self.main_window.import_file),
+            self.database.sOpenSettings.connect(self.main_window.open_settings),
+            self.database.sOpenStatistics.connect(self.main_window.open_statistics),
+            self.database.sSearchResults.connect(self.main_window.show_search_results),
+            self.database.sFilePage.connect(self.main_window.add_file_page),
+            self.database.sWorkQueue.connect(self.main_window.update_work_queue),
+            self.database.sSnapshotProgress.connect(self.main_window.snapshot_progress),
+            self.database.sSnapshotFinished.connect(self.main_window.snapshot_finished),
+            self.database.sMaintenanceProgress.connect(self.main_window.maintenance_progress),
+            self.database.sMaintenanceFinished.connect(self.main_window.maintenance_finished),
+            self.database.sApplySettings.connect(self.main_window.apply_settings),
+            self.database.sPreviewDatabase.connect(self.main_window.preview_database)
+        ]
 
     def disconnect(self):
-        """disconnects the main window from the database when user closes a project
-        - not really necessary rn, but may prevent errors in the future"""
+        """disconnects the main window from the database when user closes a project,
+        the next project is opened by a new database"""
+        for connection in self.connections:
+            QObject.disconnect(connection)
+        self.database.release_claims()
+        self.database.close_journal()
+        if self.database.connection is not None:
+            self.database.connection.close()
         self.database = SQLiteDatabase()
+        self.main_window.update_work_queue(0, 0, 0)
         self.connect_events()
@@ -1,11 +1,15 @@
 from PyQt6.QtWidgets import *
 from PyQt6.QtCore import *
+from PyQt6.QtGui import QColor, QPolygonF, QUndoStack
 from typing import *
 from dataclasses import dataclass
 
-from taplt.utils.qt import colormap_rgb
+from taplt.config import UNDO_LIMIT
+from taplt.utils.colors import ColorRegistry, NEW_SHAPE_COLOR
+from taplt.ui.commands import AddCommand, CommentCommand, DeleteCommand, LabelCommand, MoveCommand, VertexCommand
 from taplt.ui.shape import Shape
 from taplt.ui.dialogs import NewLabelDialog, DeleteShapeMessageBox
+from taplt.utils import journal
 
 
 class AnnotationGroup(QGraphicsObject):
@@ -16,6 +20,7 @@ class AnnotationGroup(QGraphicsObject):
     shapeSelected = pyqtSignal(Shape)
     sLabelClassDeleted = pyqtSignal(str)
     sChange = pyqtSignal(int)
+    sJournal = pyqtSignal(str, str)  # operation, delta as JSON
 
     @dataclass
     class AnnotationMode:
@@ -28,10 +33,14 @@ class AnnotationGroup(QGraphicsObject):
         self.classes = list()
         self.setAcceptHoverEvents(True)
         self.temp_shape: Shape = None
-        self._num_colors = 10  # TODO: This needs to be updated based on what's in the image.
-        self.color_map, new_color = colormap_rgb(n=self._num_colors)  # have a buffer for new classes
-        self.draw_new_color = new_color
+        self.colors = ColorRegistry()  # replaced by the project's registry
+        self.draw_new_color = QColor(NEW_SHAPE_COLOR)
         self.mode = AnnotationGroup.AnnotationMode.EDIT
+        self.image_size = QSize()
+
+        # the edits of the displayed file, see taplt.ui.commands
+        self.undo_stack = QUndoStack(self)
+        self.undo_stack.setUndoLimit(UNDO_LIMIT)
 
     def boundingRect(self):
         return self.childrenBoundingRect()
@@ -51,10 +60,7 @@ class AnnotationGroup(QGraphicsObject):
 
     def get_color_for_label(self, label_name: str):
         r"""Get a Color based on a label_name"""
-        if label_name not in self.classes:
-            return None
-        label_index = self.classes.index(label_name)
-        return self.color_map[label_index]
+        return self.colors.color(label_name)
 
     def add_shapes(self, new_shapes: Union[Shape, List[Shape]]):
         """
@@ -65,25 +71,48 @@ class AnnotationGroup(QGraphicsObject):
         if isinstance(new_shapes, Shape):
             new_shapes = [new_shapes]
         for shape in new_shapes:
-            shape.setParentItem(self)
             new_id = 0 if not self.annotations else max(self.annotations.keys()) + 1
-            self.annotations[new_id] = shape
-            shape.selected.connect(self.shape_selected)
-            shape.deleted.connect(lambda: self.remove_shapes(shape))
-            shape.mode_changed.connect(self.shape_mode_changed)
-            shape.drawingDone.connect(self.set_label)
-            shape.sChange.connect(self.sChange.emit)
-            self.update()
+            self.add_shape(new_id, shape)
+
+    def add_shape(self, shape_id: int, shape: Shape):
+        """adds a shape to the group using the given id"""
+        shape.setParentItem(self)
+        self.annotations[shape_id] = shape
+        shape.selected.connect(self.shape_selected)
+        shape.deleted.connect(lambda: self.remove_shapes(shape))
+        shape.mode_changed.connect(self.shape_mode_changed)
+        shape.drawingDone.connect(self.set_label)
+        shape.sChange.connect(self.sChange.emit)
+        shape.sMoved.connect(self.shape_moved)
+        shape.sVerticesMoved.connect(self.vertices_moved)
+        shape.sRelabel.connect(lambda: self.change_label(shape))
+        self.update()
+
+    def change_label(self, shape: Shape):
+        """lets the user select the new label of the shape"""
+        dlg = NewLabelDialog(self.classes, [self.colors.color(c) for c in self.classes])
+        dlg.setWindowTitle("Select the new class of the shape")
+        dlg.exec()
+        if dlg.result:
+            self.relabel(shape, dlg.result)
+
+    def command_done(self, change: int, operation: str, delta: dict, refresh: bool):
+        """journals an edit (or its undo), refreshes the gui if the edit was not made by the user directly"""
+        self.sJournal.emit(operation, journal.dumps(delta))
+        if refresh:
+            self.sChange.emit(change)
+            self.updateShapes.emit(list(self.annotations.values()))
 
     def deselect_all(self):
         """deselects all shapes"""
         for shape in self.annotations.values():
             shape.setSelected(False)
 
-    def remove_shapes(self, shapes: Union[Shape, List[Shape]]):
+    def remove_shapes(self, shapes: Union[Shape, List[Shape]], record: bool = True):
         """
         Remove shapes from the group and scene if connected to one.
         :param shapes: a shape or list of shapes
+        :param record: whether the removal can be undone
         :return: None
         """
         if shapes is None:
@@ -94,21 +123,87 @@ class AnnotationGroup(QGraphicsObject):
             if dlg.result() != QMessageBox.Ok:
                 return
             shapes = [shapes]
-            self.sChange.emit(1)
-        ids_to_remove = []
-        for shape_id in self.annotations:
-            if self.annotations[shape_id] in shapes:
-                ids_to_remove.append(shape_id)
-                self.annotations[shape_id].deleteLater()
-        [(self.annotations[x].disconnect(), self.annotations.pop(x)) for x in ids_to_remove]
-        self.updateShapes.emit(list(self.annotations.values()))
+        ids_to_remove = [shape_id for shape_id in self.annotations if self.annotations[shape_id] in shapes]
+        if record and ids_to_remove:
+            self.undo_stack.push(DeleteCommand(self, ids_to_remove))
+        else:
+            for shape_id in ids_to_remove:
+                self.take_shape(shape_id)
+            self.updateShapes.emit(list(self.annotations.values()))
 
     def clear(self):
         """
         Clears the group and scene of shapes
         :return:
         """
-        self.remove_shapes(list(self.annotations.values()))
+        self.remove_shapes(list(self.annotations.values()), record=False)
+
+    def journal_base(self):
+        """journals the ids of the shapes after they were saved in this order"""
+        shape_ids = sorted(self.annotations)
+        if shape_ids != list(range(len(shape_ids))):
+            self.sJournal.emit(journal.BASE, journal.dumps({"ids": shape_ids}))
+
+    def move_vertex(self, shape: Shape, index: int, pos: QPointF):
+        """moves a vertex of the shape, rectangles and circles are rebuilt from the opposite vertex"""
+        old = QPolygonF(shape.vertices.vertices)
+        shape.prepareGeometryChange()
+        shape.move_vertex(index, pos)
+        shape.update()
+        if old != shape.vertices.vertices:
+            self.push_vertices(shape, old)
+            self.sChange.emit(2)
+
+    def ordered_shapes(self) -> List[Shape]:
+        """returns the shapes ordered by their id, the order in which they are stored"""
+        return [self.annotations[shape_id] for shape_id in sorted(self.annotations)]
+
+    def push_vertices(self, shape: Shape, old: QPolygonF):
+        """records the vertices of the shape which differ from the old ones, they are moved already"""
+        vertices = [(idx, QPointF(old[idx]), QPointF(p)) for idx, p in enumerate(shape.vertices.vertices)
+                    if p != old[idx]]
+        if vertices:
+            self.undo_stack.push(VertexCommand(self, self.shape_id(shape), vertices))
+
+    def relabel(self, shape: Shape, label: str):
+        if label != shape.label:
+            self.undo_stack.push(LabelCommand(self, self.shape_id(shape), shape.label, label))
+
+    def restore_shape(self, shape_id: int, label_dict: dict):
+        """recreates a shape from its label dict, e.g. when a deletion is undone"""
+        shape = Shape(image_size=self.image_size,
+                      label_dict=label_dict,
+                      color=self.get_color_for_label(label_dict['label']))
+        self.add_shape(shape_id, shape)
+
+    def set_comment(self, shape: Shape, comment: str):
+        if comment != shape.comment:
+            self.undo_stack.push(CommentCommand(self, self.shape_id(shape), shape.comment, comment))
+
+    def set_shape_label(self, shape: Shape, label: str):
+        if label not in self.classes:
+            self.classes.append(label)
+        shape.label = label
+        shape.group_id = self.classes.index(label)
+        shape.update_color(self.colors.color(label))
+        shape.update()
+
+    def shape_id(self, shape: Shape) -> int:
+        for shape_id, other in self.annotations.items():
+            if other is shape:
+                return shape_id
+        return -1
+
+    def shape_moved(self, dx: float, dy: float):
+        shape_id = self.shape_id(self.sender())
+        if shape_id != -1:
+            self.undo_stack.push(MoveCommand(self, shape_id, dx, dy))
+
+    def vertices_moved(self, old: QPolygonF):
+        """records a vertex the user has dragged"""
+        shape = self.sender()
+        if self.shape_id(shape) != -1:
+            self.push_vertices(shape, old)
 
     def shape_selected(self):
         """gets the index of the selected shape and emits it"""
@@ -122,14 +217,14 @@ class AnnotationGroup(QGraphicsObject):
     def shape_mode_changed(self, mode: Union[int, Shape.ShapeMode]):
         shape = self.sender()  # type: Shape
         if mode == Shape.ShapeMode.FIXED:
-            shape.update_color(self.color_map[shape.group_id])
+            shape.update_color(self.colors.color(shape.label))
 
     def set_label(self):
         """
         opens a dialog to let user enter a label
         :return: None
         """
-        dlg = NewLabelDialog(self.classes, self.color_map)
+        dlg = NewLabelDialog(self.classes, [self.colors.color(c) for c in self.classes])
         dlg.exec()
         label = dlg.result
 
@@ -140,12 +235,13 @@ class AnnotationGroup(QGraphicsObject):
             self.temp_shape.group_id = self.classes.index(label)
             self.temp_shape.label = label
             self.temp_shape.set_mode(Shape.ShapeMode.FIXED)
+            self.undo_stack.push(AddCommand(self, [self.shape_id(self.temp_shape)]))
             self.updateShapes.emit(list(self.annotations.values()))
             self.sChange.emit(0)
 
         # if user entered no label, remove shape
         else:
-            self.remove_shapes([self.temp_shape])
+            self.remove_shapes([self.temp_shape], record=False)
             # self.scene().removeItem(self.temp_shape)
 
         # in any case, remove temp shape reference
@@ -154,7 +250,15 @@ class AnnotationGroup(QGraphicsObject):
     def set_mode(self, mode: Union[AnnotationMode, int]):
         self.mode = mode
 
+    def take_shape(self, shape_id: int) -> dict:
+        """removes the shape with the given id and returns its label dict"""
+        shape = self.annotations.pop(shape_id)
+        shape.disconnect()
+        shape.deleteLater()
+        return shape.to_dict()[0]
+
     def update_annotations(self, current_labels: List[Shape]):
+        self.undo_stack.clear()
         self.clear()
 
         # for some reason, bugs emerge when you pass the labels as a list
@@ -4,6 +4,7 @@ from PyQt6.QtCore import *
 
 from taplt.ui.dialogs import CommentDialog, DeleteAllMessageBox, DeleteClassMessageBox, DeleteShapeMessageBox
 from taplt.ui.shape import Shape
+from taplt.utils.qt import create_square_icon
 
 from typing import List
 
@@ -24,7 +25,8 @@ class AnnotationTree(QTreeWidget):
     second column is used to let user enter or view comments"""
     sItemsDeleted = pyqtSignal(list)
     sDeselectAll = pyqtSignal()
-    sChange = pyqtSignal(int)
+    sCommentChanged = pyqtSignal(Shape, str)  # shape, new comment
+    sRelabel = pyqtSignal(Shape)
 
     def __init__(self):
         super(AnnotationTree, self).__init__()
@@ -54,9 +56,8 @@ class AnnotationTree(QTreeWidget):
             return
         dlg.exec()
 
-        # emit deletion signal
+        # emit deletion signal, the change is reported by the annotations once they are deleted
         if dlg.result() == QMessageBox.StandardButton.Ok:
-            self.sChange.emit(1)
             shapes = self.gather_shapes(item)
             self.sItemsDeleted.emit(shapes)
 
@@ -101,13 +102,11 @@ class AnnotationTree(QTreeWidget):
             dlg = CommentDialog(comment)
             dlg.exec()
 
-            # detect possible change
-            if shape.comment != dlg.comment:
-                self.sChange.emit(3)
             # store the dialog result
             text = "Details" if dlg.comment else "Add comment"
             item.setText(1, text)
-            shape.comment = dlg.comment
+            if shape.comment != dlg.comment:
+                self.sCommentChanged.emit(shape, dlg.comment)
 
     def handle_item_changed(self, item: QTreeWidgetItem, column: int):
         """this function gets triggered when user clicks the checkbox; set corresponding shapes visible/hidden"""
@@ -155,6 +154,10 @@ class AnnotationTree(QTreeWidget):
                 action = QAction("Delete")
                 action.triggered.connect(lambda: self.delete_item(item))
                 menu.addAction(action)
+                if item.shape():
+                    relabel = QAction("Change Label")
+                    relabel.triggered.connect(lambda: self.sRelabel.emit(item.shape()))
+                    menu.addAction(relabel)
                 menu.exec(pos)
 
     def set_shapes_selected(self, item: QTreeWidgetItem):
@@ -213,16 +216,3 @@ class AnnotationTree(QTreeWidget):
                     if not lbl.isVisible():
                         item.setCheckState(0, Qt.CheckState.Unchecked)
                     child.addChild(item)
-
-
-def create_square_icon(color: QColor, size: int = 10) -> QIcon:
-    pixmap = QPixmap(size, size)
-    painter = QPainter()
-    painter.begin(pixmap)
-    painter.setPen(color)
-    painter.setBrush(color)
-    painter.drawRect(QRect(0, 0, size, size))
-    icon = QIcon(pixmap)
-    painter.end()
-    return icon
-
@@ -0,0 +1,153 @@
+from PyQt6.QtCore import *
+from PyQt6.QtGui import *
+
+from abc import ABCMeta, abstractmethod
+from typing import List, Tuple
+
+from taplt.utils import journal
+
+
+class _CommandMeta(type(QUndoCommand), ABCMeta):
+    """QUndoCommand has the metaclass of sip, so it cannot be combined with ABC directly"""
+
+
+class ShapeCommand(QUndoCommand, metaclass=_CommandMeta):
+    """ base of the undoable edits of the annotations. the commands only hold the ids of the shapes
+    in the AnnotationGroup and what has changed; label dicts are only kept for shapes which do not exist
+    while the command is in its current state (deleted shapes, undone additions)
+    most edits are already applied by the user when they are pushed, the first redo only journals them"""
+    CHANGE = 0  # the kind of change reported to the main window, see LabelingMainWindow.Changes
+
+    def __init__(self, group, text: str, applied: bool = True):
+        super(ShapeCommand, self).__init__(text)
+        self.group = group
+        self.applied = applied
+
+    @abstractmethod
+    def apply(self, forward: bool):
+        """applies the command or its inverse to the shapes"""
+
+    @abstractmethod
+    def record(self, forward: bool) -> Tuple[str, dict]:
+        """returns the journal record (operation, delta) of the command or its inverse"""
+
+    def redo(self):
+        refresh = not self.applied
+        if refresh:
+            self.apply(True)
+        self.applied = False
+        self.group.command_done(self.CHANGE, *self.record(True), refresh=refresh)
+
+    def undo(self):
+        self.apply(False)
+        self.group.command_done(self.CHANGE, *self.record(False), refresh=True)
+
+
+class AddCommand(ShapeCommand):
+    CHANGE = 0
+
+    def __init__(self, group, shape_ids: List[int]):
+        super(AddCommand, self).__init__(group, "Add Annotation")
+        self.shape_ids = shape_ids
+        self.label_dicts = list()  # only while undone
+
+    def apply(self, forward: bool):
+        if forward:
+            for shape_id, label_dict in zip(self.shape_ids, self.label_dicts):
+                self.group.restore_shape(shape_id, label_dict)
+            self.label_dicts = list()
+        else:
+            self.label_dicts = [self.group.take_shape(shape_id) for shape_id in self.shape_ids]
+
+    def record(self, forward: bool) -> Tuple[str, dict]:
+        if forward:
+            return journal.ADD, {"shapes": [[shape_id, self.group.annotations[shape_id].to_dict()[0]]
+                                            for shape_id in self.shape_ids]}
+        return journal.DELETE, {"ids": self.shape_ids}
+
+
+class DeleteCommand(AddCommand):
+    """the inverse of adding shapes, it removes the shapes when it is pushed"""
+    CHANGE = 1
+
+    def __init__(self, group, shape_ids: List[int]):
+        super(DeleteCommand, self).__init__(group, shape_ids)
+        self.setText("Delete Annotation")
+        self.applied = False
+
+    def apply(self, forward: bool):
+        super(DeleteCommand, self).apply(not forward)
+
+    def record(self, forward: bool) -> Tuple[str, dict]:
+        return super(DeleteCommand, self).record(not forward)
+
+
+class MoveCommand(ShapeCommand):
+    CHANGE = 2
+
+    def __init__(self, group, shape_id: int, dx: float, dy: float):
+        super(MoveCommand, self).__init__(group, "Move Annotation")
+        self.shape_id = shape_id
+        self.dx, self.dy = dx, dy
+
+    def apply(self, forward: bool):
+        sign = 1 if forward else -1
+        shape = self.group.annotations[self.shape_id]
+        shape.prepareGeometryChange()
+        shape.vertices.translate(QPointF(sign * self.dx, sign * self.dy))
+        shape.update()
+
+    def record(self, forward: bool) -> Tuple[str, dict]:
+        sign = 1 if forward else -1
+        return journal.MOVE, {"id": self.shape_id, "dx": sign * self.dx, "dy": sign * self.dy}
+
+
+class VertexCommand(ShapeCommand):
+    CHANGE = 2
+
+    def __init__(self, group, shape_id: int, vertices: List[Tuple[int, QPointF, QPointF]]):
+        """vertices: (index, old position, new position) of the moved vertices"""
+        super(VertexCommand, self).__init__(group, "Move Vertex")
+        self.shape_id = shape_id
+        self.vertices = vertices
+
+    def apply(self, forward: bool):
+        shape = self.group.annotations[self.shape_id]
+        shape.prepareGeometryChange()
+        for index, old, new in self.vertices:
+            shape.vertices.vertices[index] = new if forward else old
+        shape.update()
+
+    def record(self, forward: bool) -> Tuple[str, dict]:
+        vertices = [(index, new if forward else old) for index, old, new in self.vertices]
+        return journal.VERTEX, {"id": self.shape_id, "vertices": [[index, p.x(), p.y()] for index, p in vertices]}
+
+
+class LabelCommand(ShapeCommand):
+    CHANGE = 0
+
+    def __init__(self, group, shape_id: int, old: str, new: str):
+        super(LabelCommand, self).__init__(group, "Change Label", applied=False)
+        self.shape_id = shape_id
+        self.old, self.new = old, new
+
+    def apply(self, forward: bool):
+        self.group.set_shape_label(self.group.annotations[self.shape_id], self.new if forward else self.old)
+
+    def record(self, forward: bool) -> Tuple[str, dict]:
+        return journal.LABEL, {"id": self.shape_id, "label": self.new if forward else self.old}
+
+
+class CommentCommand(ShapeCommand):
+    CHANGE = 3
+
+    def __init__(self, group, shape_id: int, old: str, new: str):
+        super(CommentCommand, self).__init__(group, "Edit Comment", applied=False)
+        self.shape_id = shape_id
+        self.old, self.new = old, new
+
+    def apply(self, forward: bool):
+        self.group.annotations[self.shape_id].comment = self.new if forward else self.old
+
+    def record(self, forward: bool) -> Tuple[str, dict]:
+        return journal.COMMENT, {"id": self.shape_id, "comment": self.new if forward else self.old}
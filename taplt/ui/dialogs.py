@@ -4,9 +4,11 @@ from PyQt6.QtGui import *
 
 from typing import List
 from pathlib import Path
+import math
 import os
 
 from taplt.ui.list_widgets import LabelList, SettingList
+from taplt.utils import instrumentation
 from taplt.utils.qt import get_icon
 from taplt.utils.stylesheets import BUTTON_STYLESHEET
 
@@ -114,6 +116,258 @@ class ForgotToSaveMessageBox(QMessageBox):
         if self.parentWidget():
             move_to_center(self, self.parentWidget().pos(), self.parentWidget().size())
 
+class InstrumentationDialog(QDialog):
+    """shows the timings of the instrumented operations as histograms and saves them as a Chrome trace"""
+    COLUMNS = ["Operation", "Calls", "Total [ms]", "Mean [ms]", "p95 [ms]", "Max [ms]", "Histogram (1us - 8s)"]
+    BARS = " \u2581\u2582\u2583\u2584\u2585\u2586\u2587\u2588"
+
+    def __init__(self, *args):
+        super(InstrumentationDialog, self).__init__(*args)
+        self.resize(900, 500)
+        self.setLayout(QVBoxLayout())
+        self.setWindowTitle("Performance Statistics")
+
+        self.enabled = QCheckBox("Record timings")
+        self.enabled.setChecked(instrumentation.is_enabled())
+        self.enabled.toggled.connect(lambda b: instrumentation.enable() if b else instrumentation.disable())
+
+        self.table = QTableWidget(0, len(self.COLUMNS))
+        self.table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.table.verticalHeader().hide()
+        self.table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.ResizeToContents)
+        self.table.horizontalHeader().setStretchLastSection(True)
+
+        self.buttons = QDialogButtonBox(QDialogButtonBox.StandardButton.Close)
+        reset_button = self.buttons.addButton("Reset", QDialogButtonBox.ButtonRole.ResetRole)
+        trace_button = self.buttons.addButton("Save Trace", QDialogButtonBox.ButtonRole.ActionRole)
+        reset_button.clicked.connect(self.reset)
+        trace_button.clicked.connect(self.save_trace)
+        self.buttons.rejected.connect(self.close)
+
+        # the statistics are refreshed while the dialog is open
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.refresh)
+        self.timer.start(1000)
+
+        self.layout().addWidget(self.enabled)
+        self.layout().addWidget(self.table)
+        self.layout().addWidget(self.buttons)
+        self.refresh()
+
+    def refresh(self):
+        statistics = instrumentation.statistics()
+        self.table.setRowCount(len(statistics))
+        for row, (operation, histogram) in enumerate(statistics):
+            peak = max(histogram.buckets)
+            bars = "".join(self.BARS[math.ceil(n / peak * (len(self.BARS) - 1))] for n in histogram.buckets)
+            values = [operation,
+                      str(histogram.count),
+                      "{:.1f}".format(histogram.total / 1e6),
+                      "{:.3f}".format(histogram.mean()),
+                      "{:.3f}".format(histogram.percentile(95)),
+                      "{:.3f}".format(histogram.max / 1e6),
+                      bars]
+            for column, value in enumerate(values):
+                item = QTableWidgetItem(value)
+                if 0 < column < len(values) - 1:
+                    item.setTextAlignment(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
+                self.table.setItem(row, column, item)
+
+    def reset(self):
+        instrumentation.reset()
+        self.refresh()
+
+    def save_trace(self):
+        filepath, _ = QFileDialog.getSaveFileName(self, "Save Trace", str(Path.home() / "trace.json"),
+                                                  "Chrome Trace (*.json)")
+        if filepath:
+            instrumentation.dump_chrome_trace(filepath)
+
+
+class MaintenanceDialog(QDialog):
+    """runs the maintenance operations of the database (see taplt.utils.maintenance) and shows their report,
+    the dialog stays responsive while the operations run in the background"""
+    sRun = pyqtSignal(list, bool)  # operations, whether to delete the annotations of deleted files
+
+    def __init__(self, *args):
+        from taplt.utils.maintenance import OPERATIONS, ORPHANS
+        super(MaintenanceDialog, self).__init__(*args)
+        self.resize(500, 450)
+        self.setLayout(QVBoxLayout())
+        self.setWindowTitle("Database Maintenance")
+
+        self.operations = dict()
+        for operation, description in OPERATIONS.items():
+            self.operations[operation] = QCheckBox(description)
+            self.operations[operation].setChecked(True)
+            self.layout().addWidget(self.operations[operation])
+        self.repair = QCheckBox("Delete the annotations of files which no longer exist")
+        self.operations[ORPHANS].toggled.connect(self.repair.setEnabled)
+        self.layout().addWidget(self.repair)
+
+        self.step = QLabel()
+        self.progress = QProgressBar()
+        self.report = QPlainTextEdit()
+        self.report.setReadOnly(True)
+
+        self.buttons = QDialogButtonBox(QDialogButtonBox.StandardButton.Close)
+        self.run_button = self.buttons.addButton("Run", QDialogButtonBox.ButtonRole.ActionRole)
+        self.run_button.clicked.connect(self.run)
+        self.buttons.rejected.connect(self.close)
+
+        self.layout().addWidget(self.step)
+        self.layout().addWidget(self.progress)
+        self.layout().addWidget(self.report)
+        self.layout().addWidget(self.buttons)
+
+    def run(self):
+        operations = [operation for operation, check_box in self.operations.items() if check_box.isChecked()]
+        if operations:
+            self.run_button.setEnabled(False)
+            self.report.clear()
+            self.sRun.emit(operations, self.repair.isEnabled() and self.repair.isChecked())
+
+    def show_progress(self, done: int, total: int, step: str):
+        """shows the progress of the current operation, a busy indicator if its duration is unknown"""
+        self.step.setText(step)
+        self.progress.setRange(0, total)
+        self.progress.setValue(done)
+
+    def show_report(self, report: list):
+        self.run_button.setEnabled(True)
+        self.step.setText("Done")
+        self.progress.setRange(0, 1)
+        self.progress.setValue(1)
+        self.report.setPlainText("\n".join(report))
+
+
+class SaveConflictMessageBox(QMessageBox):
+    def __init__(self, user: str, *args):
+        super(SaveConflictMessageBox, self).__init__(*args)
+
+        self.overwrite_button = QPushButton(get_icon('save'), "Overwrite")
+        self.reload_button = QPushButton(self.style().standardIcon(QStyle.StandardPixmap.SP_BrowserReload),
+                                         "Discard Mine")
+        self.addButton(self.overwrite_button, QMessageBox.ButtonRole.AcceptRole)
+        self.addButton(self.reload_button, QMessageBox.ButtonRole.DestructiveRole)
+
+        self.setWindowTitle("Conflicting Changes")
+        self.setIcon(QMessageBox.Icon.Warning)
+        self.setText("{} has saved the annotations of this file while you were editing them.".format(
+            user or "Another annotator"))
+        self.setInformativeText("Overwrite their annotations with yours, or discard your changes and load theirs?")
+        if self.parentWidget():
+            move_to_center(self, self.parentWidget().pos(), self.parentWidget().size())
+
+
+class SearchDialog(QDialog):
+    """finds files by the comments and label classes of their annotations, their patient and number of annotations
+    the search runs in the database as the criteria are entered, a double click on a result opens the file"""
+    sSearch = pyqtSignal(dict)  # the criteria, see SQLiteDatabase.search
+    sFileSelected = pyqtSignal(int)  # file uid
+    COLUMNS = ["File", "Patient", "Annotations"]
+
+    def __init__(self, classes: List[str], *args):
+        super(SearchDialog, self).__init__(*args)
+        self.resize(600, 500)
+        self.setWindowTitle("Search Annotations")
+
+        self.text = QLineEdit()
+        self.text.setPlaceholderText("Words in the comments")
+        self.label_class = QComboBox()
+        self.set_classes(classes)
+        self.patient = QLineEdit()
+        self.patient.setPlaceholderText("Any")
+        self.min_annotations = self.count_box()
+        self.max_annotations = self.count_box()
+
+        criteria = QFormLayout()
+        criteria.addRow("Comment", self.text)
+        criteria.addRow("Label class", self.label_class)
+        criteria.addRow("Patient", self.patient)
+        counts = QHBoxLayout()
+        counts.addWidget(self.min_annotations)
+        counts.addWidget(QLabel("to"))
+        counts.addWidget(self.max_annotations)
+        criteria.addRow("Annotations", counts)
+
+        self.results = QTableWidget(0, len(self.COLUMNS))
+        self.results.setHorizontalHeaderLabels(self.COLUMNS)
+        self.results.verticalHeader().hide()
+        self.results.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.results.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.results.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        self.results.cellDoubleClicked.connect(self.result_selected)
+        self.summary = QLabel()
+
+        # the search waits until the user pauses typing
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(250)
+        self.timer.timeout.connect(self.search)
+        self.text.textChanged.connect(self.schedule_search)
+        self.patient.textChanged.connect(self.schedule_search)
+        self.label_class.currentIndexChanged.connect(self.schedule_search)
+        self.min_annotations.valueChanged.connect(self.schedule_search)
+        self.max_annotations.valueChanged.connect(self.schedule_search)
+
+        self.setLayout(QVBoxLayout())
+        self.layout().addLayout(criteria)
+        self.layout().addWidget(self.results)
+        self.layout().addWidget(self.summary)
+
+    @staticmethod
+    def count_box() -> QSpinBox:
+        box = QSpinBox()
+        box.setRange(-1, 1000000)
+        box.setValue(-1)
+        box.setSpecialValueText("Any")
+        return box
+
+    def criteria(self) -> dict:
+        criteria = {'text': self.text.text()}
+        if self.label_class.currentIndex() > 0:
+            criteria['label_class'] = self.label_class.currentText()
+        if self.patient.text().strip():
+            criteria['patient'] = self.patient.text().strip()
+        if self.min_annotations.value() >= 0:
+            criteria['min_annotations'] = self.min_annotations.value()
+        if self.max_annotations.value() >= 0:
+            criteria['max_annotations'] = self.max_annotations.value()
+        return criteria
+
+    def result_selected(self, row: int, _):
+        self.sFileSelected.emit(self.results.item(row, 0).data(Qt.ItemDataRole.UserRole))
+
+    def schedule_search(self, *_):
+        self.timer.start()
+
+    def search(self):
+        self.sSearch.emit(self.criteria())
+
+    def set_classes(self, classes: List[str]):
+        """updates the label classes to choose from, keeping the selected one"""
+        selected = self.label_class.currentText()
+        self.label_class.blockSignals(True)
+        self.label_class.clear()
+        self.label_class.addItems(["Any"] + classes)
+        self.label_class.setCurrentIndex(max(self.label_class.findText(selected), 0))
+        self.label_class.blockSignals(False)
+
+    def show_results(self, results: list):
+        """displays the results, (file uid, modality, filename, patient id, number of annotations) per file"""
+        self.results.setRowCount(len(results))
+        for row, (file_uid, _, filename, patient, annotations) in enumerate(results):
+            item = QTableWidgetItem(filename)
+            item.setData(Qt.ItemDataRole.UserRole, file_uid)
+            self.results.setItem(row, 0, item)
+            self.results.setItem(row, 1, QTableWidgetItem(str(patient)))
+            count = QTableWidgetItem("{:,}".format(annotations))
+            count.setTextAlignment(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
+            self.results.setItem(row, 2, count)
+        self.summary.setText("{:,} files".format(len(results)))
+
 
 class SelectionDialog(QDialog):
     """ a dialog that provides (a) a list with items where user can select from and search in
@@ -435,6 +689,47 @@ class SettingDialog(QDialog):
         self.close()
 
 
+class StatisticsDialog(QDialog):
+    """shows the number of annotations per label class, patient and file, see SQLiteDatabase.get_statistics"""
+
+    def __init__(self, statistics: dict, *args):
+        super(StatisticsDialog, self).__init__(*args)
+        self.resize(500, 500)
+        self.setLayout(QVBoxLayout())
+        self.setWindowTitle("Project Statistics")
+
+        lines = ["{:,} annotations".format(statistics['annotations'])]
+        lines += ["{}: {:,} of {:,} files annotated".format(modality.capitalize(), annotated, files)
+                  for modality, files, annotated in statistics['modalities'] if files]
+        self.summary = QLabel("\n".join(lines))
+
+        self.tabs = QTabWidget()
+        self.tabs.addTab(self.table(["Label Class", "Annotations"], statistics['labels']), "Labels")
+        self.tabs.addTab(self.table(["Patient", "Annotations"], statistics['patients']), "Patients")
+        self.tabs.addTab(self.table(["File", "Annotations"], statistics['files']), "Most Annotated Files")
+
+        self.buttons = QDialogButtonBox(QDialogButtonBox.StandardButton.Close)
+        self.buttons.rejected.connect(self.close)
+
+        self.layout().addWidget(self.summary)
+        self.layout().addWidget(self.tabs)
+        self.layout().addWidget(self.buttons)
+
+    @staticmethod
+    def table(headers: List[str], rows: list) -> QTableWidget:
+        table = QTableWidget(len(rows), len(headers))
+        table.setHorizontalHeaderLabels(headers)
+        table.verticalHeader().hide()
+        table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        for row, (name, count) in enumerate(rows):
+            table.setItem(row, 0, QTableWidgetItem(str(name)))
+            item = QTableWidgetItem("{:,}".format(count))
+            item.setTextAlignment(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
+            table.setItem(row, 1, item)
+        return table
+
+
 def move_to_center(widget, parent_pos: QPoint, parent_size: QSize):
     # TODO: implement move_to_center somewhere else, so the dialogs don't have to demand a parent widget
     r"""Moves the QDialog to the center of the parent Widget.
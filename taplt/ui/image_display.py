@@ -2,9 +2,14 @@ from PyQt6.QtWidgets import *
 from PyQt6.QtCore import *
 from PyQt6.QtGui import *
 
+from typing import Union
+
+from taplt.ui.image_loader import ImageLoader, level_for_scale
 from taplt.ui.image_viewer import ImageViewer
 from taplt.ui.annotation_group import AnnotationGroup
 from taplt.ui.shape import Shape
+from taplt.ui.video_controls import VideoControls
+from taplt.utils.instrumentation import timed
 from taplt.utils.qt import get_icon
 
 
@@ -26,6 +31,20 @@ class CenterDisplayWidget(QWidget):
 
         self.pixmap = QGraphicsPixmapItem()
         self.scene.addItem(self.pixmap)
+
+        # downsampled versions of large images: the displayed level depends on the zoom,
+        # the pixmap item is scaled so scene coordinates always refer to the full resolution
+        self.pyramid_dir = ""
+        self.levels = list()  # paths of the pyramid levels, level 0 is the image itself
+        self.level = 0
+        self.requested_level = -1  # the level which is currently decoded
+        self.finest_level = 0  # finer levels exceed Qt's image allocation limit
+
+        # images are decoded in the background, a placeholder is displayed until they are ready
+        self.loader = ImageLoader()
+        self.request = 0
+        self.placeholder = QPixmap(16, 16)
+        self.placeholder.fill(QColor(186, 189, 182))
         self.annotations = AnnotationGroup()
         self.scene.addItem(self.annotations)
 
@@ -33,6 +52,10 @@ class CenterDisplayWidget(QWidget):
         self.patient_label = QLabel()
         self.patient_label.setContentsMargins(10, 0, 10, 0)
 
+        # frame navigation, only visible when displaying a video
+        self.video_controls = VideoControls()
+        self.video_controls.setHidden(True)
+
         self.hide_button = QPushButton(get_icon("next"), "", self)
         self.hide_button.setGeometry(0, 0, 40, 40)
 
@@ -40,8 +63,13 @@ class CenterDisplayWidget(QWidget):
         self.image_viewer.setFrameShape(QFrame.Shape.NoFrame)
         self.layout = QVBoxLayout(self)
         self.layout.addWidget(self.image_viewer)
+        self.layout.addWidget(self.video_controls)
         self.layout.addWidget(self.patient_label)
 
+        self.image_viewer.sScaleChanged.connect(self.select_level)
+        self.loader.sPyramidReady.connect(self.pyramid_ready)
+        self.loader.sImageDecoded.connect(self.image_decoded)
+
     def mousePressEvent(self, event: QMouseEvent):
         if self.annotations.mode == AnnotationGroup.AnnotationMode.DRAW:
             if event.button() == Qt.MouseButton.LeftButton:
@@ -51,24 +79,54 @@ class CenterDisplayWidget(QWidget):
     def clear(self):
         """This function deletes all currently stored labels
         and triggers the image_viewer to display a default image"""
+        self.loader.cancel()
         self.scene.b_isInitialized = False
         self.image_viewer.b_isEmpty = True
         self.scene.clear()
         self.set_labels([])
 
     def get_pixmap_dimensions(self):
-        return [self.pixmap.pixmap().width(), self.pixmap.pixmap().height()]
-
-    def init_image(self, filepath: str, patient: str, labels: list, classes: list):
-        """initializes the pixmap to display the image in the center widget
+        return [self.image_size.width(), self.image_size.height()]
+
+    @timed()
+    def image_decoded(self, request: int, requested_level: int, level: int, image: QImage):
+        """swaps in an image decoded by the loader, unless another image was opened in the meantime"""
+        if request != self.request:
+            return
+        if level > requested_level:
+            self.finest_level = level
+        if requested_level == self.requested_level:
+            self.requested_level = -1
+        self.show_pixmap(QPixmap.fromImage(image), level)
+
+        # the zoom might have changed while the image was decoded
+        if self.requested_level == -1:
+            self.select_level(self.image_viewer.transform().m11())
+
+    @timed()
+    def init_image(self, image: Union[str, QImage], patient: str, labels: list, classes: list,
+                   fit_in_view: bool = True):
+        """initializes the pixmap to display the image (a filepath or a decoded video frame) in the center widget
+        files are decoded in the background - a placeholder is shown until then
+        keeps the current zoom if fit_in_view is False, e.g. when stepping through the frames of a video
         return the current labels as shape objects"""
         self.set_initialized()
         self.annotations.classes = classes
-
-        pixmap = QPixmap(filepath)
-        self.image_size = pixmap.size()
-        self.pixmap.setPixmap(pixmap)
-
+        self.request = self.loader.cancel()
+        self.levels = list()
+        self.requested_level = -1
+        self.finest_level = 0
+
+        if isinstance(image, QImage):
+            self.image_size = image.size()
+            self.show_pixmap(QPixmap.fromImage(image), 0)
+        else:
+            # only the header is read to get the size of the image
+            size = QImageReader(image).size()
+            self.image_size = size if size.isValid() else QSize(0, 0)
+            self.show_pixmap(self.placeholder, 0)
+
+        self.annotations.image_size = self.image_size
         labels = [Shape(image_size=self.image_size,
                         label_dict=_label,
                         color=self.annotations.get_color_for_label(_label['label']))
@@ -76,8 +134,11 @@ class CenterDisplayWidget(QWidget):
 
         self.annotations.update_annotations(labels)
         self.hide_button.raise_()
-        rect = QRectF(QPointF(0, 0), QSizeF(self.image_size))
-        self.image_viewer.fitInView(rect)
+        if fit_in_view:
+            rect = QRectF(QPointF(0, 0), QSizeF(self.image_size))
+            self.image_viewer.fitInView(rect)
+        if isinstance(image, str):
+            self.request = self.loader.open(image, self.pyramid_dir, self.image_viewer.transform().m11())
 
         self.patient_label.setText(patient)
         return labels
@@ -85,6 +146,30 @@ class CenterDisplayWidget(QWidget):
     def is_empty(self):
         return self.image_viewer.b_isEmpty
 
+    def pyramid_ready(self, request: int, levels: list):
+        if request == self.request:
+            self.levels = levels
+
+    def select_level(self, scale: float):
+        """displays the coarsest pyramid level which still has at least one pixel per screen pixel"""
+        if not self.levels or scale <= 0:
+            return
+        level = max(level_for_scale(scale, len(self.levels)), self.finest_level)
+        if level != self.level and level != self.requested_level:
+            self.set_level(level)
+
+    def set_level(self, level: int):
+        """requests the given pyramid level, it is displayed as soon as it is decoded"""
+        self.requested_level = level
+        self.loader.load_level(self.request, self.levels, level)
+
+    def show_pixmap(self, pixmap: QPixmap, level: int):
+        """displays the pixmap scaled up to the full resolution"""
+        self.level = level
+        self.pixmap.setPixmap(pixmap)
+        self.pixmap.setTransform(QTransform.fromScale(self.image_size.width() / max(pixmap.width(), 1),
+                                                      self.image_size.height() / max(pixmap.height(), 1)))
+
     def set_initialized(self):
         self.scene.b_isInitialized = True
         self.image_viewer.b_isEmpty = False
@@ -0,0 +1,98 @@
+from PyQt6.QtCore import *
+from PyQt6.QtGui import *
+
+import math
+
+from taplt.utils.instrumentation import span
+from taplt.utils.thumbnails import image_pyramid
+
+
+def level_for_scale(scale: float, level_count: int) -> int:
+    """returns the coarsest pyramid level which still has at least one pixel per screen pixel"""
+    if scale <= 0:
+        return level_count - 1
+    return min(max(int(math.floor(math.log2(1 / scale))), 0), level_count - 1)
+
+
+class ImageLoader(QObject):
+    """ decodes images in a thread pool, so that the GUI stays responsive while large images are loaded
+    every opened image is a new request; the results of previous requests are dropped, and their tasks
+    are removed from the pool unless they are running already"""
+    sPyramidReady = pyqtSignal(int, list)  # request, paths of the pyramid levels (level 0 is the image itself)
+    sImageDecoded = pyqtSignal(int, int, int, QImage)  # request, requested level, decoded level, image
+
+    def __init__(self, threads: int = 2):
+        super(ImageLoader, self).__init__()
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(threads)
+        self.request = 0
+
+    def cancel(self) -> int:
+        """drops all pending tasks and returns the id of the next request"""
+        self.request += 1
+        self.pool.clear()
+        return self.request
+
+    def is_current(self, request: int) -> bool:
+        return request == self.request
+
+    def load_level(self, request: int, levels: list, level: int):
+        """decodes a level of the pyramid of the current image"""
+        self.pool.start(LevelTask(self, request, levels, level))
+
+    def open(self, filepath: str, pyramid_dir: str = "", scale: float = 1.0) -> int:
+        """starts loading a new image: the pyramid is created if the image is large, a low resolution preview
+        is decoded first and the pyramid level which fits the scale of the view afterwards"""
+        request = self.cancel()
+        self.pool.start(OpenTask(self, request, filepath, pyramid_dir, scale))
+        return request
+
+    def wait(self, msecs: int = -1) -> bool:
+        return self.pool.waitForDone(msecs)
+
+
+class LevelTask(QRunnable):
+    def __init__(self, loader: ImageLoader, request: int, levels: list, level: int):
+        super(LevelTask, self).__init__()
+        self.loader = loader
+        self.request = request
+        self.levels = levels
+        self.level = level
+
+    def decode(self, level: int):
+        """decodes the level - or, if it exceeds Qt's image allocation limit, the finest coarser level possible"""
+        requested = level
+        with span("ImageLoader.decode"):
+            image = QImageReader(self.levels[level]).read()
+            while image.isNull() and level < len(self.levels) - 1:
+                level += 1
+                image = QImageReader(self.levels[level]).read()
+        if self.loader.is_current(self.request):
+            self.loader.sImageDecoded.emit(self.request, requested, level, image)
+
+    def run(self):
+        if self.loader.is_current(self.request):
+            self.decode(self.level)
+
+
+class OpenTask(LevelTask):
+    def __init__(self, loader: ImageLoader, request: int, filepath: str, pyramid_dir: str, scale: float):
+        super(OpenTask, self).__init__(loader, request, [filepath], 0)
+        self.pyramid_dir = pyramid_dir
+        self.scale = scale
+
+    def run(self):
+        if self.pyramid_dir:
+            with span("ImageLoader.pyramid"):
+                _, levels = image_pyramid(self.levels[0], self.pyramid_dir)
+            self.levels += levels
+        if not self.loader.is_current(self.request):
+            return
+        if len(self.levels) > 1:
+            self.loader.sPyramidReady.emit(self.request, self.levels)
+        level = level_for_scale(self.scale, len(self.levels))
+        if level < len(self.levels) - 1:
+            # the coarsest level is decoded quickly and displayed until the finer one is ready
+            self.decode(len(self.levels) - 1)
+        if self.loader.is_current(self.request):
+            self.decode(level)
@@ -2,9 +2,12 @@ from PyQt6.QtWidgets import *
 from PyQt6.QtGui import *
 from PyQt6.QtCore import *
 
+from taplt.utils.instrumentation import span
+
 
 class ImageViewer(QGraphicsView):
     sNextFile = pyqtSignal(int)
+    sScaleChanged = pyqtSignal(float)  # scale of the view's transform
 
     def __init__(self, *args):
         super(ImageViewer, self).__init__(*args)
@@ -31,6 +34,12 @@ class ImageViewer(QGraphicsView):
                 factor = min(view_rect.width() / scene_rect.width(),
                              view_rect.height() / scene_rect.height())
                 self.scale(factor, factor)
+                self.sScaleChanged.emit(self.transform().m11())
+
+    def paintEvent(self, event: QPaintEvent) -> None:
+        # measured once per frame rather than per shape, the shapes are painted thousands of times per frame
+        with span("ImageViewer.paint"):
+            super(ImageViewer, self).paintEvent(event)
 
     def resizeEvent(self, event: QResizeEvent) -> None:
         bounds = self.scene().itemsBoundingRect()
@@ -42,6 +51,7 @@ class ImageViewer(QGraphicsView):
             if self._enableZoomPan:
                 factor = self._scaling_factor if event.angleDelta().y() > 0 else 1/self._scaling_factor
                 self.scale(factor, factor)
+                self.sScaleChanged.emit(self.transform().m11())
 
     def keyPressEvent(self, event) -> None:
         if not self.b_isEmpty:
@@ -6,27 +6,128 @@ import os
 from typing import List
 
 from taplt.ui.shape import Shape
+from taplt.utils.filters import FilterError, compile_filter
 from taplt.utils.qt import createListWidgetItemWithSquareIcon, get_icon
 from taplt.utils.stylesheets import TAB_STYLESHEET, SETTING_STYLESHEET
 
 
-class FileList(QListWidget):
-    """ a list widget subclass to make use of context menu"""
+FETCH_SIZE = 200  # files requested from the database at once while scrolling through a filtered list
+FILTER_DELAY = 250  # ms after the last keystroke before the filter is applied
+
+
+class FileListModel(QAbstractListModel):
+    """ list model of the files of a modality. without a filter it lists the files it was given,
+    a filtered list is fetched from the database page by page, as the view is scrolled"""
+    sFetch = pyqtSignal(int, str, int, int)  # modality, filter expression, sort key of the last listed file, count
+
+    def __init__(self, modality: int):
+        super(FileListModel, self).__init__()
+        self.modality = modality
+        self.files = list()  # [filepath, populated, file uid, content hash] of all files of the modality
+        self.file_of_uid = dict()  # file uid -> file
+        self.rows = list()  # the listed files, a subset of the files if a filter is set
+        self.row_of_uid = dict()  # file uid -> row
+        self.expression = ""
+        self.after = -1  # sort key of the last fetched file
+        self.complete = True
+        self.show_check_box = False
+
+    def add_files(self, expression: str, files: list):
+        """ appends a page of filtered files (see SQLiteDatabase.filter_files)"""
+        if expression != self.expression or self.complete:
+            return  # the filter has changed in the meantime
+        self.complete = len(files) < FETCH_SIZE
+        if files:
+            self.beginInsertRows(QModelIndex(), len(self.rows), len(self.rows) + len(files) - 1)
+            for filepath, populated, file_uid, content_hash, sort_key in files:
+                self.row_of_uid[file_uid] = len(self.rows)
+                self.rows.append([filepath, populated, file_uid, content_hash])
+            self.after = files[-1][4]
+            self.endInsertRows()
+
+    def canFetchMore(self, parent: QModelIndex = QModelIndex()) -> bool:
+        return not parent.isValid() and not self.complete
+
+    def data(self, index: QModelIndex, role: int = Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        filepath, populated, file_uid, _ = self.rows[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            return os.path.basename(filepath)
+        elif role == Qt.ItemDataRole.DecorationRole:
+            return get_icon("checked") if self.show_check_box and populated else None
+        elif role == Qt.ItemDataRole.UserRole:
+            return file_uid
+        elif role == Qt.ItemDataRole.UserRole + 1:
+            return populated
+        return None
+
+    def fetchMore(self, parent: QModelIndex = QModelIndex()):
+        if self.canFetchMore(parent):
+            self.sFetch.emit(self.modality, self.expression, self.after, FETCH_SIZE)
+
+    def fetch_all(self):
+        while self.canFetchMore():
+            self.fetchMore()
+
+    def row_of(self, file_uid: int) -> int:
+        return self.row_of_uid.get(file_uid, -1)
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.rows)
+
+    def set_files(self, files: list):
+        """ replaces the files of the modality; a filtered list is fetched again"""
+        self.files = [list(file[:4]) for file in files]
+        self.file_of_uid = {file[2]: file for file in self.files}
+        self.set_filter(self.expression)
+
+    def set_filter(self, expression: str):
+        """ lists the files matching the filter expression (see taplt.utils.filters), all files if it is empty"""
+        self.beginResetModel()
+        self.expression = expression
+        self.rows = self.files if not expression else list()
+        self.row_of_uid = {file[2]: row for row, file in enumerate(self.rows)}
+        self.after = -1
+        self.complete = not expression
+        self.endResetModel()
+        self.fetchMore()
+
+    def set_populated(self, file_uid: int, populated: bool):
+        if file_uid in self.file_of_uid:
+            self.file_of_uid[file_uid][1] = populated
+        row = self.row_of(file_uid)
+        if row != -1:
+            self.rows[row][1] = populated
+            index = self.index(row)
+            self.dataChanged.emit(index, index, [Qt.ItemDataRole.DecorationRole])
+
+    def set_show_check_box(self, show: bool):
+        self.show_check_box = show
+        if self.rows:
+            self.dataChanged.emit(self.index(0), self.index(len(self.rows) - 1), [Qt.ItemDataRole.DecorationRole])
+
+
+class FileList(QListView):
+    """ a list view of the files of a modality, with a context menu"""
     sDeleteFile = pyqtSignal(str)
 
-    def __init__(self):
+    def __init__(self, modality: int):
         super(FileList, self).__init__()
+        self.file_model = FileListModel(modality)
+        self.setModel(self.file_model)
         self.setIconSize(QSize(11, 11))
+        self.setUniformItemSizes(True)
         self.setContentsMargins(0, 0, 0, 0)
         self.setFrameShape(QFrame.Shape.NoFrame)
-        self.setItemAlignment(Qt.AlignmentFlag.AlignLeft)
+        self.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
 
     def contextMenuEvent(self, event: QContextMenuEvent) -> None:
-        item = self.itemAt(event.pos())
-        if item:
+        index = self.indexAt(event.pos())
+        if index.isValid():
             menu = QMenu()
             action = QAction("Delete")
-            action.triggered.connect(lambda: self.sDeleteFile.emit(item.text()))
+            action.triggered.connect(lambda: self.sDeleteFile.emit(index.data(Qt.ItemDataRole.DisplayRole)))
             menu.addAction(action)
             menu.exec(event.globalPos())
 
@@ -83,10 +184,10 @@ class LabelsViewingWidget(QWidget):
 
 
 class FileViewingWidget(QWidget):
-    """ holds a QTabWidget to be able to display both images and whole slide images"""
-    itemClicked = pyqtSignal(QListWidgetItem)
+    """ holds a QTabWidget to be able to display images, videos and whole slide images"""
     sRequestFileChange = pyqtSignal(int)
     sDeleteFile = pyqtSignal(str)
+    sFetchFiles = pyqtSignal(int, str, int, int)  # modality, filter expression, sort key of the last listed file, count
 
     def __init__(self):
         super(FileViewingWidget, self).__init__()
@@ -121,62 +222,103 @@ class FileViewingWidget(QWidget):
         self.search_field.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
         self.search_field.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
         self.search_field.setCursorWidth(1)
-        self.search_field.setPlaceholderText("Search Filename")
+        self.search_field.setPlaceholderText("Filter, e.g. label:tumor and annotations > 50")
         self.search_field.setObjectName("fileSearch")
         self.layout().addWidget(self.search_field)
 
-        self.image_list = FileList()
-        self.wsi_list = FileList()
-        self.show_check_box = False
+        self.image_list = FileList(1)
+        self.video_list = FileList(0)
+        self.wsi_list = FileList(2)
+        self.file_lists = [self.video_list, self.image_list, self.wsi_list]  # indexed by the modality value
 
         self.tab.addTab(self.image_list, 'Images')
+        self.tab.addTab(self.video_list, 'Videos')
         self.tab.addTab(self.wsi_list, 'WSI')
         self.layout().addWidget(self.tab)
 
-        self.image_list.itemClicked.connect(self.file_selected)
-        self.image_list.sDeleteFile.connect(self.sDeleteFile.emit)
-        self.search_field.textChanged.connect(self.search_text_changed)
+        # the filter is applied once the user stops typing
+        self.filter_timer = QTimer(self)
+        self.filter_timer.setSingleShot(True)
+        self.filter_timer.setInterval(FILTER_DELAY)
+        self.filter_timer.timeout.connect(self.apply_filter)
+
+        for file_list in self.file_lists:
+            file_list.clicked.connect(self.file_selected)
+            file_list.sDeleteFile.connect(self.sDeleteFile.emit)
+            file_list.file_model.sFetch.connect(self.sFetchFiles.emit)
+        self.search_field.textChanged.connect(self.filter_timer.start)
 
-    def file_selected(self):
-        """gets the index of the selected file and emits a signal"""
-        idx2 = self.image_list.currentRow()
-        self.sRequestFileChange.emit(idx2)
+    def add_files(self, modality: int, expression: str, files: list):
+        """ appends a page of filtered files to the list of the modality"""
+        self.file_lists[modality].file_model.add_files(expression, files)
+
+    def apply_filter(self):
+        """ filters the lists by the expression in the search field, an invalid expression is marked"""
+        expression = self.search_field.toPlainText().strip()
+        try:
+            compile_filter(expression)
+        except FilterError as error:
+            self.search_field.setStyleSheet("QTextEdit { color: rgb(204, 0, 0); }")
+            self.search_field.setToolTip(str(error))
+            return
+        self.search_field.setStyleSheet("")
+        self.search_field.setToolTip("")
+        for file_list in self.file_lists:
+            file_list.file_model.set_filter(expression)
+
+    def file_selected(self, index: QModelIndex):
+        """gets the uid of the selected file and emits a signal"""
+        self.sRequestFileChange.emit(index.data(Qt.ItemDataRole.UserRole))
+
+    def get_file_uid(self, row: int) -> int:
+        """ returns the uid of the image displayed in the given row / -1 if the row does not exist"""
+        model = self.image_list.file_model
+        return model.rows[row][2] if 0 <= row < model.rowCount() else -1
 
     def get_img_idx(self, filename: str) -> int:
-        """ searches through the ListWidget and returns the index of the item with the filename / -1 if not found"""
-        for i in range(self.image_list.count()):
-            item = self.image_list.item(i)
-            if item.text() == filename:
-                return i
+        """ searches through the listed images and returns the row of the image with the filename / -1 if not found"""
+        for row, file in enumerate(self.image_list.file_model.rows):
+            if os.path.basename(file[0]) == filename:
+                return row
         return -1
 
-    def update_list(self, files: list, img_idx: int):
-        """ clears the list widget and fills it again with the provided filenames"""
-        self.image_list.clear()
-        for file in files:
-            filename = os.path.basename(file[0])
-
-            # display check box if image is populated with at least 1 annotation
-            if self.show_check_box and file[1]:
-                icon = get_icon("checked")
-                item = QListWidgetItem(icon, filename)
-            else:
-                item = QListWidgetItem(filename)
-            self.image_list.addItem(item)
-        if self.image_list.count() > 0:
-            self.image_list.setCurrentRow(img_idx)
-
-    def search_text_changed(self):
-        """ filters the list regarding the user input in the search field"""
-        cur_text = self.search_field.toPlainText()
-        cur_list = self.tab.currentWidget()
-
-        for idx in range(cur_list.count()):
-            item = cur_list.item(idx)
-            if cur_text not in item.text():
-                item.setHidden(True)
-            else:
-                item.setHidden(False)
+    def get_neighbour_image(self, file_uid: int, direction: int) -> int:
+        """ returns the uid of the next/previous listed image, the list wraps around / -1 if no image is listed"""
+        model = self.image_list.file_model
+        row = model.row_of(file_uid)
+        row = row + direction if row != -1 else 0
+        if row >= model.rowCount():
+            model.fetchMore()
+        if row < 0:
+            model.fetch_all()
+        return self.get_file_uid(row % model.rowCount()) if model.rowCount() else -1
+
+    def select_file(self, file_uid: int):
+        """ marks the file as the current one if it is listed"""
+        for file_list in self.file_lists:
+            row = file_list.file_model.row_of(file_uid)
+            if row != -1:
+                file_list.setCurrentIndex(file_list.file_model.index(row))
+                self.tab.setCurrentWidget(file_list)
+                return
+
+    def set_file_state(self, file_uid: int, populated: bool):
+        """ updates whether the given file is populated with at least 1 annotation"""
+        for file_list in self.file_lists:
+            file_list.file_model.set_populated(file_uid, populated)
+
+    def set_show_check_box(self, show: bool):
+        """ displays or hides the check boxes marking populated files"""
+        for file_list in self.file_lists:
+            file_list.file_model.set_show_check_box(show)
+
+    def update_list(self, files: list, file_uid: int, modality: int = 1):
+        """ replaces the files of the modality, given as (filepath, populated, file uid, content hash)"""
+        file_list = self.file_lists[modality]
+        file_list.file_model.set_files(files)
+        row = file_list.file_model.row_of(file_uid)
+        if file_list.file_model.rowCount() > 0:
+            file_list.setCurrentIndex(file_list.file_model.index(max(row, 0)))
 
 
 class SettingList(QListWidget):
@@ -4,20 +4,17 @@ from PyQt6.QtCore import *
 from pathlib import Path
 from dataclasses import dataclass
 
-from taplt.ui.image_display import CenterDisplayWidget
-from taplt.ui.toolbar import Toolbar
-from taplt.ui.dialogs import (SelectPatientDialog, CloseMessageBox, DeleteFileMessageBox,
-                              ForgotToSaveMessageBox, SettingDialog, ProjectHandlerDialog)
 from taplt.ui.menu_bar import MenuBar
-from taplt.ui.list_widgets import FileViewingWidget, LabelsViewingWidget
-from taplt.ui.annotation_tree import AnnotationTree
 from taplt.ui.welcome_screen import WelcomeScreen
-from taplt.utils.qt import colormap_rgb, get_icon
+from taplt.utils.colors import ColorRegistry
+from taplt.utils.instrumentation import timed
+from taplt.utils.qt import get_icon
 from taplt.utils.project_structure import check_environment, Structure
+from taplt.utils.video import VideoIndex, VideoReader
 from taplt.macros.macros import Macros
-from taplt.macros.macros_dialogs import PreviewDatabaseDialog
 
-NUM_COLORS = 25
+# the project widgets and dialogs (and with them NumPy) are imported when they are first needed,
+# so the welcome screen appears quickly
 
 
 class LabelingMainWindow(QMainWindow):
@@ -27,12 +24,23 @@ class LabelingMainWindow(QMainWindow):
     sOpenProject = pyqtSignal(str)
     sAddPatient = pyqtSignal(str)
     sAddFile = pyqtSignal(str, str)
-    sRequestUpdate = pyqtSignal(int)
+    sRequestUpdate = pyqtSignal(int)  # file uid
+    sRequestFrame = pyqtSignal(int, int)  # file uid, frame
     sRequestCheckForChanges = pyqtSignal(int, int)
-    sSaveToDatabase = pyqtSignal(list, int)
-    sDeleteFile = pyqtSignal(str, int)
+    sSaveToDatabase = pyqtSignal(list, int, int)  # shapes, file uid, frame
+    sForceSave = pyqtSignal(list, int, int)  # shapes, file uid, frame - overwrites the changes of other annotators
+    sDeleteFile = pyqtSignal(str, int)  # filename, uid of the current file
     sUpdateSettings = pyqtSignal(list)
     sDisconnect = pyqtSignal()
+    sStoreFileHash = pyqtSignal(int, str)  # file uid, content hash
+    sJournalRecord = pyqtSignal(int, int, str, str)  # file uid, frame, operation, delta as JSON
+    sDiscardJournal = pyqtSignal(int, int)  # file uid, frame
+    sSearch = pyqtSignal(dict)  # the criteria, see SQLiteDatabase.search
+    sFetchFiles = pyqtSignal(int, str, int, int)  # modality, filter expression, sort key of the last listed file, count
+    sNextQueued = pyqtSignal(int)  # uid of the current file, which is completed
+    sQueueImages = pyqtSignal(str)  # filter expression of the images
+    sCreateSnapshot = pyqtSignal(str)  # backup directory
+    sMaintenance = pyqtSignal(list, bool)  # operations, whether to delete the annotations of deleted files
 
     @dataclass
     class Changes:
@@ -63,50 +71,28 @@ class LabelingMainWindow(QMainWindow):
         self.center_frame.layout().setSpacing(0)
 
         self.welcome_screen = WelcomeScreen()
-        self.image_display = CenterDisplayWidget()
 
         # default widget when no images exist in the project
         self.no_files = QLabel()
         self.no_files.setText("No files to display")
         self.no_files.setAlignment(Qt.AlignmentFlag.AlignCenter)
 
-        self.center_frame.layout().addWidget(self.image_display)
         self.center_frame.layout().addWidget(self.no_files)
         self.center_frame.layout().addWidget(self.welcome_screen)
-
-        # Right Menu
-        self.right_menu_widget = QWidget()
-        self.right_menu_widget.setMaximumWidth(200)
-        self.right_menu_widget.setLayout(QVBoxLayout())
-        self.right_menu_widget.layout().setContentsMargins(0, 0, 0, 0)
-        self.right_menu_widget.layout().setSpacing(0)
-
-        # the label, polygons and file lists
-        self.labels_list = LabelsViewingWidget()
-        self.polygons = AnnotationTree()
-        self.file_list = FileViewingWidget()
-
-        # widget for the polygons
-        self.poly_widget = QWidget()
-        self.poly_widget.setMinimumSize(QSize(0, 300))
-        self.poly_widget.setLayout(QVBoxLayout())
-        self.poly_widget.layout().setContentsMargins(0, 0, 0, 0)
-        self.poly_widget.layout().setSpacing(0)
-        self.poly_label = QLabel(self)
-        self.poly_label.setStyleSheet("background-color: rgb(186, 189, 182);")
-        self.poly_label.setText("Polygons")
-        self.poly_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        self.poly_widget.layout().addWidget(self.poly_label)
-        self.poly_widget.layout().addWidget(self.polygons)
-
-        self.right_menu_widget.layout().addWidget(self.labels_list)
-        self.right_menu_widget.layout().addWidget(self.poly_widget)
-        self.right_menu_widget.layout().addWidget(self.file_list)
-
         self.main_widget.layout().addWidget(self.center_frame)
-        self.main_widget.layout().addWidget(self.right_menu_widget)
         self.setCentralWidget(self.main_widget)
 
+        # project widgets, created by init_project_widgets once a project is opened
+        self.image_display = None
+        self.thumbnail_cache = None
+        self.thumbnail_grid = None
+        self.right_menu_widget = None
+        self.labels_list = None
+        self.polygons = None
+        self.file_list = None
+        self.toolBar = None
+        self.show_thumbnails = False
+
         self.menubar = MenuBar(self)
         self.setMenuBar(self.menubar)
         self.menubar.setVisible(True)
@@ -114,31 +100,22 @@ class LabelingMainWindow(QMainWindow):
         self.statusbar = QStatusBar()
         self.setStatusBar(self.statusbar)
 
-        self.toolBar = Toolbar(self)
-        self.addToolBar(Qt.ToolBarArea.LeftToolBarArea, self.toolBar)
-        self.toolBar.init_margins()
-        self.toolBar.init_actions(self)
-
         # TODO: if possible, get rid of such variables
-        self.img_idx = 0
+        self.file_uid = -1
+        self.frame = 0
+        self.video_reader = None  # type: VideoReader
+        self.classes = list()
+        self.colors = ColorRegistry()  # shared with the annotations
         self.changes = list()
         self.autoSave = False
+        self.search_dialog = None
+        self.maintenance_dialog = None
+        self.work_queue = (0, 0, 0)  # files of the work queue which are open, claimed by the user, done
 
         self.macros = Macros()
         self.set_welcome_screen(True)
 
         # connect signals
-        self.image_display.sRequestSave.connect(self.save_to_database)
-        self.image_display.image_viewer.sNextFile.connect(self.next_image)
-        self.image_display.annotations.updateShapes.connect(self.polygons.update_polygons)
-        self.image_display.annotations.shapeSelected.connect(self.polygons.shape_selected)
-        self.image_display.annotations.sChange.connect(self.change_detected)
-        self.file_list.sDeleteFile.connect(self.delete_file)
-        self.file_list.sRequestFileChange.connect(self.file_list_item_clicked)
-        self.polygons.sItemsDeleted.connect(self.image_display.annotations.remove_shapes)
-        self.polygons.sDeselectAll.connect(self.image_display.annotations.deselect_all)
-        self.polygons.sChange.connect(self.change_detected)
-        self.toolBar.sSetDrawingMode.connect(self.image_display.annotations.set_mode)
         self.macros.sEnableTools.connect(self.menubar.enable_tools)
         self.macros.sNewProject.connect(self.sCreateNewProject.emit)
         self.macros.sSetWelcomeScreen.connect(self.set_welcome_screen)
@@ -148,6 +125,18 @@ class LabelingMainWindow(QMainWindow):
         self.menubar.sOpenProject.connect(self.open_project)
         self.menubar.sCloseProject.connect(self.close_project)
         self.menubar.sExampleProject.connect(self.macros.example_project)
+        self.menubar.sShowThumbnails.connect(self.set_thumbnail_screen)
+        self.menubar.sShowInstrumentation.connect(self.open_instrumentation)
+        self.menubar.sShowSearch.connect(self.open_search)
+        self.menubar.sQueueImages.connect(self.queue_images)
+        self.menubar.sCreateSnapshot.connect(self.create_snapshot)
+        self.menubar.sShowMaintenance.connect(self.open_maintenance)
+        self.menubar.sUndo.connect(self.undo)
+        self.menubar.sRedo.connect(self.redo)
+
+    def add_file_page(self, modality: int, expression: str, files: list):
+        """appends a page of filtered files to the file list"""
+        self.file_list.add_files(modality, expression, files)
 
     def apply_settings(self, settings: list):
         """applies the settings"""
@@ -155,8 +144,7 @@ class LabelingMainWindow(QMainWindow):
             if setting[0] == "Autosave on file change":
                 self.autoSave = setting[1]
             elif setting[0] == "Mark annotated files":
-                self.file_list.show_check_box = setting[1]
-                self.sRequestUpdate.emit(self.img_idx)
+                self.file_list.set_show_check_box(setting[1])
             elif setting[0] == "Display patient name":
                 self.image_display.patient_label.setVisible(setting[1])
         self.sUpdateSettings.emit(settings)
@@ -166,9 +154,21 @@ class LabelingMainWindow(QMainWindow):
         if change not in self.changes:
             self.changes.append(change)
 
+    @timed()
+    def change_frame(self, frame: int):
+        """proceeds to the given frame of the current video"""
+        if self.autoSave:
+            self.save_to_database()
+            self.sRequestFrame.emit(self.file_uid, frame)
+        elif self.check_for_changes():
+            self.sRequestFrame.emit(self.file_uid, frame)
+        else:
+            self.image_display.video_controls.set_frame(self.frame)
+
     def check_for_changes(self) -> bool:
         """ asks whether user wants to save; returns False on cancellation"""
         if self.changes:
+            from taplt.ui.dialogs import ForgotToSaveMessageBox
             dlg = ForgotToSaveMessageBox()
             dlg.exec()
             if dlg.result() == QMessageBox.ButtonRole.AcceptRole or dlg.result() == QMessageBox.ButtonRole.DestructiveRole:
@@ -176,17 +176,31 @@ class LabelingMainWindow(QMainWindow):
                     self.save_to_database()
                 else:
                     self.changes.clear()
+                    self.sDiscardJournal.emit(self.file_uid, self.frame)
                 return True
             else:
                 return False
         else:
             return True
 
+    def create_snapshot(self):
+        """asks for the backup directory and starts a snapshot of the project, which runs in the background"""
+        backup_path = QFileDialog.getExistingDirectory(self,
+                                                       caption="Select Backup Directory",
+                                                       directory=str(Path.home()))
+        if backup_path:
+            self.menubar.action_snapshot.setEnabled(False)
+            self.statusbar.showMessage("Snapshot: copying the database")
+            self.sCreateSnapshot.emit(backup_path)
+
     def closeEvent(self, event):
         if self.check_for_changes():
+            from taplt.ui.dialogs import CloseMessageBox
             dlg = CloseMessageBox()
             dlg.exec()
             if dlg.clickedButton() == dlg.quit_button:
+                if self.thumbnail_cache is not None:
+                    self.thumbnail_cache.shutdown()
                 super(LabelingMainWindow, self).closeEvent(event)
             else:
                 event.ignore()
@@ -195,26 +209,36 @@ class LabelingMainWindow(QMainWindow):
         """this function closes the project, but not the program itself - return to the welcome screen"""
         if self.check_for_changes():
             self.set_welcome_screen(True)
-            self.menubar.enable_tools(["New Project", "Open Project", "Quit Program", "Example Project"])
+            self.thumbnail_cache.clear()
+            self.menubar.enable_tools(["New Project", "Open Project", "Quit Program", "Example Project",
+                                       "Performance Statistics"])
+            if self.search_dialog is not None:
+                self.search_dialog.close()
+                self.search_dialog = None
+            if self.maintenance_dialog is not None:
+                self.maintenance_dialog.close()
+                self.maintenance_dialog = None
             self.sDisconnect.emit()
 
     def delete_file(self, filename):
         """asks for user consent, emits a signal to permanently delete a project file"""
+        from taplt.ui.dialogs import DeleteFileMessageBox
         dlg = DeleteFileMessageBox(filename)
         dlg.exec()
 
         if dlg.result() == QMessageBox.StandardButton.Ok:
-            self.sDeleteFile.emit(filename, self.img_idx)
+            self.sDeleteFile.emit(filename, self.file_uid)
 
-    def file_list_item_clicked(self, new_img_idx: int):
+    @timed()
+    def file_list_item_clicked(self, new_file_uid: int):
         """switches to the image clicked by the user"""
         if self.autoSave:
             self.save_to_database()
-            self.img_idx = new_img_idx
-            self.sRequestUpdate.emit(new_img_idx)
+            self.file_uid = new_file_uid
+            self.sRequestUpdate.emit(new_file_uid)
         elif self.check_for_changes():
-            self.img_idx = new_img_idx
-            self.sRequestUpdate.emit(new_img_idx)
+            self.file_uid = new_file_uid
+            self.sRequestUpdate.emit(new_file_uid)
 
     def hide_toolbar(self):
         """hides or shows the toolbar"""
@@ -225,8 +249,86 @@ class LabelingMainWindow(QMainWindow):
             self.toolBar.setHidden(True)
             self.image_display.hide_button.setIcon(get_icon("next"))
 
+    def init_project_widgets(self):
+        """creates the widgets displaying a project - only once, when the first project is opened"""
+        if self.image_display is not None:
+            return
+        from taplt.ui.image_display import CenterDisplayWidget
+        from taplt.ui.toolbar import Toolbar
+        from taplt.ui.list_widgets import FileViewingWidget, LabelsViewingWidget
+        from taplt.ui.thumbnail_grid import ThumbnailCache, ThumbnailGrid
+        from taplt.ui.annotation_tree import AnnotationTree
+
+        self.image_display = CenterDisplayWidget()
+        self.image_display.annotations.colors = self.colors
+
+        # grid of the project's images, alternative to the image display
+        self.thumbnail_cache = ThumbnailCache()
+        self.thumbnail_grid = ThumbnailGrid(self.thumbnail_cache)
+        self.thumbnail_grid.setHidden(True)
+
+        self.center_frame.layout().insertWidget(0, self.image_display)
+        self.center_frame.layout().insertWidget(1, self.thumbnail_grid)
+
+        # Right Menu
+        self.right_menu_widget = QWidget()
+        self.right_menu_widget.setMaximumWidth(200)
+        self.right_menu_widget.setLayout(QVBoxLayout())
+        self.right_menu_widget.layout().setContentsMargins(0, 0, 0, 0)
+        self.right_menu_widget.layout().setSpacing(0)
+
+        # the label, polygons and file lists
+        self.labels_list = LabelsViewingWidget()
+        self.polygons = AnnotationTree()
+        self.file_list = FileViewingWidget()
+
+        # widget for the polygons
+        self.poly_widget = QWidget()
+        self.poly_widget.setMinimumSize(QSize(0, 300))
+        self.poly_widget.setLayout(QVBoxLayout())
+        self.poly_widget.layout().setContentsMargins(0, 0, 0, 0)
+        self.poly_widget.layout().setSpacing(0)
+        self.poly_label = QLabel(self)
+        self.poly_label.setStyleSheet("background-color: rgb(186, 189, 182);")
+        self.poly_label.setText("Polygons")
+        self.poly_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.poly_widget.layout().addWidget(self.poly_label)
+        self.poly_widget.layout().addWidget(self.polygons)
+
+        self.right_menu_widget.layout().addWidget(self.labels_list)
+        self.right_menu_widget.layout().addWidget(self.poly_widget)
+        self.right_menu_widget.layout().addWidget(self.file_list)
+
+        self.main_widget.layout().addWidget(self.right_menu_widget)
+
+        self.toolBar = Toolbar(self)
+        self.addToolBar(Qt.ToolBarArea.LeftToolBarArea, self.toolBar)
+        self.toolBar.init_margins()
+        self.toolBar.init_actions(self)
+
+        # connect signals
+        self.image_display.hide_button.clicked.connect(self.hide_toolbar)
+        self.image_display.sRequestSave.connect(self.save_to_database)
+        self.image_display.image_viewer.sNextFile.connect(self.next_image)
+        self.image_display.video_controls.sFrameChanged.connect(self.change_frame)
+        self.image_display.annotations.updateShapes.connect(self.polygons.update_polygons)
+        self.image_display.annotations.shapeSelected.connect(self.polygons.shape_selected)
+        self.image_display.annotations.sChange.connect(self.change_detected)
+        self.image_display.annotations.sJournal.connect(self.journal_record)
+        self.file_list.sDeleteFile.connect(self.delete_file)
+        self.file_list.sRequestFileChange.connect(self.file_list_item_clicked)
+        self.file_list.sFetchFiles.connect(self.sFetchFiles.emit)
+        self.thumbnail_grid.sRequestFileChange.connect(self.thumbnail_activated)
+        self.polygons.sItemsDeleted.connect(self.image_display.annotations.remove_shapes)
+        self.polygons.sDeselectAll.connect(self.image_display.annotations.deselect_all)
+        self.polygons.sCommentChanged.connect(self.image_display.annotations.set_comment)
+        self.polygons.sRelabel.connect(self.image_display.annotations.change_label)
+        self.toolBar.sSetDrawingMode.connect(self.image_display.annotations.set_mode)
+        self.thumbnail_cache.sHashComputed.connect(self.sStoreFileHash.emit)
+
     def import_file(self, existing_patients: list):
         """executes a dialog to let the user enter all information regarding file import"""
+        from taplt.ui.dialogs import SelectPatientDialog
         dlg = SelectPatientDialog(existing_patients)
         dlg.exec()
         patient = dlg.result
@@ -239,11 +341,12 @@ class LabelingMainWindow(QMainWindow):
             if filepath:
                 if self.check_for_changes():
                     self.sAddFile.emit(filepath, patient)
-                    self.sRequestUpdate.emit(self.img_idx)
+                    self.sRequestUpdate.emit(self.file_uid)
 
     def new_project(self):
         """executes a dialog prompting the user to enter information about the new project"""
         if self.check_for_changes():
+            from taplt.ui.dialogs import ProjectHandlerDialog
             dlg = ProjectHandlerDialog()
             dlg.exec()
             if dlg.project_path:
@@ -274,59 +377,250 @@ class LabelingMainWindow(QMainWindow):
                     msg.setStandardButtons(QMessageBox.StandardButton.Ok)
                     msg.exec()
 
+    def open_instrumentation(self):
+        """opens the statistics of the instrumented operations"""
+        from taplt.ui.dialogs import InstrumentationDialog
+        dlg = InstrumentationDialog(self)
+        dlg.exec()
+
+    def maintenance_finished(self, report: list):
+        if self.maintenance_dialog is not None:
+            self.maintenance_dialog.show_report(report)
+
+    def maintenance_progress(self, done: int, total: int, step: str):
+        if self.maintenance_dialog is not None:
+            self.maintenance_dialog.show_progress(done, total, step)
+
+    def open_maintenance(self):
+        """opens the maintenance of the database, it stays open while the operations run"""
+        from taplt.ui.dialogs import MaintenanceDialog
+        if self.maintenance_dialog is None:
+            self.maintenance_dialog = MaintenanceDialog(self)
+            self.maintenance_dialog.sRun.connect(self.sMaintenance.emit)
+        self.maintenance_dialog.show()
+        self.maintenance_dialog.raise_()
+
+    def open_search(self):
+        """opens the search for files, it stays open while the user browses the results"""
+        from taplt.ui.dialogs import SearchDialog
+        if self.search_dialog is None:
+            self.search_dialog = SearchDialog(list(self.classes), self)
+            self.search_dialog.sSearch.connect(self.sSearch.emit)
+            self.search_dialog.sFileSelected.connect(self.file_list_item_clicked)
+        self.search_dialog.show()
+        self.search_dialog.raise_()
+        self.search_dialog.search()
+
     def open_settings(self, settings: list):
         """opens up the settings dialog, sends signal to save them"""
+        from taplt.ui.dialogs import SettingDialog
         dlg = SettingDialog(settings)
         dlg.exec()
         s = dlg.settings
         if dlg.settings:
             self.apply_settings(dlg.settings)
 
+    def open_statistics(self, statistics: dict):
+        """opens the statistics of the annotations of the project"""
+        from taplt.ui.dialogs import StatisticsDialog
+        dlg = StatisticsDialog(statistics, self)
+        dlg.exec()
+
+    def journal_record(self, operation: str, delta: str):
+        """passes an edit of the displayed file on to the journal of the database"""
+        self.sJournalRecord.emit(self.file_uid, self.frame, operation, delta)
+
+    @timed()
     def next_image(self, direction: int):
-        """proceeds to the next/previous image"""
-        if not self.image_display.is_empty():
-            new_img_idx = (self.img_idx + direction) % self.file_list.image_list.count()
+        """proceeds to the next/previous image or, if a video is displayed, to the next/previous frame"""
+        if self.video_reader is not None:
+            self.image_display.video_controls.step(direction)
+        elif not self.image_display.is_empty() and direction > 0 and sum(self.work_queue[:2]):
+            # the images of the work queue are annotated one after another
             if self.autoSave:
                 self.save_to_database()
-                self.img_idx = new_img_idx
-                self.sRequestUpdate.emit(new_img_idx)
+                self.sNextQueued.emit(self.file_uid)
             elif self.check_for_changes():
-                self.img_idx = new_img_idx
-                self.sRequestUpdate.emit(new_img_idx)
+                self.sNextQueued.emit(self.file_uid)
+        elif not self.image_display.is_empty():
+            new_file_uid = self.file_list.get_neighbour_image(self.file_uid, direction)
+            if self.autoSave:
+                self.save_to_database()
+                self.file_uid = new_file_uid
+                self.sRequestUpdate.emit(new_file_uid)
+            elif self.check_for_changes():
+                self.file_uid = new_file_uid
+                self.sRequestUpdate.emit(new_file_uid)
+
+    def snapshot_finished(self, snapshot_path: str, error: str):
+        self.menubar.action_snapshot.setEnabled(self.welcome_screen.isHidden())  # the project may be closed meanwhile
+        if error:
+            QMessageBox.warning(self, "Snapshot Failed", "The snapshot could not be created:\n{}".format(error))
+        else:
+            self.statusbar.showMessage("Snapshot stored in {}".format(snapshot_path))
+
+    def snapshot_progress(self, done: int, total: int, step: str):
+        if done:
+            self.statusbar.showMessage("Snapshot: {} of {} files".format(done, total - 1))
+
+    def show_search_results(self, results: list):
+        if self.search_dialog is not None:
+            self.search_dialog.show_results(results)
 
     def preview_database(self, headers: list, content: list):
         """displays the database content of the specified table in a dialog"""
+        from taplt.macros.macros_dialogs import PreviewDatabaseDialog
         dlg = PreviewDatabaseDialog(headers, content)
         dlg.exec()
 
+    def queue_images(self):
+        """adds the images matching the filter of the file list to the work queue - all images without
+        annotations if there is no filter"""
+        self.sQueueImages.emit(self.file_list.image_list.file_model.expression)
+
+    def redo(self):
+        if self.image_display is not None:
+            self.image_display.annotations.undo_stack.redo()
+
+    def save_conflict(self, file_uid: int, frame: int, user: str):
+        """lets the user decide between their annotations and those another annotator has saved in the meantime"""
+        from taplt.ui.dialogs import SaveConflictMessageBox
+        dlg = SaveConflictMessageBox(user)
+        dlg.exec()
+        if dlg.clickedButton() == dlg.overwrite_button:
+            self.sForceSave.emit(self.image_display.annotations.ordered_shapes(), file_uid, frame)
+        else:
+            self.changes.clear()
+            self.sDiscardJournal.emit(file_uid, frame)
+            self.sRequestFrame.emit(file_uid, frame)
+
+    @timed()
     def save_to_database(self):
         """stores the current state of the image to the database"""
-        annotations = list(self.image_display.annotations.annotations.values())
+        annotations = self.image_display.annotations.ordered_shapes()
         self.changes.clear()
-        self.sSaveToDatabase.emit(annotations, self.img_idx)
+        self.sSaveToDatabase.emit(annotations, self.file_uid, self.frame)
+        self.image_display.annotations.journal_base()
+
+    def set_file_state(self, file_uid: int, populated: bool):
+        """ marks whether the given file holds annotations"""
+        self.file_list.set_file_state(file_uid, populated)
 
     def set_no_files_screen(self, b: bool):
         """ either hides the default label or the image display"""
-        self.image_display.setHidden(b)
-        self.no_files.setHidden(not b)
+        self.image_display.setHidden(b or self.show_thumbnails)
+        self.no_files.setHidden(not b or self.show_thumbnails)
+
+    def set_project_location(self, location: str):
+        """ thumbnails and image pyramids are cached inside the project"""
+        self.init_project_widgets()
+        self.colors.clear()
+        self.thumbnail_cache.set_directory(location + Structure.THUMBNAILS_DIR)
+        self.image_display.pyramid_dir = location + Structure.PYRAMIDS_DIR
+
+    def set_thumbnail_screen(self, b: bool):
+        """ either displays the thumbnail grid or the current file"""
+        self.show_thumbnails = b
+        self.menubar.action_thumbnails.setChecked(b)
+        if self.thumbnail_grid is None:
+            return
+        self.thumbnail_grid.setHidden(not b)
+        self.set_no_files_screen(self.file_uid == -1)
+        if b:
+            self.thumbnail_grid.select_file(self.file_uid)
 
     def set_welcome_screen(self, b: bool):
         """sets or removes the welcome screen displayed when no project is opened"""
-        self.image_display.setHidden(b)
+        if b:
+            self.set_thumbnail_screen(False)
+        else:
+            self.init_project_widgets()
         self.no_files.setHidden(b)
-        self.toolBar.setHidden(b)
-        self.right_menu_widget.setHidden(b)
         self.welcome_screen.setHidden(not b)
-
-    def update_window(self, files: list, img_idx, patient: str, classes: list, labels: list):
-        """main updating function: all necessary information is passed to the main window"""
-        self.img_idx = img_idx
-        color_map, new_color = colormap_rgb(n=NUM_COLORS)
-        self.labels_list.label_list.update_with_classes(classes, color_map)
-        self.file_list.update_list(files, self.img_idx)
-        if files:
+        if self.image_display is not None:
+            self.image_display.setHidden(b)
+            self.toolBar.setHidden(b)
+            self.right_menu_widget.setHidden(b)
+
+    def close_video(self):
+        """releases the decoder of the previously displayed video"""
+        if self.video_reader is not None:
+            self.video_reader.close()
+            self.video_reader = None
+        self.image_display.video_controls.setHidden(True)
+
+    def thumbnail_activated(self, file_uid: int):
+        """switches from the thumbnail grid to the selected image"""
+        self.set_thumbnail_screen(False)
+        if file_uid != self.file_uid:
+            self.file_list_item_clicked(file_uid)
+
+    def undo(self):
+        if self.image_display is not None:
+            self.image_display.annotations.undo_stack.undo()
+
+    @timed()
+    def update_file(self, file_uid: int, filepath: str, patient: str, labels: list):
+        """displays the given file together with its annotations"""
+        self.close_video()
+        self.file_uid = file_uid
+        self.frame = 0
+        self.file_list.select_file(file_uid)
+        if file_uid != -1:
             self.set_no_files_screen(False)
-            current_labels = self.image_display.init_image(files[self.img_idx][0], patient, labels, classes)
+            current_labels = self.image_display.init_image(filepath, patient, labels, list(self.classes))
             self.polygons.update_polygons(current_labels)
         else:
             self.set_no_files_screen(True)
+
+    @timed()
+    def update_work_queue(self, open_files: int, claimed: int, done: int):
+        """displays the progress of the work queue"""
+        self.work_queue = (open_files, claimed, done)
+        if open_files + claimed + done:
+            self.statusbar.showMessage("Work queue: {} of {} images done, {} open".format(
+                done, open_files + claimed + done, open_files))
+
+    def update_video(self, file_uid: int, filepath: str, patient: str, labels: list, frame: int, index: dict):
+        """displays the given frame of a video together with its annotations"""
+        if not index:
+            self.close_video()
+            self.statusbar.showMessage("Displaying videos requires PyAV. Install it with 'pip install av'.")
+            return
+
+        # keep the decoder (and its frame cache) while navigating within the same video
+        new_video = self.video_reader is None or self.file_uid != file_uid
+        if new_video:
+            self.close_video()
+            self.video_reader = VideoReader(filepath, VideoIndex.from_dict(index))
+            self.image_display.video_controls.set_video(index['frame_count'], index['fps'])
+            self.image_display.video_controls.setHidden(False)
+        self.file_uid = file_uid
+        self.frame = frame
+        self.file_list.select_file(file_uid)
+        self.image_display.video_controls.set_frame(frame)
+
+        self.set_no_files_screen(False)
+        image = self.video_reader.frame(frame)
+        current_labels = self.image_display.init_image(image, patient, labels, list(self.classes),
+                                                       fit_in_view=new_video)
+        self.polygons.update_polygons(current_labels)
+
+    @timed()
+    def update_file_list(self, files: list, file_uid: int, modality: int):
+        """fills the file list of the modality with the project's files"""
+        self.file_list.update_list(files, file_uid if file_uid != -1 else self.file_uid, modality)
+        if modality == 1:
+            self.thumbnail_grid.set_files(files, file_uid if file_uid != -1 else self.file_uid)
+            self.set_no_files_screen(not files and self.file_uid == -1)
+
+    @timed()
+    def update_label_classes(self, labels: list):
+        """updates the label classes of the project, given as (label uid, label class, color)"""
+        self.colors.update(labels)
+        self.classes = [label_class for _, label_class, _ in labels]
+        self.image_display.annotations.classes = list(self.classes)
+        self.labels_list.label_list.update_with_classes(self.classes,
+                                                        [self.colors.color(c) for c in self.classes])
+        if self.search_dialog is not None:
+            self.search_dialog.set_classes(self.classes)
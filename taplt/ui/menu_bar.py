@@ -10,11 +10,20 @@ class MenuBar(QMenuBar):
     sNewProject = pyqtSignal()
     sOpenProject = pyqtSignal()
     sCloseProject = pyqtSignal()
+    sCreateSnapshot = pyqtSignal()
+    sShowMaintenance = pyqtSignal()
     sRequestImport = pyqtSignal()
     sRequestSave = pyqtSignal()
     sRequestSettings = pyqtSignal()
     sExampleProject = pyqtSignal()
     sPreviewDatabase = pyqtSignal(str)
+    sShowThumbnails = pyqtSignal(bool)
+    sShowInstrumentation = pyqtSignal()
+    sShowStatistics = pyqtSignal()
+    sShowSearch = pyqtSignal()
+    sQueueImages = pyqtSignal()
+    sUndo = pyqtSignal()
+    sRedo = pyqtSignal()
 
     def __init__(self, parent: QMainWindow):
         super(MenuBar, self).__init__()
@@ -24,6 +33,7 @@ class MenuBar(QMenuBar):
         self.maf = QMenu("TAPLT")
         self.project = QMenu("Project")
         self.edit = QMenu("Edit")
+        self.view = QMenu("View")
         self.macros = QMenu("Macros")
         self.preview = QMenu("Preview Database")
 
@@ -45,18 +55,62 @@ class MenuBar(QMenuBar):
                                       'Ctrl+C',
                                       "close",
                                       "Close Project")
+        self.action_snapshot = Action(self,
+                                      "Create Snapshot",
+                                      self.sCreateSnapshot.emit,
+                                      tip="Back up the database and the files of the project, "
+                                          "only files which changed since the last snapshot are copied")
+        action_maintenance = Action(self,
+                                    "Database Maintenance",
+                                    self.sShowMaintenance.emit,
+                                    tip="Check the database, find annotations of deleted files and missing files, "
+                                        "release unused space")
         action_save = Action(self,
                              "Save",
                              self.sRequestSave.emit,
                              'Ctrl+S',
                              "save",
                              "Save current state to database")
+        action_undo = Action(self,
+                             "Undo",
+                             self.sUndo.emit,
+                             'Ctrl+Z',
+                             tip="Undo the last edit of the annotations")
+        action_redo = Action(self,
+                             "Redo",
+                             self.sRedo.emit,
+                             ['Ctrl+Shift+Z', 'Ctrl+Y'],
+                             tip="Redo the last undone edit of the annotations")
+        action_search = Action(self,
+                               "Search Annotations",
+                               self.sShowSearch.emit,
+                               'Ctrl+F',
+                               tip="Find files by comment, label class, patient or number of annotations")
+        action_queue = Action(self,
+                              "Queue Images for Annotation",
+                              self.sQueueImages.emit,
+                              tip="Hand the filtered images (or the images without annotations) to the annotators "
+                                  "one after another, Next Image proceeds to the next open image")
         action_import = Action(self,
                                "Import File",
                                self.sRequestImport.emit,
                                'Ctrl+I',
                                "import",
                                "Import a new file to database")
+        self.action_thumbnails = Action(self,
+                                        "Thumbnail Browser",
+                                        self.sShowThumbnails.emit,
+                                        'Ctrl+T',
+                                        tip="Browse the images of the project as thumbnails",
+                                        checkable=True)
+        action_instrumentation = Action(self,
+                                        "Performance Statistics",
+                                        self.sShowInstrumentation.emit,
+                                        tip="Timings of the database, display and signal handlers")
+        action_statistics = Action(self,
+                                   "Project Statistics",
+                                   self.sShowStatistics.emit,
+                                   tip="Number of annotations per label class, patient and file")
         action_quit = Action(self,
                              "Quit Program",
                              parent.close,
@@ -87,8 +141,17 @@ class MenuBar(QMenuBar):
         self.actions = [action_new_project,
                         action_open_project,
                         action_close_project,
+                        self.action_snapshot,
+                        action_maintenance,
                         action_save,
+                        action_undo,
+                        action_redo,
+                        action_search,
+                        action_queue,
                         action_import,
+                        self.action_thumbnails,
+                        action_instrumentation,
+                        action_statistics,
                         action_quit,
                         action_settings,
                         macros_example_project,
@@ -102,10 +165,19 @@ class MenuBar(QMenuBar):
 
         self.project.addActions((action_new_project,
                                  action_open_project,
-                                 action_close_project))
+                                 action_close_project,
+                                 self.action_snapshot,
+                                 action_maintenance))
 
         self.edit.addActions((action_save,
+                              action_undo,
+                              action_redo,
+                              action_search,
+                              action_queue,
                               action_import))
+        self.view.addActions((self.action_thumbnails,
+                              action_statistics,
+                              action_instrumentation))
         self.macros.addAction(macros_example_project)
         self.preview.addActions((macros_preview_annotations,
                                  macros_preview_images,
@@ -116,9 +188,11 @@ class MenuBar(QMenuBar):
         self.addMenu(self.maf)
         self.addMenu(self.project)
         self.addMenu(self.edit)
+        self.addMenu(self.view)
         self.addMenu(self.macros)
 
-        self.enable_tools(["New Project", "Open Project", "Quit Program", "Example Project"])
+        self.enable_tools(["New Project", "Open Project", "Quit Program", "Example Project",
+                           "Performance Statistics"])
 
     def enable_tools(self, tools: List[str] = None):
         """enables the tools specified in the list; if no parameter is passed, enable all"""
@@ -22,6 +22,9 @@ class Shape(QGraphicsObject):
     deleted = pyqtSignal()
     drawingDone = pyqtSignal()
     sChange = pyqtSignal(int)
+    sMoved = pyqtSignal(float, float)  # offset of the shape
+    sVerticesMoved = pyqtSignal(QPolygonF)  # the vertices before a vertex was dragged
+    sRelabel = pyqtSignal()
 
     @dataclass
     class ShapeMode:
@@ -69,15 +72,19 @@ class Shape(QGraphicsObject):
                 self.group_id = label_dict['group_id']
             if 'comment' in label_dict:
                 self.comment = label_dict['comment']
+            self.created_by = label_dict.get('created_by')
         else:
             self.label = label
             self.shape_type = shape_type
             self.flags = flags
             self.group_id = group_id
             self.comment = ""
+            self.created_by = None  # the annotator, set when the shape is saved
 
         self._path = None  # only necessary for the temporary Polygon and trace
         self._anchorPoint = None
+        self._dragged_vertex = -1
+        self._vertices_before_drag = None  # type: Optional[QPolygonF]
         self.line_color, self.brush_color = QColor(), QColor()
         self.init_color(color)
         self.selected_color = Qt.GlobalColor.white
@@ -120,6 +127,12 @@ class Shape(QGraphicsObject):
             if math.sqrt(delta.x() ** 2 + delta.y() ** 2) > 3:
                 self.vertices.vertices.append(self.check_out_of_bounds(event.scenePos()))
                 self.update()
+        elif self._dragged_vertex != -1:
+            # the vertex is dragged instead of the shape
+            self.prepareGeometryChange()
+            self.move_vertex(self._dragged_vertex, self.check_out_of_bounds(event.pos()))
+            self.update()
+            return
         super(Shape, self).mouseMoveEvent(event)
 
     def check_out_of_bounds(self, pos: QPointF):
@@ -135,6 +148,9 @@ class Shape(QGraphicsObject):
         action = QAction("Delete")
         action.triggered.connect(self.deleted.emit)
         menu.addAction(action)
+        relabel = QAction("Change Label")
+        relabel.triggered.connect(self.sRelabel.emit)
+        menu.addAction(relabel)
 
         self.setSelected(True)
         self.selected.emit()
@@ -142,10 +158,16 @@ class Shape(QGraphicsObject):
 
     @pyqtSlot(QGraphicsSceneMouseEvent)
     def mousePressEvent(self, event: QGraphicsSceneMouseEvent):
-        if self.contains(event.pos()):
+        # in edit mode, a vertex is dragged even if the click is just outside the shape
+        on_vertex, index = self.vertices.is_on_vertex(event.pos()) if self.mode == Shape.ShapeMode.EDIT \
+            else (False, -1)
+        if self.contains(event.pos()) or on_vertex:
             self.setSelected(True)
             self.selected.emit()
             self.clicked.emit(event)
+            if on_vertex and event.button() == Qt.MouseButton.LeftButton:
+                self._dragged_vertex = index
+                self._vertices_before_drag = QPolygonF(self.vertices.vertices)
         else:
             event.ignore()
         super(Shape, self).mousePressEvent(event)
@@ -160,11 +182,21 @@ class Shape(QGraphicsObject):
     @pyqtSlot(QGraphicsSceneMouseEvent)
     def mouseReleaseEvent(self, event: QGraphicsSceneMouseEvent) -> None:
         super(Shape, self).mousePressEvent(event)
-        if self.mode == Shape.ShapeMode.EDIT:
-            self.vertices.translate(self.pos())  # shift actual points to new location
+        if self._dragged_vertex != -1:
+            old = self._vertices_before_drag
+            self._dragged_vertex, self._vertices_before_drag, self._anchorPoint = -1, None, None
+            self.set_mode(Shape.ShapeMode.FIXED)
+            if old != self.vertices.vertices:
+                self.sChange.emit(2)
+                self.sVerticesMoved.emit(old)
+        elif self.mode == Shape.ShapeMode.EDIT:
+            offset = self.pos()
+            self.vertices.translate(offset)  # shift actual points to new location
             self.setPos(0, 0)  # reset the anchor to line up with the original origin
             self.set_mode(Shape.ShapeMode.FIXED)
             self.sChange.emit(2)
+            if not offset.isNull():
+                self.sMoved.emit(offset.x(), offset.y())
         elif self.mode == Shape.ShapeMode.CREATE:
             self.ungrabMouse()
             self.is_closed_path = True
@@ -357,7 +389,8 @@ class Shape(QGraphicsObject):
                       'shape_type': self.shape_type,
                       'flags': self.flags,
                       'group_id': self.group_id,
-                      'comment': self.comment}
+                      'comment': self.comment,
+                      'created_by': self.created_by}
         return dictionary, self.label
 
     def update_color(self, color: QColor):
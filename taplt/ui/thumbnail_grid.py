@@ -0,0 +1,203 @@
+from PyQt6.QtWidgets import *
+from PyQt6.QtCore import *
+from PyQt6.QtGui import *
+
+import os
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from taplt.utils.thumbnails import THUMBNAIL_SIZE, create_thumbnail, thumbnail_path
+
+
+class ThumbnailCache(QObject):
+    """ provides the thumbnails of the project files
+    thumbnails are created in a pool of worker processes and stored in the project's cache directory,
+    keyed by the hash of the file. recently used thumbnails are additionally kept in memory"""
+    sThumbnailReady = pyqtSignal(int)  # file uid
+    sHashComputed = pyqtSignal(int, str)  # file uid, content hash
+    _sFinished = pyqtSignal(int, str, str)  # emitted from the pool's callback thread
+
+    def __init__(self, memory_size: int = 512, workers: int = None):
+        super(ThumbnailCache, self).__init__()
+        self.cache_dir = ""
+        self.memory_size = memory_size
+        self.workers = workers or max(min(os.cpu_count() or 1, 4) - 1, 1)
+        self.executor = None  # type: ProcessPoolExecutor
+        self.pending = dict()  # file uid -> future
+        self.pixmaps = OrderedDict()  # file uid -> QPixmap
+        self._sFinished.connect(self._finished)
+
+    def cancel_pending(self):
+        """ cancels all requests which did not start yet, e.g. because their files are no longer displayed"""
+        pending, self.pending = self.pending, dict()
+        for future in pending.values():
+            future.cancel()
+
+    def clear(self):
+        self.cancel_pending()
+        self.pixmaps.clear()
+
+    def pixmap(self, file_uid: int, filepath: str, content_hash: str = None):
+        """ returns the thumbnail of the file / None if it is not available yet
+        in that case, the thumbnail is created in the background and sThumbnailReady is emitted once it is"""
+        if file_uid in self.pixmaps:
+            self.pixmaps.move_to_end(file_uid)
+            return self.pixmaps[file_uid]
+        if not self.cache_dir:
+            return None
+
+        # thumbnails on disk are small enough to be loaded right away
+        if content_hash and os.path.exists(thumbnail_path(self.cache_dir, content_hash)):
+            return self._store(file_uid, QPixmap(thumbnail_path(self.cache_dir, content_hash)))
+        if file_uid not in self.pending:
+            self.request(file_uid, filepath, content_hash)
+        return None
+
+    def request(self, file_uid: int, filepath: str, content_hash: str = None):
+        """ submits the creation of a thumbnail to the process pool"""
+        if self.executor is None:
+            # 'spawn' avoids forking the (multithreaded) Qt application
+            self.executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+        future = self.executor.submit(create_thumbnail, filepath, self.cache_dir, content_hash)
+        self.pending[file_uid] = future
+        future.add_done_callback(lambda f: self._done(file_uid, f))
+
+    def set_directory(self, cache_dir: str):
+        """ sets the cache directory of the opened project"""
+        self.clear()
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def shutdown(self):
+        self.clear()
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+    def _done(self, file_uid: int, future):
+        """ runs in a thread of the process pool - hands the result over to the GUI thread"""
+        if future.cancelled() or future.exception() is not None:
+            self._sFinished.emit(file_uid, "", "")
+            return
+        content_hash, path = future.result()
+        self._sFinished.emit(file_uid, content_hash, path or "")
+
+    def _finished(self, file_uid: int, content_hash: str, path: str):
+        if self.pending.pop(file_uid, None) is None:
+            return  # the request was cleared in the meantime
+        if content_hash:
+            self.sHashComputed.emit(file_uid, content_hash)
+        if path:
+            self._store(file_uid, QPixmap(path))
+            self.sThumbnailReady.emit(file_uid)
+
+    def _store(self, file_uid: int, pixmap: QPixmap) -> QPixmap:
+        self.pixmaps[file_uid] = pixmap
+        self.pixmaps.move_to_end(file_uid)
+        while len(self.pixmaps) > self.memory_size:
+            self.pixmaps.popitem(last=False)
+        return pixmap
+
+
+class ThumbnailModel(QAbstractListModel):
+    """ list model of the project files. the thumbnail of a file is only requested
+    when the view asks for its decoration, i.e. when the file becomes visible"""
+
+    def __init__(self, cache: ThumbnailCache):
+        super(ThumbnailModel, self).__init__()
+        self.cache = cache
+        self.files = list()  # (filepath, populated, file uid, content hash)
+        self.rows = dict()  # file uid -> row
+        self.placeholder = QPixmap(THUMBNAIL_SIZE, THUMBNAIL_SIZE)
+        self.placeholder.fill(QColor(186, 189, 182))
+        self.cache.sThumbnailReady.connect(self.thumbnail_ready)
+        self.cache.sHashComputed.connect(self.hash_computed)
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.files)
+
+    def data(self, index: QModelIndex, role: int = Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        filepath, populated, file_uid, content_hash = self.files[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            return os.path.basename(filepath)
+        elif role == Qt.ItemDataRole.DecorationRole:
+            pixmap = self.cache.pixmap(file_uid, filepath, content_hash)
+            return pixmap if pixmap is not None else self.placeholder
+        elif role == Qt.ItemDataRole.ToolTipRole:
+            return filepath
+        elif role == Qt.ItemDataRole.UserRole:
+            return file_uid
+        return None
+
+    def hash_computed(self, file_uid: int, content_hash: str):
+        row = self.rows.get(file_uid)
+        if row is not None:
+            filepath, populated, _, _ = self.files[row]
+            self.files[row] = (filepath, populated, file_uid, content_hash)
+
+    def row_of(self, file_uid: int) -> int:
+        return self.rows.get(file_uid, -1)
+
+    def set_files(self, files: list):
+        """ replaces the displayed files; pending thumbnails of the previous files are cancelled"""
+        self.beginResetModel()
+        self.cache.cancel_pending()
+        self.files = [tuple(file) for file in files]
+        self.rows = {file[2]: row for row, file in enumerate(self.files)}
+        self.endResetModel()
+
+    def thumbnail_ready(self, file_uid: int):
+        row = self.rows.get(file_uid)
+        if row is not None:
+            index = self.index(row)
+            self.dataChanged.emit(index, index, [Qt.ItemDataRole.DecorationRole])
+
+
+class ThumbnailGrid(QListView):
+    """ a grid of the thumbnails of the project's images. the view only paints (and thereby requests)
+    the visible items and lays out the items in batches, so it scales to large projects"""
+    sRequestFileChange = pyqtSignal(int)
+
+    def __init__(self, cache: ThumbnailCache):
+        super(ThumbnailGrid, self).__init__()
+        self.thumbnail_model = ThumbnailModel(cache)
+        self.files = None  # files received while the grid was hidden
+        self.setModel(self.thumbnail_model)
+        self.setViewMode(QListView.ViewMode.IconMode)
+        self.setMovement(QListView.Movement.Static)
+        self.setResizeMode(QListView.ResizeMode.Adjust)
+        self.setLayoutMode(QListView.LayoutMode.Batched)
+        self.setBatchSize(200)
+        self.setUniformItemSizes(True)
+        self.setIconSize(QSize(THUMBNAIL_SIZE, THUMBNAIL_SIZE))
+        self.setGridSize(QSize(THUMBNAIL_SIZE + 24, THUMBNAIL_SIZE + 32))
+        self.setSpacing(4)
+        self.setWordWrap(False)
+        self.setTextElideMode(Qt.TextElideMode.ElideMiddle)
+        self.setFrameShape(QFrame.Shape.NoFrame)
+        self.setSelectionMode(QAbstractItemView.SelectionMode.SingleSelection)
+        self.activated.connect(lambda index: self.sRequestFileChange.emit(index.data(Qt.ItemDataRole.UserRole)))
+
+    def showEvent(self, event: QShowEvent):
+        # the file list is only handed to the model while the grid is visible
+        if self.files is not None:
+            self.thumbnail_model.set_files(self.files)
+            self.files = None
+        super(ThumbnailGrid, self).showEvent(event)
+
+    def select_file(self, file_uid: int):
+        row = self.thumbnail_model.row_of(file_uid)
+        if row != -1:
+            index = self.thumbnail_model.index(row)
+            self.setCurrentIndex(index)
+            self.scrollTo(index)
+
+    def set_files(self, files: list, file_uid: int = -1):
+        if self.isVisible():
+            self.thumbnail_model.set_files(files)
+            self.select_file(file_uid)
+        else:
+            self.files = files
@@ -0,0 +1,68 @@
+from PyQt6.QtWidgets import *
+from PyQt6.QtCore import *
+
+from taplt.utils.qt import get_icon
+
+
+class VideoControls(QWidget):
+    """ a slider and buttons to navigate through the frames of a video"""
+    sFrameChanged = pyqtSignal(int)
+
+    def __init__(self):
+        super(VideoControls, self).__init__()
+        self.setLayout(QHBoxLayout())
+        self.layout().setContentsMargins(10, 0, 10, 0)
+        self.frame_count = 0
+        self.fps = 0
+
+        self.rewind_button = QPushButton(get_icon("rewind"), "")
+        self.rewind_button.setToolTip("Go back one second")
+        self.prev_button = QPushButton(get_icon("prev"), "")
+        self.prev_button.setToolTip("Previous frame")
+        self.next_button = QPushButton(get_icon("next"), "")
+        self.next_button.setToolTip("Next frame")
+        self.forward_button = QPushButton(get_icon("fast-forward"), "")
+        self.forward_button.setToolTip("Go forward one second")
+
+        # the frame is only requested once the user releases the slider
+        self.slider = QSlider(Qt.Orientation.Horizontal)
+        self.slider.setTracking(False)
+        self.frame_label = QLabel()
+
+        self.rewind_button.clicked.connect(lambda: self.step(-max(int(round(self.fps)), 1)))
+        self.prev_button.clicked.connect(lambda: self.step(-1))
+        self.next_button.clicked.connect(lambda: self.step(1))
+        self.forward_button.clicked.connect(lambda: self.step(max(int(round(self.fps)), 1)))
+        self.slider.valueChanged.connect(self.sFrameChanged.emit)
+        self.slider.sliderMoved.connect(self.update_label)
+
+        for widget in (self.rewind_button, self.prev_button, self.slider,
+                       self.next_button, self.forward_button, self.frame_label):
+            self.layout().addWidget(widget)
+
+    def frame(self) -> int:
+        return self.slider.value()
+
+    def set_frame(self, frame: int):
+        """ displays the given frame number without requesting the frame"""
+        self.slider.blockSignals(True)
+        self.slider.setValue(frame)
+        self.slider.blockSignals(False)
+        self.update_label(frame)
+
+    def set_video(self, frame_count: int, fps: float):
+        """ adjusts the controls to a (new) video"""
+        self.frame_count = frame_count
+        self.fps = fps
+        self.slider.blockSignals(True)
+        self.slider.setRange(0, max(frame_count - 1, 0))
+        self.slider.blockSignals(False)
+
+    def step(self, frames: int):
+        """ requests the frame the given number of frames away from the current one"""
+        frame = min(max(self.slider.value() + frames, 0), self.slider.maximum())
+        if frame != self.slider.value():
+            self.sFrameChanged.emit(frame)
+
+    def update_label(self, frame: int):
+        self.frame_label.setText("{} / {}".format(frame + 1, self.frame_count))
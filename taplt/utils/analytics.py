@@ -0,0 +1,161 @@
+"""Geometry of the annotations in NumPy arrays: the vertices of a batch of shapes are stored in one array and
+the shapes are given by the offset of their first vertex, so area, perimeter, centroid and bounding box are
+computed for all shapes at once. The IoU is only computed for pairs of shapes whose bounding boxes overlap"""
+import math
+from typing import Iterable, List, Tuple
+
+from PyQt6.QtCore import QPointF
+from PyQt6.QtGui import QPainterPath, QPolygonF
+
+from taplt.utils.lazy import lazy_import
+
+np = lazy_import("numpy")
+
+MEASURES = ("area", "perimeter", "cx", "cy", "xmin", "ymin", "xmax", "ymax")
+CIRCLE_SEGMENTS = 64  # vertices of the polygon approximating a circle when intersecting shapes
+
+
+class ShapeArrays:
+    """the vertices of a batch of shapes: the vertices of shape i are points[offsets[i]:offsets[i + 1]].
+    circles are the ellipse inscribed in the bounding box of their vertices"""
+
+    def __init__(self, points: "np.ndarray", offsets: "np.ndarray", circles: "np.ndarray"):
+        self.points = points  # (vertices, 2)
+        self.offsets = offsets  # (shapes + 1,)
+        self.circles = circles  # (shapes,) bool
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    @classmethod
+    def from_label_dicts(cls, label_dicts: Iterable[dict]):
+        counts, circles, points = [0], list(), list()
+        for label_dict in label_dicts:
+            counts.append(len(label_dict['points']))
+            circles.append(label_dict.get('shape_type') == 'circle')
+            points.extend(label_dict['points'])
+        return cls(np.asarray(points, dtype=np.float64).reshape(-1, 2), np.cumsum(counts),
+                   np.asarray(circles, dtype=bool))
+
+    def polygon(self, index: int) -> "np.ndarray":
+        """returns the vertices of the shape, circles are approximated by a polygon"""
+        vertices = self.points[self.offsets[index]:self.offsets[index + 1]]
+        if not self.circles[index] or not len(vertices):
+            return vertices
+        (xmin, ymin), (xmax, ymax) = vertices.min(axis=0), vertices.max(axis=0)
+        angles = np.linspace(0, 2 * math.pi, CIRCLE_SEGMENTS, endpoint=False)
+        return np.stack([(xmin + xmax) / 2 + (xmax - xmin) / 2 * np.cos(angles),
+                         (ymin + ymax) / 2 + (ymax - ymin) / 2 * np.sin(angles)], axis=1)
+
+
+def measures(shapes: ShapeArrays) -> "np.ndarray":
+    """returns a (shapes, len(MEASURES)) array with the measures of the shapes; polygons without an area
+    (lines, points) have the mean of their vertices as centroid, shapes without vertices are all zeros"""
+    result = np.zeros((len(shapes), len(MEASURES)))
+    counts = np.diff(shapes.offsets)
+    valid = counts > 0
+    if not valid.any():
+        return result
+    starts = shapes.offsets[:-1][valid]
+    x, y = shapes.points[:, 0], shapes.points[:, 1]
+
+    # the successor of each vertex - the last vertex of a shape is followed by its first one
+    following = np.arange(1, len(shapes.points) + 1)
+    following[shapes.offsets[1:][valid] - 1] = starts
+    x_next, y_next = x[following], y[following]
+    cross = x * y_next - x_next * y
+
+    signed_area = 0.5 * np.add.reduceat(cross, starts)
+    perimeter = np.add.reduceat(np.hypot(x_next - x, y_next - y), starts)
+    xmin, xmax = np.minimum.reduceat(x, starts), np.maximum.reduceat(x, starts)
+    ymin, ymax = np.minimum.reduceat(y, starts), np.maximum.reduceat(y, starts)
+
+    degenerate = np.abs(signed_area) < 1e-12
+    divisor = np.where(degenerate, 1.0, 6 * signed_area)
+    cx = np.where(degenerate, np.add.reduceat(x, starts) / counts[valid],
+                  np.add.reduceat((x + x_next) * cross, starts) / divisor)
+    cy = np.where(degenerate, np.add.reduceat(y, starts) / counts[valid],
+                  np.add.reduceat((y + y_next) * cross, starts) / divisor)
+    area = np.abs(signed_area)
+
+    # circles: Ramanujan's approximation of the perimeter of the ellipse
+    circles = shapes.circles[valid]
+    if circles.any():
+        a, b = (xmax - xmin) / 2, (ymax - ymin) / 2
+        h = ((a - b) / np.where(a + b > 0, a + b, 1.0)) ** 2
+        area = np.where(circles, math.pi * a * b, area)
+        perimeter = np.where(circles, math.pi * (a + b) * (1 + 3 * h / (10 + np.sqrt(4 - 3 * h))), perimeter)
+        cx = np.where(circles, (xmin + xmax) / 2, cx)
+        cy = np.where(circles, (ymin + ymax) / 2, cy)
+
+    result[valid] = np.stack([area, perimeter, cx, cy, xmin, ymin, xmax, ymax], axis=1)
+    return result
+
+
+def candidate_pairs(boxes: "np.ndarray", groups: "np.ndarray") -> Tuple["np.ndarray", "np.ndarray"]:
+    """returns the indices (first, second) of the pairs of shapes of the same group (a row of groups, e.g. the file)
+    whose bounding boxes (xmin, ymin, xmax, ymax) overlap, each pair once
+    the boxes are sorted by group and xmin, so the candidates of a box are the following boxes
+    which start before it ends (sweep), only those are checked for an overlap in y"""
+    if len(boxes) < 2:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    _, groups = np.unique(groups, axis=0, return_inverse=True)
+    groups = groups.reshape(-1)
+    origin = boxes[:, 0].min()
+    stride = boxes[:, 2].max() - origin + 1  # separates the groups on a single axis
+    start = groups * stride + (boxes[:, 0] - origin)
+    order = np.argsort(start, kind="stable")
+    start = start[order]
+    end = np.searchsorted(start, groups[order] * stride + (boxes[order, 2] - origin), side="right")
+
+    # expand the ranges (i, end[i]) of the sorted boxes into pairs
+    counts = np.maximum(end - np.arange(len(order)) - 1, 0)
+    first = np.repeat(np.arange(len(order)), counts)
+    second = first + 1 + np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    first, second = order[first], order[second]
+    overlap = (boxes[first, 1] <= boxes[second, 3]) & (boxes[second, 1] <= boxes[first, 3])
+    return first[overlap], second[overlap]
+
+
+def polygon_area(vertices: "np.ndarray") -> float:
+    x, y = vertices[:, 0], vertices[:, 1]
+    return 0.5 * abs(float(np.dot(x, np.roll(y, -1)) - np.dot(np.roll(x, -1), y)))
+
+
+def intersection_area(first: "np.ndarray", second: "np.ndarray") -> float:
+    """returns the area of the intersection of two polygons"""
+    intersection = _path(first).intersected(_path(second))
+    return sum(polygon_area(np.array([(p.x(), p.y()) for p in polygon]))
+               for polygon in intersection.toSubpathPolygons() if polygon.count() > 2)
+
+
+def iou_bound(boxes: "np.ndarray", areas: "np.ndarray", first: "np.ndarray", second: "np.ndarray") -> "np.ndarray":
+    """returns an upper bound of the IoU of the pairs: the intersection is at most the intersection
+    of the bounding boxes and at most the smaller area"""
+    width = np.minimum(boxes[first, 2], boxes[second, 2]) - np.maximum(boxes[first, 0], boxes[second, 0])
+    height = np.minimum(boxes[first, 3], boxes[second, 3]) - np.maximum(boxes[first, 1], boxes[second, 1])
+    intersection = np.minimum(np.maximum(width, 0) * np.maximum(height, 0), np.minimum(areas[first], areas[second]))
+    union = areas[first] + areas[second] - intersection
+    return np.where(union > 0, intersection / np.where(union > 0, union, 1.0), 0.0)
+
+
+def overlaps(shapes: ShapeArrays, areas: "np.ndarray", boxes: "np.ndarray", first: "np.ndarray",
+             second: "np.ndarray", min_iou: float = 0.0) -> List[Tuple[int, int, float]]:
+    """returns (first index, second index, IoU) of the candidate pairs with an IoU above min_iou
+    only the pairs whose upper bound of the IoU exceeds min_iou are intersected"""
+    keep = iou_bound(boxes, areas, first, second) > min_iou
+    result = list()
+    for i, j in zip(first[keep].tolist(), second[keep].tolist()):
+        intersection = intersection_area(shapes.polygon(i), shapes.polygon(j))
+        union = float(areas[i] + areas[j]) - intersection
+        iou = intersection / union if union > 0 else 0.0
+        if iou > min_iou:
+            result.append((i, j, iou))
+    return result
+
+
+def _path(vertices: "np.ndarray") -> QPainterPath:
+    path = QPainterPath()
+    path.addPolygon(QPolygonF([QPointF(x, y) for x, y in vertices.tolist()]))
+    path.closeSubpath()
+    return path
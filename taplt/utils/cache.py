@@ -0,0 +1,72 @@
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable
+
+
+class LookupCache:
+    """a small dictionary cache, e.g. for the dimension tables of the database (labels, patients, files)
+    keeps track of hits and misses so that the hit-rate can be inspected.
+    if max_entries is given, the least recently used entries are evicted beyond that size"""
+
+    def __init__(self, name: str, max_entries: int = None):
+        self.name = name
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # type: Dict[Hashable, Any]
+        self.hits = 0
+        self.misses = 0
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key: Hashable, loader: Callable[[Hashable], Any]):
+        """
+        returns the cached value for the key, calls the loader on a miss
+        :param key: the lookup key, e.g. a filename or a label class
+        :param loader: function retrieving the value from the database; None results are not cached
+        """
+        try:
+            value = self._entries[key]
+        except KeyError:
+            self.misses += 1
+            value = loader(key)
+            self.put(key, value)
+            return value
+        self.hits += 1
+        if self.max_entries is not None:
+            self._entries.move_to_end(key)
+        return value
+
+    def put(self, key: Hashable, value: Any):
+        """stores a value which is already known, e.g. right after inserting it into the database"""
+        if value is not None:
+            self._entries[key] = value
+            if self.max_entries is not None:
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+
+    def invalidate(self, key: Hashable = None):
+        """removes the given key from the cache; if no key is passed, the whole cache is cleared"""
+        if key is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(key, None)
+
+    def hit_rate(self) -> float:
+        """returns the fraction of lookups answered from the cache"""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def statistics(self) -> dict:
+        """returns the number of entries, hits, misses and the hit-rate of the cache"""
+        return {'name': self.name,
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hit_rate()}
+
+    def reset_statistics(self):
+        self.hits = 0
+        self.misses = 0
@@ -0,0 +1,62 @@
+import colorsys
+from typing import Iterable, Optional, Tuple
+
+from PyQt6.QtGui import QColor
+
+COLORS_PER_LAYER = 8  # colors per layer of the hsv cone, the last hue is reserved for shapes being drawn
+NUM_LAYERS = 4
+
+
+def color_for_index(index: int) -> str:
+    """returns the color of the index-th label class as '#rrggbb'. uses the hues of colormap_rgb, but starts
+    the next (darker) layer once all hues are used and repeats the layers instead of running into black"""
+    hues = COLORS_PER_LAYER - 1
+    h = (index % hues) * (1.0 / COLORS_PER_LAYER)
+    v = 1.0 - (0.2 * ((index // hues) % NUM_LAYERS))
+    return _to_hex(colorsys.hsv_to_rgb(h, 1.0, v))
+
+
+def _to_hex(rgb: Tuple[float, float, float]) -> str:
+    return "#{:02x}{:02x}{:02x}".format(*(int(round(255 * c)) for c in rgb))
+
+
+NEW_SHAPE_COLOR = _to_hex(colorsys.hsv_to_rgb((COLORS_PER_LAYER - 1) / COLORS_PER_LAYER, 1.0, 1.0))
+
+
+class ColorRegistry:
+    """the colors of the project's label classes, shared by all widgets
+    filled with the colors stored in the database and extended for classes which are not stored yet"""
+
+    def __init__(self):
+        self.by_uid = dict()  # label uid -> QColor
+        self.by_class = dict()  # label class -> QColor
+
+    def __contains__(self, label_class: str) -> bool:
+        return label_class in self.by_class
+
+    def __len__(self):
+        return len(self.by_class)
+
+    def clear(self):
+        self.by_uid.clear()
+        self.by_class.clear()
+
+    def color(self, label_class: str) -> QColor:
+        """returns the color of the label class, a class without color gets the next one of the sequence"""
+        color = self.by_class.get(label_class)
+        if color is None:
+            color = self.by_class[label_class] = QColor(color_for_index(len(self.by_class)))
+        return color
+
+    def color_of_uid(self, label_uid: int) -> Optional[QColor]:
+        return self.by_uid.get(label_uid)
+
+    def update(self, labels: Iterable[Tuple[int, str, str]]):
+        """registers the (label uid, label class, color) entries; known labels keep their QColor objects"""
+        for label_uid, label_class, color in labels:
+            if label_uid in self.by_uid:
+                continue
+            known = self.by_class.get(label_class)
+            if known is None or known.name() != color:
+                known = self.by_class[label_class] = QColor(color)
+            self.by_uid[label_uid] = known
@@ -1,12 +1,21 @@
 import sqlite3
 import pickle
 import pathlib
-import shutil
+import getpass
+import time
 import os
 
 from typing import List, Union
+from taplt.config import BUSY_TIMEOUT, JOURNAL_INTERVAL, LEASE_DURATION, SQLITE_JOURNAL_MODE
+from taplt.utils import analytics
+from taplt.utils.cache import LookupCache
+from taplt.utils.colors import color_for_index
+from taplt.utils.instrumentation import timed
+from taplt.utils.profiler import ProfilingCursor, QueryProfiler
 from taplt.utils.project_structure import modality, create_project_structure, Structure
 from taplt.utils.settings import SETTINGS, get_tooltip
+from taplt.utils import filters, journal, maintenance, snapshot, video
+from taplt.utils.thumbnails import copy_with_hash
 
 from PyQt6.QtCore import pyqtSignal, QObject, QSettings
 
@@ -21,14 +30,19 @@ CREATE_ANNOTATIONS_TABLE = """
     patient INTEGER NOT NULL,
     shape BLOB,
     label INTEGER NOT NULL,
+    frame INTEGER NOT NULL DEFAULT 0,
     FOREIGN KEY (patient) REFERENCES patients(uid),
     FOREIGN KEY (label) REFERENCES labels(uid));"""
 
+CREATE_ANNOTATIONS_INDEX = "CREATE INDEX IF NOT EXISTS annotations_frame ON annotations (modality, file, frame);"
+
 CREATE_VIDEOS_TABLE = """
     CREATE TABLE IF NOT EXISTS videos (
     uid INTEGER PRIMARY KEY,
     filename TEXT NOT NULL UNIQUE,
     patient INTEGER,
+    frame_count INTEGER,
+    fps REAL,
     FOREIGN KEY (patient) REFERENCES patients(uid));"""
 
 CREATE_IMAGES_TABLE = """
@@ -54,6 +68,38 @@ CREATE_WSI_TABLE = """
 
 FILE_TABLES = ['videos', 'images', "'whole slide images'"]
 
+# unified file registry: one row per file of any modality, kept in sync with the file tables by triggers.
+# 'file' is the uid inside the modality's table, 'sort_key' defines the order of the files within a modality,
+# 'hash' is the content hash of the file (keys the thumbnail cache)
+CREATE_FILES_TABLE = """
+    CREATE TABLE IF NOT EXISTS files (
+    uid INTEGER PRIMARY KEY,
+    modality INTEGER NOT NULL,
+    file INTEGER NOT NULL,
+    filename TEXT NOT NULL,
+    patient INTEGER,
+    sort_key INTEGER NOT NULL,
+    hash TEXT);"""
+
+CREATE_FILES_INDICES = ["CREATE UNIQUE INDEX IF NOT EXISTS files_filename ON files (filename, modality);",
+                        "CREATE UNIQUE INDEX IF NOT EXISTS files_file ON files (modality, file);",
+                        "CREATE UNIQUE INDEX IF NOT EXISTS files_sort_key ON files (modality, sort_key);",
+                        "CREATE INDEX IF NOT EXISTS files_patient ON files (patient);"]
+
+CREATE_FILES_TRIGGERS = [
+    """CREATE TRIGGER IF NOT EXISTS files_insert_{modality} AFTER INSERT ON {table} BEGIN
+       INSERT INTO files (modality, file, filename, patient, sort_key)
+       VALUES ({modality}, NEW.uid, NEW.filename, NEW.patient, NEW.uid); END;""",
+    """CREATE TRIGGER IF NOT EXISTS files_delete_{modality} AFTER DELETE ON {table} BEGIN
+       DELETE FROM files WHERE modality = {modality} AND file = OLD.uid; END;""",
+    """CREATE TRIGGER IF NOT EXISTS files_update_{modality} AFTER UPDATE OF filename, patient ON {table} BEGIN
+       UPDATE files SET filename = NEW.filename, patient = NEW.patient
+       WHERE modality = {modality} AND file = OLD.uid; END;"""]
+
+# registers files which were added before the registry existed
+FILL_FILES_TABLE = """INSERT OR IGNORE INTO files (modality, file, filename, patient, sort_key)
+                      SELECT {modality}, uid, filename, patient, uid FROM {table};"""
+
 CREATE_PATIENTS_TABLE = """
     CREATE TABLE IF NOT EXISTS patients (
     uid INTEGER PRIMARY KEY,
@@ -63,40 +109,266 @@ CREATE_PATIENTS_TABLE = """
 CREATE_LABELS_TABLE = """
     CREATE TABLE IF NOT EXISTS labels (
     uid INTEGER PRIMARY KEY,
-    label_class TEXT NOT NULL UNIQUE);"""
+    label_class TEXT NOT NULL UNIQUE,
+    color TEXT);"""
+
+# keyframe index of the videos, built at import time to enable fast seeking
+CREATE_KEYFRAMES_TABLE = """
+    CREATE TABLE IF NOT EXISTS keyframes (
+    video INTEGER NOT NULL,
+    frame INTEGER NOT NULL,
+    pts INTEGER NOT NULL,
+    PRIMARY KEY (video, frame),
+    FOREIGN KEY (video) REFERENCES videos(uid) ON DELETE CASCADE) WITHOUT ROWID;"""
+
+# edits of the displayed file which are not saved yet, see taplt.utils.journal. 'file' is the registry uid,
+# 'user' the annotator who made them - each annotator replays their own edits only. 'version' is the version
+# of the annotations the edits are based on, the edits are not replayed if someone else has saved the file since
+CREATE_JOURNAL_TABLE = """
+    CREATE TABLE IF NOT EXISTS journal (
+    uid INTEGER PRIMARY KEY,
+    file INTEGER NOT NULL,
+    frame INTEGER NOT NULL DEFAULT 0,
+    operation TEXT NOT NULL,
+    delta TEXT NOT NULL,
+    user TEXT,
+    version INTEGER);"""
+
+# measures of the annotations derived from their shapes, see taplt.utils.analytics.
+# the rows are removed together with their annotation and computed again when they are requested
+CREATE_GEOMETRY_TABLE = """
+    CREATE TABLE IF NOT EXISTS geometry (
+    annotation INTEGER PRIMARY KEY,
+    area REAL NOT NULL,
+    perimeter REAL NOT NULL,
+    cx REAL NOT NULL,
+    cy REAL NOT NULL,
+    xmin REAL NOT NULL,
+    ymin REAL NOT NULL,
+    xmax REAL NOT NULL,
+    ymax REAL NOT NULL);"""
+
+CREATE_GEOMETRY_TRIGGERS = [
+    """CREATE TRIGGER IF NOT EXISTS geometry_delete AFTER DELETE ON annotations BEGIN
+       DELETE FROM geometry WHERE annotation = OLD.uid; END;""",
+    """CREATE TRIGGER IF NOT EXISTS geometry_update AFTER UPDATE OF shape ON annotations BEGIN
+       DELETE FROM geometry WHERE annotation = OLD.uid; END;"""]
+
+# the version of the annotations of each file (frame), incremented by every save. a save states the version
+# its edits are based on and stores nothing if another annotator has saved in the meantime (optimistic concurrency)
+CREATE_VERSIONS_TABLE = """
+    CREATE TABLE IF NOT EXISTS annotation_versions (
+    modality INTEGER NOT NULL,
+    file INTEGER NOT NULL,
+    frame INTEGER NOT NULL,
+    version INTEGER NOT NULL,
+    modified_by TEXT,
+    modified REAL,
+    PRIMARY KEY (modality, file, frame)) WITHOUT ROWID;"""
+
+# increments the version if it is the expected one (or none is expected) - as the first write of the save,
+# which locks the database until the annotations are stored. returns no row on a conflict
+BUMP_VERSION = """INSERT INTO annotation_versions VALUES (:modality, :file, :frame, 1, :user, :time)
+                  ON CONFLICT (modality, file, frame) DO UPDATE SET version = version + 1,
+                  modified_by = excluded.modified_by, modified = excluded.modified
+                  WHERE :version IS NULL OR version = :version RETURNING version;"""
+
+# the files of an annotation campaign in the order they are handed out. an annotator claims a file for a limited
+# time (lease), the lease is renewed whenever the file is saved. files whose lease expired (e.g. because the
+# program crashed) are handed out again. 'file' is the registry uid
+CREATE_QUEUE_TABLE = """
+    CREATE TABLE IF NOT EXISTS work_queue (
+    file INTEGER PRIMARY KEY,
+    position INTEGER NOT NULL,
+    done INTEGER NOT NULL DEFAULT 0,
+    claimed_by TEXT,
+    lease_until REAL NOT NULL DEFAULT 0);"""
+
+CREATE_QUEUE_INDEX = "CREATE INDEX IF NOT EXISTS work_queue_open ON work_queue (position) WHERE done = 0;"
+
+# claims the first file which is not done and not (or no longer) claimed, in a single statement
+CLAIM_FILE = """UPDATE work_queue SET claimed_by = :user, lease_until = :now + :lease
+                WHERE file = (SELECT file FROM work_queue WHERE done = 0 AND lease_until < :now
+                              ORDER BY position LIMIT 1)
+                RETURNING file;"""
+
+# summary of the annotations per label class, patient and file, maintained by triggers on the annotations
+# so that the statistics are read without scanning the annotations. files without annotations have no row
+CREATE_STATISTICS_TABLES = {
+    "label_statistics": """
+        CREATE TABLE IF NOT EXISTS label_statistics (
+        label INTEGER PRIMARY KEY,
+        annotations INTEGER NOT NULL);""",
+    "patient_statistics": """
+        CREATE TABLE IF NOT EXISTS patient_statistics (
+        patient INTEGER PRIMARY KEY,
+        annotations INTEGER NOT NULL);""",
+    "file_statistics": """
+        CREATE TABLE IF NOT EXISTS file_statistics (
+        modality INTEGER NOT NULL,
+        file INTEGER NOT NULL,
+        annotations INTEGER NOT NULL,
+        PRIMARY KEY (modality, file)) WITHOUT ROWID;""",
+    "file_label_statistics": """
+        CREATE TABLE IF NOT EXISTS file_label_statistics (
+        label INTEGER NOT NULL,
+        modality INTEGER NOT NULL,
+        file INTEGER NOT NULL,
+        annotations INTEGER NOT NULL,
+        PRIMARY KEY (label, modality, file)) WITHOUT ROWID;"""}
+
+CREATE_STATISTICS_INDICES = [
+    "CREATE INDEX IF NOT EXISTS file_statistics_annotations ON file_statistics (annotations);"]
+
+# fills the summary tables of projects which were created before they existed
+FILL_STATISTICS_TABLES = {
+    "label_statistics": "INSERT INTO label_statistics SELECT label, COUNT(*) FROM annotations GROUP BY label;",
+    "patient_statistics": "INSERT INTO patient_statistics SELECT patient, COUNT(*) FROM annotations GROUP BY patient;",
+    "file_statistics": """INSERT INTO file_statistics SELECT modality, file, COUNT(*) FROM annotations
+                          GROUP BY modality, file;""",
+    "file_label_statistics": """INSERT INTO file_label_statistics SELECT label, modality, file, COUNT(*)
+                                FROM annotations GROUP BY label, modality, file;"""}
 
-ADD_ANNOTATION = "INSERT INTO annotations (modality, file, patient, shape, label) VALUES (?, ?, ?, ?, ?);"
+COUNT_ANNOTATION = """
+    INSERT INTO label_statistics VALUES (NEW.label, 1)
+    ON CONFLICT (label) DO UPDATE SET annotations = annotations + 1;
+    INSERT INTO patient_statistics VALUES (NEW.patient, 1)
+    ON CONFLICT (patient) DO UPDATE SET annotations = annotations + 1;
+    INSERT INTO file_statistics VALUES (NEW.modality, NEW.file, 1)
+    ON CONFLICT (modality, file) DO UPDATE SET annotations = annotations + 1;
+    INSERT INTO file_label_statistics VALUES (NEW.label, NEW.modality, NEW.file, 1)
+    ON CONFLICT (label, modality, file) DO UPDATE SET annotations = annotations + 1;"""
+
+UNCOUNT_ANNOTATION = """
+    UPDATE label_statistics SET annotations = annotations - 1 WHERE label = OLD.label;
+    UPDATE patient_statistics SET annotations = annotations - 1 WHERE patient = OLD.patient;
+    UPDATE file_statistics SET annotations = annotations - 1 WHERE modality = OLD.modality AND file = OLD.file;
+    DELETE FROM file_statistics WHERE modality = OLD.modality AND file = OLD.file AND annotations = 0;
+    UPDATE file_label_statistics SET annotations = annotations - 1
+    WHERE label = OLD.label AND modality = OLD.modality AND file = OLD.file;
+    DELETE FROM file_label_statistics
+    WHERE label = OLD.label AND modality = OLD.modality AND file = OLD.file AND annotations = 0;"""
+
+STATISTICS_TRIGGERS = ["statistics_insert", "statistics_delete", "statistics_update"]
+CREATE_STATISTICS_TRIGGERS = [
+    "CREATE TRIGGER IF NOT EXISTS statistics_insert AFTER INSERT ON annotations BEGIN {} END;".format(
+        COUNT_ANNOTATION),
+    "CREATE TRIGGER IF NOT EXISTS statistics_delete AFTER DELETE ON annotations BEGIN {} END;".format(
+        UNCOUNT_ANNOTATION),
+    """CREATE TRIGGER IF NOT EXISTS statistics_update AFTER UPDATE OF modality, file, patient, label ON annotations
+       BEGIN {} {} END;""".format(UNCOUNT_ANNOTATION, COUNT_ANNOTATION)]
+
+TOP_FILES = 100  # files with the most annotations listed in the statistics
+
+# full-text index of the comments of the annotations: one document per file (the rowid is the registry uid)
+# holding the comments of all annotations of the file, it is refreshed whenever the annotations of a file are stored
+CREATE_COMMENT_INDEX = "CREATE VIRTUAL TABLE IF NOT EXISTS file_comments USING fts5 (comments);"
+
+FILL_COMMENT_INDEX = """INSERT INTO file_comments (rowid, comments)
+                        SELECT f.uid, GROUP_CONCAT(a.comment, ' ') FROM annotations AS a
+                        JOIN files AS f ON f.modality = a.modality AND f.file = a.file
+                        WHERE a.comment != '' {} GROUP BY f.uid;"""
+
+SEARCH_LIMIT = 1000  # files returned by a search
+# the tables a search starts from, each one holds only the files matching one of the criteria; the files and their
+# statistics are joined to the matches (CROSS JOIN keeps SQLite from scanning the files in the file list order)
+SEARCH_BY_COMMENT = """(SELECT rowid AS uid FROM file_comments WHERE file_comments MATCH ?) AS m
+                       CROSS JOIN files AS f ON f.uid = m.uid
+                       LEFT JOIN file_statistics AS s ON s.modality = f.modality AND s.file = f.file"""
+SEARCH_BY_LABEL = """file_label_statistics AS l
+                     CROSS JOIN files AS f ON f.modality = l.modality AND f.file = l.file
+                     LEFT JOIN file_statistics AS s ON s.modality = f.modality AND s.file = f.file"""
+SEARCH_BY_ANNOTATIONS = """file_statistics AS s
+                           CROSS JOIN files AS f ON f.modality = s.modality AND f.file = s.file"""
+SEARCH_ALL = """files AS f
+                LEFT JOIN file_statistics AS s ON s.modality = f.modality AND s.file = f.file"""
+
+GEOMETRY_COLUMNS = ("annotation", "modality", "file", "frame", "label") + analytics.MEASURES
+GEOMETRY_CHUNK = 20000  # shapes unpickled at once when computing missing measures
+
+# columns which were added after the initial table definitions: (table, column, definition)
+ADDED_COLUMNS = [("annotations", "frame", "INTEGER NOT NULL DEFAULT 0"),
+                 ("annotations", "comment", "TEXT NOT NULL DEFAULT ''"),
+                 ("annotations", "created_by", "TEXT"),
+                 ("annotations", "modified_by", "TEXT"),
+                 ("videos", "frame_count", "INTEGER"),
+                 ("videos", "fps", "REAL"),
+                 ("files", "hash", "TEXT"),
+                 ("labels", "color", "TEXT"),
+                 ("journal", "user", "TEXT"),
+                 ("journal", "version", "INTEGER")]
+
+ADD_ANNOTATION = """INSERT INTO annotations (modality, file, patient, shape, label, frame, comment)
+                    VALUES (?, ?, ?, ?, ?, ?, ?);"""
 ADD_VIDEO = "INSERT INTO videos (filename, patient) VALUES (?, ?);"
 ADD_IMAGE = "INSERT INTO images (filename, patient) VALUES (?, ?);"
 ADD_WSI = "INSERT INTO 'whole slide images' (filename, patient) VALUES (?, ?);"
 ADD_PATIENT = "INSERT INTO patients (some_id, another_id) VALUES (?, ?);"
-ADD_LABEL = "INSERT INTO labels (label_class) VALUES (?);"
+ADD_LABEL = "INSERT INTO labels (label_class, color) VALUES (?, ?);"
+ADD_KEYFRAME = "INSERT OR REPLACE INTO keyframes (video, frame, pts) VALUES (?, ?, ?);"
+ADD_JOURNAL_RECORD = """INSERT INTO journal (file, frame, operation, delta, user, version)
+                        VALUES (?, ?, ?, ?, ?, ?);"""
+USER_RECORDS = "(user = ? OR user IS NULL)"  # the journal records of an annotator
+ADD_GEOMETRY = "INSERT OR REPLACE INTO geometry VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?);"
 
 DELETE_FILE_ANNOTATIONS = "DELETE FROM annotations WHERE modality = ? AND file = ?"
 
 
 class SQLiteDatabase(QObject):
     """class to control an SQL database. inherits a QObject to enable pyqt-signal transfer"""
-    sUpdate = pyqtSignal(list, int, str, list, list)
+    sUpdateFile = pyqtSignal(int, str, str, list)  # file uid, filepath, patient, labels
+    sUpdateVideo = pyqtSignal(int, str, str, list, int, dict)  # file uid, filepath, patient, labels, frame, index
+    sUpdateFileList = pyqtSignal(list, int, int)  # files, uid of the current file, modality
+    sUpdateFileState = pyqtSignal(int, bool)  # file uid, whether the file holds annotations
+    sUpdateClasses = pyqtSignal(list)  # (label uid, label class, color) of all label classes
+    sProjectOpened = pyqtSignal(str)  # project location
     sImportFile = pyqtSignal(list)
     sOpenSettings = pyqtSignal(list)
+    sOpenStatistics = pyqtSignal(dict)  # see get_statistics
+    sSearchResults = pyqtSignal(list)  # see search
+    sFilePage = pyqtSignal(int, str, list)  # modality, filter expression, files (see filter_files)
+    sSaveConflict = pyqtSignal(int, int, str)  # file uid, frame, annotator who saved the file in the meantime
+    sWorkQueue = pyqtSignal(int, int, int)  # files of the work queue which are open, claimed by the user, done
+    sSnapshotProgress = pyqtSignal(int, int, str)  # steps done, steps in total, current step - from another thread
+    sSnapshotFinished = pyqtSignal(str, str)  # path of the snapshot, error message (empty on success)
+    sMaintenanceProgress = pyqtSignal(int, int, str)  # steps done, steps in total (0 if unknown), current step
+    sMaintenanceFinished = pyqtSignal(list)  # the report, see taplt.utils.maintenance
     sApplySettings = pyqtSignal(list)
     sPreviewDatabase = pyqtSignal(list, list)
 
-    def __init__(self):
+    def __init__(self, profile: bool = None, user: str = None):
         super(SQLiteDatabase, self).__init__()
         self.connection = None
         self.cursor = None
+        if profile is None:
+            profile = bool(os.environ.get("TAPLT_PROFILE_SQL"))
+        self.profiler = QueryProfiler(self) if profile else None  # debug mode: records all statements
+        self.journal_writer = None  # type: journal.JournalWriter
+        self.snapshot_writer = None  # type: snapshot.SnapshotWriter
+        self.maintenance_worker = None  # type: maintenance.MaintenanceWorker
         self.location = ""
         self.file_tables = FILE_TABLES
         self.is_initialized = False
         self.settings = None  # type: QSettings
+        self.user = user or current_user()  # recorded with the annotations this instance stores
+        self.versions = dict()  # (file uid, frame) -> version of the annotations when they were displayed
+
+        # in-process caches for the dimension tables, invalidated on writes
+        self.label_cache = LookupCache("labels")  # label class -> label uid
+        self.file_cache = LookupCache("files")  # filename -> (modality, file uid)
+        self.patient_cache = LookupCache("patients by file")  # filename -> patient uid
+        self.patient_id_cache = LookupCache("patient ids")  # patient uid -> patient id
+        self.caches = [self.label_cache, self.file_cache, self.patient_cache, self.patient_id_cache]
 
-    def add_annotation(self, modality: int, file: int, patient: int, shape: bytes, label: int):
+    def add_annotation(self, modality: int, file: int, patient: int, shape: bytes, label: int, frame: int = 0,
+                       comment: str = ""):
         """ adds an entry to the annotation table using the parameter values"""
         with self.connection:
-            self.cursor.execute(ADD_ANNOTATION, (modality, file, patient, shape, label))
+            self.cursor.execute(ADD_ANNOTATION, (modality, file, patient, shape, label, frame, comment))
+            if comment:
+                self.update_file_comments(modality, file)
 
+    @timed()
     def add_file(self, filepath: str, patient: str):
         """
         adds a file to the database
@@ -112,22 +384,48 @@ class SQLiteDatabase(QObject):
 
             # copy to project location and add to database
             if mod == 0:
-                shutil.copy(filepath, self.location + Structure.VIDEOS_DIR)
                 self.cursor.execute(ADD_VIDEO, (os.path.basename(filepath), patient))
             elif mod == 1:
-                shutil.copy(filepath, self.location + Structure.IMAGES_DIR)
                 self.cursor.execute(ADD_IMAGE, (os.path.basename(filepath), patient))
             elif mod == 2:
-                shutil.copy(filepath, self.location + Structure.WSI_DIR)
                 self.cursor.execute(ADD_WSI, (os.path.basename(filepath), patient))
+            else:
+                return
+            file_uid = self.cursor.lastrowid
+
+            # the file is hashed while it is copied - the hash keys the thumbnail cache
+            content_hash = copy_with_hash(filepath, self.location + Structure.MODALITY_DIRS[mod])
+            self.cursor.execute("UPDATE files SET hash = ? WHERE modality = ? AND file = ?",
+                                (content_hash, mod, file_uid))
+            if mod == 0 and video.load_av() is not None:
+                self.add_video_index(file_uid, filepath)
+        self.file_cache.invalidate(os.path.basename(filepath))
+        self.patient_cache.invalidate(os.path.basename(filepath))
 
-    def add_label(self, label_class: str):
-        """ add a new label class to database"""
+    def add_video_index(self, video_uid: int, filepath: str) -> video.VideoIndex:
+        """builds the keyframe index of a video and stores it in the database"""
+        index = video.build_keyframe_index(filepath)
         with self.connection:
-            # make sure label does not already exist
-            if self.cursor.execute("SELECT uid FROM labels WHERE label_class = ?", (label_class,)).fetchone():
-                return
-            self.cursor.execute(ADD_LABEL, (label_class,))
+            self.cursor.execute("UPDATE videos SET frame_count = ?, fps = ? WHERE uid = ?",
+                                (index.frame_count, index.fps, video_uid))
+            self.cursor.execute("DELETE FROM keyframes WHERE video = ?", (video_uid,))
+            self.cursor.executemany(ADD_KEYFRAME, [(video_uid, frame, pts) for frame, pts in index.keyframes])
+        return index
+
+    def add_label(self, label_class: str, color: str = None) -> bool:
+        """ add a new label class to database
+        if no color ('#rrggbb') is given, the class gets the next color of the sequence
+        returns whether the label class was newly added"""
+        # make sure label does not already exist
+        if self.get_uid_from_label(label_class) is not None:
+            return False
+        with self.connection:
+            if color is None:
+                count = self.cursor.execute("SELECT COUNT(*) FROM labels").fetchone()[0]
+                color = color_for_index(count)
+            self.cursor.execute(ADD_LABEL, (label_class, color))
+        self.label_cache.put(label_class, self.cursor.lastrowid)
+        return True
 
     def add_patient(self, some_id: str, another_id: str = "2"):
         """ add a new patient to database
@@ -140,16 +438,82 @@ class SQLiteDatabase(QObject):
             result = self.cursor.execute("SELECT uid FROM patients WHERE some_id = ?", (some_id,)).fetchone()
         return result[0]
 
-    def create_annotation_entry(self, filename: str, label_dict: dict, label_class: str):
-        mod, file_uid = self.get_uids_from_filename(filename)
-        patient_uid = self.get_patient_by_filename(filename)
+    def append_journal(self, file_uid: int, frame: int, operation: str, delta: str):
+        """appends an edit of the annotations of the file (frame), see taplt.utils.journal
+        the edit is only queued, the journal writer stores it in the background"""
+        record = (file_uid, frame, operation, delta, self.user, self.versions.get((file_uid, frame)))
+        if self.journal_writer is not None:
+            self.journal_writer.append(record)
+        else:
+            with self.connection:
+                self.cursor.execute(ADD_JOURNAL_RECORD, record)
+
+    def claim_file(self, lease: float = LEASE_DURATION) -> int:
+        """claims the next file of the work queue for the user, returns its registry uid / -1 if there is none
+        :param lease: the seconds until the file may be claimed by someone else, unless the claim is renewed
+        """
+        with self.connection:
+            result = self.cursor.execute(CLAIM_FILE, {'user': self.user, 'now': time.time(),
+                                                      'lease': lease}).fetchone()
+        return result[0] if result is not None else -1
+
+    def clear_journal(self, file_uid: int, frame: int = 0):
+        """removes the user's journaled edits of the file (frame), e.g. after they were saved or dismissed"""
+        self.flush_journal()
+        with self.connection:
+            self.cursor.execute("DELETE FROM journal WHERE file = ? AND frame = ? AND user = ?",
+                                (file_uid, frame, self.user))
+
+    def close_journal(self):
+        """stops the journal writer after storing the queued edits, e.g. when the project is closed"""
+        if self.journal_writer is not None:
+            self.journal_writer.close()
+            self.journal_writer = None
+
+    def complete_file(self, file_uid: int):
+        """marks the file as done if the user has claimed it"""
+        with self.connection:
+            self.cursor.execute("""UPDATE work_queue SET done = 1, lease_until = 0
+                                   WHERE file = ? AND claimed_by = ? AND done = 0""", (file_uid, self.user))
+
+    def connect(self, database_path: str):
+        """opens the connection to the database without updating the gui, e.g. for the command line tools"""
+        self.location = str(pathlib.Path(database_path).parents[0])
+        self.connection = sqlite3.connect(database_path, timeout=BUSY_TIMEOUT)
+        self.cursor = self.connection.cursor()
+        # several annotators may work on the project at once, readers do not block the writer in WAL mode
+        self.cursor.execute("PRAGMA journal_mode = {};".format(SQLITE_JOURNAL_MODE))
+        if self.profiler is not None:
+            self.cursor = ProfilingCursor(self.cursor, self.profiler)
+        self.invalidate_caches()
+        self.versions.clear()
+
+    def create_annotation_entry(self, filename: str, label_dict: dict, label_class: str, file_row: tuple = None,
+                                frame: int = 0):
+        """
+        :param filename: the file the annotation belongs to; ignored if file_row is given
+        :param label_dict: the serializable representation of the shape
+        :param label_class: the label class of the shape
+        :param file_row: the entry of the file registry as returned by get_file
+        :param frame: the frame number in case of a video
+        :return: a dictionary representing the annotation entry
+        """
+        if file_row is not None:
+            _, mod, file_uid, filename, patient_uid = file_row
+        else:
+            mod, file_uid = self.get_uids_from_filename(filename)
+            patient_uid = self.get_patient_by_filename(filename)
         label_class = self.get_uid_from_label(label_class)
+        label_dict = dict(label_dict, created_by=label_dict.get('created_by') or self.user)
 
         annotation_entry = {'modality': mod,
                             'file': file_uid,
                             'patient': patient_uid,
                             'shape': pickle.dumps(label_dict),
-                            'label': label_class}
+                            'label': label_class,
+                            'frame': frame,
+                            'comment': label_dict.get('comment') or "",
+                            'created_by': label_dict['created_by']}
 
         return annotation_entry
 
@@ -158,6 +522,9 @@ class SQLiteDatabase(QObject):
         sets up the structure defined in
         https://docs.google.com/spreadsheets/d/1lJ_ywagiQVbEQ2LyJdRZNwUjUeGSy73Z2PXkOzsXx6U/edit#gid=0
         """
+        # saving replaces the annotations of a file, the free pages are released by taplt.utils.maintenance.
+        # only takes effect before the first table is created
+        self.cursor.execute("PRAGMA auto_vacuum = INCREMENTAL;")
         with self.connection:
             self.cursor.execute(CREATE_VIDEOS_TABLE)
             self.cursor.execute(CREATE_IMAGES_TABLE)
@@ -165,28 +532,174 @@ class SQLiteDatabase(QObject):
             self.cursor.execute(CREATE_PATIENTS_TABLE)
             self.cursor.execute(CREATE_LABELS_TABLE)
             self.cursor.execute(CREATE_ANNOTATIONS_TABLE)
+            self.cursor.execute(CREATE_KEYFRAMES_TABLE)
+            self.cursor.execute(CREATE_FILES_TABLE)
+            self.cursor.execute(CREATE_JOURNAL_TABLE)
+            self.cursor.execute(CREATE_GEOMETRY_TABLE)
+            self.cursor.execute(CREATE_VERSIONS_TABLE)
+            self.cursor.execute(CREATE_QUEUE_TABLE)
+            for table_name, column, definition in ADDED_COLUMNS:
+                if column not in self.get_column_names(table_name):
+                    self.cursor.execute("ALTER TABLE {} ADD COLUMN {} {}".format(table_name, column, definition))
+                    if (table_name, column) == ("annotations", "comment"):
+                        self.fill_comments()
+            self.cursor.execute(CREATE_ANNOTATIONS_INDEX)
+            self.cursor.execute(CREATE_QUEUE_INDEX)
+            for trigger in CREATE_GEOMETRY_TRIGGERS:
+                self.cursor.execute(trigger)
+            self.create_file_registry()
+            self.create_statistics()
+            self.create_comment_index()
+            self.fill_label_colors()
 
-    def delete_file(self, filename: str, cur_img_idx: int):
+    def create_comment_index(self):
+        """creates the full-text index of the comments, a new index is built from the annotations"""
+        with self.connection:
+            exists = self.cursor.execute("""SELECT EXISTS (SELECT 1 FROM sqlite_master
+                                            WHERE name = 'file_comments')""").fetchone()[0]
+            self.cursor.execute(CREATE_COMMENT_INDEX)
+            if not exists:
+                self.cursor.execute(FILL_COMMENT_INDEX.format(""))
+
+    def create_file_registry(self):
+        """creates the unified file registry including its indices and triggers
+        and registers all files which are not part of it yet"""
+        with self.connection:
+            self.cursor.execute(CREATE_FILES_TABLE)
+            for index in CREATE_FILES_INDICES:
+                self.cursor.execute(index)
+            for modality, table_name in enumerate(self.file_tables):
+                for trigger in CREATE_FILES_TRIGGERS:
+                    self.cursor.execute(trigger.format(modality=modality, table=table_name))
+                self.cursor.execute(FILL_FILES_TABLE.format(modality=modality, table=table_name))
+
+    def create_snapshot(self, backup_path: str) -> bool:
+        """copies the project to the backup directory in the background, see taplt.utils.snapshot;
+        returns False if a snapshot is in progress already"""
+        if self.snapshot_writer is not None and self.snapshot_writer.is_alive():
+            return False
+        self.flush_journal()
+        if self.settings is not None:
+            self.settings.sync()  # QSettings writes its changes to the settings file with a delay
+        self.snapshot_writer = snapshot.SnapshotWriter(self.location, backup_path, self.sSnapshotProgress.emit,
+                                                       self.sSnapshotFinished.emit)
+        self.snapshot_writer.start()
+        return True
+
+    def create_statistics(self):
+        """creates the summary tables of the annotations including their indices and triggers,
+        tables which did not exist yet are filled from the annotations"""
+        with self.connection:
+            tables = {row[0] for row in self.cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+            new_tables = [table_name for table_name in CREATE_STATISTICS_TABLES if table_name not in tables]
+            for table_name in new_tables:
+                self.cursor.execute(CREATE_STATISTICS_TABLES[table_name])
+                self.cursor.execute(FILL_STATISTICS_TABLES[table_name])
+            for index in CREATE_STATISTICS_INDICES:
+                self.cursor.execute(index)
+            # the triggers of older projects do not maintain the new tables yet
+            if new_tables:
+                for trigger in STATISTICS_TRIGGERS:
+                    self.cursor.execute("DROP TRIGGER IF EXISTS {}".format(trigger))
+            for trigger in CREATE_STATISTICS_TRIGGERS:
+                self.cursor.execute(trigger)
+
+    @timed()
+    def delete_file(self, filename: str, cur_file_uid: int):
         """ this method deletes a file from the database and removes all corresponding annotations
         updates the gui afterwards while regarding the possible image switching"""
-        deleted_idx = 0
-        images = self.get_images()
-        for i in range(len(images)):
-            if images[i] == filename:
-                deleted_idx = i
-        if cur_img_idx == 0:
-            new_img_idx = 0
-        elif deleted_idx <= cur_img_idx:
-            new_img_idx = cur_img_idx - 1
-        else:
-            new_img_idx = cur_img_idx
-
         modality, file = self.get_uids_from_filename(filename)
+        new_file_uid = cur_file_uid
+        cur_file = self.get_file(cur_file_uid)
+        if cur_file is None or (cur_file[1], cur_file[2]) == (modality, file):
+            # the displayed file gets deleted - proceed to its successor, or its predecessor if it is the last one
+            new_file_uid = self.get_neighbour_file(cur_file_uid, 1, wrap=False)
+            if new_file_uid == -1:
+                new_file_uid = self.get_neighbour_file(cur_file_uid, -1, wrap=False)
+
         table_name = self.file_tables[modality]
+        self.flush_journal()
         with self.connection:
             self.cursor.execute(DELETE_FILE_ANNOTATIONS, (modality, file))
+            self.cursor.execute("DELETE FROM annotation_versions WHERE modality = ? AND file = ?", (modality, file))
+            self.update_file_comments(modality, file)
+            self.cursor.execute("""DELETE FROM journal WHERE file IN
+                                (SELECT uid FROM files WHERE modality = ? AND file = ?)""", (modality, file))
+            self.cursor.execute("""DELETE FROM work_queue WHERE file IN
+                                (SELECT uid FROM files WHERE modality = ? AND file = ?)""", (modality, file))
+            if modality == 0:
+                self.cursor.execute("DELETE FROM keyframes WHERE video = ?", (file,))
             self.cursor.execute("DELETE FROM {} WHERE filename = ?".format(table_name), (filename,))
-        self.update_gui(new_img_idx)
+        self.file_cache.invalidate(filename)
+        self.patient_cache.invalidate(filename)
+        self.update_file_list(new_file_uid)
+        self.update_gui(new_file_uid)
+
+    def enable_profiling(self, enable: bool = True):
+        """switches the debug mode recording every executed statement on or off"""
+        if enable and self.profiler is None:
+            self.profiler = QueryProfiler(self)
+        elif not enable:
+            self.profiler = None
+        if self.cursor is not None:
+            cursor = self.cursor.cursor if isinstance(self.cursor, ProfilingCursor) else self.cursor
+            self.cursor = ProfilingCursor(cursor, self.profiler) if enable else cursor
+
+    def fill_label_colors(self):
+        """assigns colors to the label classes which were added before colors were stored"""
+        with self.connection:
+            labels = self.cursor.execute("SELECT uid, color FROM labels ORDER BY uid").fetchall()
+            self.cursor.executemany("UPDATE labels SET color = ? WHERE uid = ?",
+                                    [(color_for_index(idx), uid) for idx, (uid, color) in enumerate(labels)
+                                     if color is None])
+
+    def fill_comments(self):
+        """copies the comments of the annotations from their shapes into the comment column,
+        for projects which were created before the column existed"""
+        with self.connection:
+            rows = self.cursor.execute("SELECT uid, shape FROM annotations").fetchall()
+            comments = [(pickle.loads(shape).get('comment') or "", uid) for uid, shape in rows]
+            self.cursor.executemany("UPDATE annotations SET comment = ? WHERE uid = ?",
+                                    [row for row in comments if row[0]])
+
+    @timed()
+    def filter_files(self, expression: str = "", modality: int = 1, after: int = -1,
+                     limit: int = SEARCH_LIMIT) -> list:
+        """
+        returns a page of the files of the modality which match the filter, in the file list order
+        :param expression: the filter, see taplt.utils.filters
+        :param after: the sort key of the last file of the previous page, -1 for the first page
+        :param limit: the maximal number of files
+        :return: (filepath, populated, file uid, content hash, sort key) of the files
+        :raises FilterError: if the expression is invalid
+        """
+        condition, params = filters.compile_filter(expression)
+        with self.connection:
+            files = self.cursor.execute("""SELECT f.filename, s.annotations IS NOT NULL, f.uid, f.hash, f.sort_key
+                                           FROM files AS f LEFT JOIN file_statistics AS s
+                                           ON s.modality = f.modality AND s.file = f.file
+                                           WHERE f.modality = ? AND f.sort_key > ? {}
+                                           ORDER BY f.sort_key LIMIT ?""".format(
+                "AND " + condition if condition else ""), (modality, after, *params, limit)).fetchall()
+        directory = self.location + Structure.MODALITY_DIRS[modality]
+        return [(directory + filename, bool(populated), uid, content_hash, sort_key)
+                for filename, populated, uid, content_hash, sort_key in files]
+
+    def flush_journal(self):
+        """stores the queued journal records right away"""
+        if self.journal_writer is not None:
+            self.journal_writer.flush()
+
+    def get_cache_statistics(self) -> list:
+        """returns the hit-rate statistics of all lookup caches"""
+        return [cache.statistics() for cache in self.caches]
+
+    def get_claims(self) -> list:
+        """returns the annotators with claimed files of the work queue and the number of their files"""
+        with self.connection:
+            return self.cursor.execute("""SELECT claimed_by, COUNT(*) FROM work_queue
+                                          WHERE done = 0 AND lease_until >= ? GROUP BY claimed_by
+                                          ORDER BY claimed_by""", (time.time(),)).fetchall()
 
     def get_column_names(self, table_name: str) -> list:
         """
@@ -195,12 +708,78 @@ class SQLiteDatabase(QObject):
         """
         with self.connection:
             columns = self.cursor.execute("PRAGMA table_info({})".format(table_name)).fetchall()
-        return [col[0] for col in columns]
+        return [col[1] for col in columns]
+
+    def get_file(self, file_uid: int):
+        """
+        :param file_uid: the uid of the file in the file registry
+        :return: a tuple (uid, modality, file, filename, patient) or None if the file does not exist
+        """
+        with self.connection:
+            return self.cursor.execute("""SELECT uid, modality, file, filename, patient FROM files
+                                          WHERE uid = ?""", (file_uid,)).fetchone()
+
+    def get_file_at(self, position: int, modality: int = 1):
+        """
+        :param position: the index of the file in the (sorted) list of files of the given modality
+        :param modality: 0 for videos, 1 for images, 2 for whole slide images
+        :return: the filename at the position, None if the position is out of range
+        """
+        with self.connection:
+            result = self.cursor.execute("""SELECT filename FROM files WHERE modality = ?
+                                            ORDER BY sort_key LIMIT 1 OFFSET ?""", (modality, position)).fetchone()
+        return result[0] if result is not None else None
+
+    def get_file_count(self, modality: int = 1) -> int:
+        """returns the number of files of the given modality"""
+        with self.connection:
+            return self.cursor.execute("SELECT COUNT(*) FROM files WHERE modality = ?", (modality,)).fetchone()[0]
+
+    def get_file_position(self, filename: str) -> int:
+        """
+        :param filename: name of the file
+        :return: the index of the file in the (sorted) list of files of its modality, -1 if not found
+        """
+        with self.connection:
+            target = self.cursor.execute("""SELECT modality, sort_key FROM files WHERE filename = ?
+                                            ORDER BY modality LIMIT 1""", (filename,)).fetchone()
+            if target is None:
+                return -1
+            result = self.cursor.execute("""SELECT COUNT(*) FROM files
+                                            WHERE modality = ? AND sort_key < ?""", target).fetchone()
+        return result[0]
+
+    def get_first_file(self, modality: int = 1) -> int:
+        """returns the registry uid of the first file of the given modality, -1 if there is none"""
+        with self.connection:
+            result = self.cursor.execute("""SELECT uid FROM files WHERE modality = ?
+                                            ORDER BY sort_key LIMIT 1""", (modality,)).fetchone()
+        return result[0] if result is not None else -1
+
+    def get_geometry(self, label_class: str = None) -> dict:
+        """returns the measures of all annotations (or those of a label class) as arrays,
+        given by the name of the column (see GEOMETRY_COLUMNS); missing measures are computed first"""
+        self.update_geometry()
+        query = """SELECT g.annotation, a.modality, a.file, a.frame, a.label, g.area, g.perimeter,
+                   g.cx, g.cy, g.xmin, g.ymin, g.xmax, g.ymax
+                   FROM geometry AS g JOIN annotations AS a ON a.uid = g.annotation"""
+        with self.connection:
+            if label_class is None:
+                rows = self.cursor.execute(query + " ORDER BY g.annotation").fetchall()
+            else:
+                rows = self.cursor.execute(query + " WHERE a.label = ? ORDER BY g.annotation",
+                                           (self.get_uid_from_label(label_class),)).fetchall()
+        table = analytics.np.array(rows, dtype=analytics.np.float64).reshape(-1, len(GEOMETRY_COLUMNS))
+        columns = {name: table[:, i] for i, name in enumerate(GEOMETRY_COLUMNS)}
+        for name in GEOMETRY_COLUMNS[:5]:
+            columns[name] = columns[name].astype(analytics.np.int64)
+        return columns
 
     def get_images(self) -> list:
         """ returns a list of all image names which are currently stored in the database"""
         with self.connection:
-            image_paths = self.cursor.execute("SELECT filename FROM images").fetchall()
+            image_paths = self.cursor.execute("SELECT filename FROM files WHERE modality = 1 "
+                                              "ORDER BY sort_key").fetchall()
         return [image_path[0] for image_path in image_paths]
 
     def get_label_classes(self) -> list:
@@ -211,16 +790,93 @@ class SQLiteDatabase(QObject):
             label_classes = self.cursor.execute("SELECT label_class FROM labels").fetchall()
         return [label_class[0] for label_class in label_classes]
 
+    def get_label_colors(self) -> list:
+        """
+        :return: the (uid, label class, color) of all label classes
+        """
+        with self.connection:
+            return self.cursor.execute("SELECT uid, label_class, color FROM labels ORDER BY uid").fetchall()
+
+    @timed()
+    def get_annotations(self, modality: int, file: int, frame: int = 0) -> list:
+        """
+        :param modality: the modality of the file
+        :param file: the uid of the file in its modality's table
+        :param frame: the frame number in case of a video
+        :return: a list of all label shapes related to the specified file
+        """
+        with self.connection:
+            labels = self.cursor.execute("""SELECT shape FROM annotations
+                                            WHERE modality = ? AND file = ? AND frame = ? ORDER BY uid""",
+                                         (modality, file, frame)).fetchall()
+        return check_for_bytes(labels)
+
     def get_label_from_image(self, image: str):
         """
         :param image: the image name to be searched in
         :return: a list of all label shapes related to the specified image
         """
+        image_id = self.get_uids_from_filename(image)[1]
+        return self.get_annotations(1, image_id)
+
+    @timed()
+    def get_neighbour_file(self, file_uid: int, direction: int, wrap: bool = True) -> int:
+        """
+        :param file_uid: the registry uid of the current file
+        :param direction: 1 for the next file, -1 for the previous file of the same modality
+        :param wrap: whether to continue at the other end of the list
+        :return: the registry uid of the neighbouring file, -1 if there is none
+        """
         with self.connection:
-            image_id = self.get_uid_from_filename("images", image)
-            labels = self.cursor.execute("""SELECT shape FROM annotations
-                                            WHERE modality = 1 AND file = ?""", (image_id,)).fetchall()
-        return check_for_bytes(labels)
+            current = self.cursor.execute("SELECT modality, sort_key FROM files WHERE uid = ?",
+                                          (file_uid,)).fetchone()
+            if current is None:
+                return self.get_first_file()
+            if direction > 0:
+                query = """SELECT uid FROM files WHERE modality = ? AND sort_key > ? AND uid != ?
+                           ORDER BY sort_key LIMIT 1"""
+            else:
+                query = """SELECT uid FROM files WHERE modality = ? AND sort_key < ? AND uid != ?
+                           ORDER BY sort_key DESC LIMIT 1"""
+            result = self.cursor.execute(query, (*current, file_uid)).fetchone()
+            if result is None and wrap:
+                order = "ASC" if direction > 0 else "DESC"
+                result = self.cursor.execute("""SELECT uid FROM files WHERE modality = ?
+                                                ORDER BY sort_key {} LIMIT 1""".format(order),
+                                             (current[0],)).fetchone()
+        return result[0] if result is not None else -1
+
+    def is_populated(self, modality: int, file: int) -> bool:
+        """returns whether the file holds at least one annotation"""
+        with self.connection:
+            return self.cursor.execute("""SELECT EXISTS (SELECT 1 FROM file_statistics
+                                          WHERE modality = ? AND file = ?)""", (modality, file)).fetchone()[0] == 1
+
+    def get_overlaps(self, min_iou: float = 0.0, label_class: str = None) -> list:
+        """returns (annotation uid, annotation uid, IoU) of the overlapping annotations of each file (frame)
+        only the shapes whose cached bounding boxes overlap are loaded and intersected"""
+        geometry = self.get_geometry(label_class)
+        boxes = analytics.np.stack([geometry[name] for name in ("xmin", "ymin", "xmax", "ymax")], axis=1)
+        groups = analytics.np.stack([geometry[name] for name in ("modality", "file", "frame")], axis=1)
+        first, second = analytics.candidate_pairs(boxes, groups)
+        if not len(first):
+            return []
+
+        # load the shapes of the candidates only
+        candidates = analytics.np.unique(analytics.np.concatenate([first, second]))
+        uids = geometry["annotation"][candidates].tolist()
+        label_dicts = dict()
+        with self.connection:
+            for i in range(0, len(uids), 500):
+                chunk = uids[i:i + 500]
+                rows = self.cursor.execute("SELECT uid, shape FROM annotations WHERE uid IN ({})".format(
+                    ", ".join("?" * len(chunk))), chunk).fetchall()
+                label_dicts.update((uid, pickle.loads(shape)) for uid, shape in rows)
+        shapes = analytics.ShapeArrays.from_label_dicts(label_dicts[uid] for uid in uids)
+        position = analytics.np.searchsorted(candidates, analytics.np.arange(len(boxes)))
+        overlaps = analytics.overlaps(shapes, geometry["area"][candidates], boxes[candidates],
+                                      position[first], position[second], min_iou)
+        return [(uids[i], uids[j], iou) for i, j, iou in overlaps]
 
     def get_patients(self):
         """returns all patient ids (not the uids)"""
@@ -230,14 +886,11 @@ class SQLiteDatabase(QObject):
 
     def get_patient_by_filename(self, filename: str):
         """returns the corresponding patient uid of an image"""
-        with self.connection:
-            self.cursor.execute("SELECT patient FROM images WHERE filename = ?", (filename,))
-            return self.cursor.fetchone()[0]
+        return self.patient_cache.get(filename, self._query_patient_by_filename)
 
     def get_patient_by_uid(self, patient_uid: int):
         """returns the id/patient info from the patients table by the corresponding uid"""
-        self.cursor.execute("SELECT some_id FROM patients WHERE uid = ?", (patient_uid,))
-        return self.cursor.fetchone()[0]
+        return self.patient_id_cache.get(patient_uid, self._query_patient_by_uid)
 
     def get_settings(self):
         """retrieves the values stored in the settings file"""
@@ -248,6 +901,36 @@ class SQLiteDatabase(QObject):
             settings.append((key, value, tooltip))
         return settings
 
+    def get_version(self, modality: int, file: int, frame: int = 0) -> tuple:
+        """returns the version of the annotations of the file (frame) and the annotator who saved it last,
+        (0, None) if the annotations were never saved"""
+        with self.connection:
+            result = self.cursor.execute("""SELECT version, modified_by FROM annotation_versions
+                                            WHERE modality = ? AND file = ? AND frame = ?""",
+                                         (modality, file, frame)).fetchone()
+        return tuple(result) if result is not None else (0, None)
+
+    def get_work_queue(self) -> tuple:
+        """returns the number of files of the work queue which are open (including expired claims),
+        claimed by the user and done"""
+        with self.connection:
+            result = self.cursor.execute("""SELECT COUNT(*) FILTER (WHERE done = 0 AND lease_until < :now),
+                                            COUNT(*) FILTER (WHERE done = 0 AND lease_until >= :now
+                                                             AND claimed_by = :user),
+                                            COUNT(*) FILTER (WHERE done = 1) FROM work_queue""",
+                                         {'now': time.time(), 'user': self.user}).fetchone()
+        return tuple(result)
+
+    def get_video_index(self, video_uid: int, filepath: str) -> video.VideoIndex:
+        """returns the keyframe index of the video, builds it if the video was imported without one"""
+        with self.connection:
+            info = self.cursor.execute("SELECT frame_count, fps FROM videos WHERE uid = ?", (video_uid,)).fetchone()
+            keyframes = self.cursor.execute("SELECT frame, pts FROM keyframes WHERE video = ? ORDER BY frame",
+                                            (video_uid,)).fetchall()
+        if info is None or info[0] is None or not keyframes:
+            return self.add_video_index(video_uid, filepath)
+        return video.VideoIndex(info[0], info[1], keyframes)
+
     def get_uid_from_filename(self, table_name: str, filename: str) -> int:
         """
         :param table_name: videos, images, or whole slide images
@@ -260,76 +943,139 @@ class SQLiteDatabase(QObject):
             result = self.cursor.fetchone()
         return result[0] if result is not None else None
 
+    def get_statistics(self) -> dict:
+        """returns the statistics of the annotations, read from the summary tables:
+        'annotations': the number of annotations,
+        'modalities': (modality, number of files, number of annotated files) of each modality,
+        'labels': (label class, annotations) of each label class,
+        'patients': (patient id, annotations) of each patient,
+        'files': (filename, annotations) of the TOP_FILES files with the most annotations"""
+        with self.connection:
+            files = dict(self.cursor.execute("SELECT modality, COUNT(*) FROM files GROUP BY modality").fetchall())
+            annotated = dict(self.cursor.execute("""SELECT modality, COUNT(*) FROM file_statistics
+                                                    GROUP BY modality""").fetchall())
+            labels = self.cursor.execute("""SELECT l.label_class, COALESCE(s.annotations, 0) FROM labels AS l
+                                            LEFT JOIN label_statistics AS s ON s.label = l.uid
+                                            ORDER BY l.uid""").fetchall()
+            patients = self.cursor.execute("""SELECT p.some_id, COALESCE(s.annotations, 0) FROM patients AS p
+                                              LEFT JOIN patient_statistics AS s ON s.patient = p.uid
+                                              ORDER BY p.uid""").fetchall()
+            top_files = self.cursor.execute("""SELECT f.filename, s.annotations FROM file_statistics AS s
+                                               JOIN files AS f ON f.modality = s.modality AND f.file = s.file
+                                               ORDER BY s.annotations DESC LIMIT ?""", (TOP_FILES,)).fetchall()
+        return {'annotations': sum(count for _, count in labels),
+                'modalities': [(table_name.strip("'"), files.get(modality, 0), annotated.get(modality, 0))
+                               for modality, table_name in enumerate(self.file_tables)],
+                'labels': labels,
+                'patients': patients,
+                'files': top_files}
+
     def get_uids_from_filename(self, filename: str) -> tuple:
         """
         :param filename: name of the file
         :return: a tuple holding: modality uid (video/image/whole slide image) and file uid
         """
-        modality, file = None, None
-        for i, table_name in enumerate(self.file_tables):
-            file = self.get_uid_from_filename(table_name, filename)
-            if file is not None:
-                modality = i
-                break
-        return modality, file
+        uids = self.file_cache.get(filename, self._query_uids_from_filename)
+        return uids if uids is not None else (None, None)
 
     def get_uid_from_label(self, label: str) -> int:
         """
         :param label: the label class to get the uid from
         :return: the uid of the label class if existing
         """
-        with self.connection:
-            self.cursor.execute("""SELECT uid FROM labels WHERE label_class = ?""", (label,))
-            result = self.cursor.fetchone()
-        return result[0] if result is not None else None
+        return self.label_cache.get(label, self._query_uid_from_label)
 
+    @timed()
     def initialize(self, database_path: str, files: dict = None):
         """
         Connect to database as initialization
         :param database_path: path to the database
         :param files: initially added files in case of newly created project
         """
-        self.location = str(pathlib.Path(database_path).parents[0])
+        self.close_journal()
         # indicates a new project - set up project environment
         if files is not None:
-            create_project_structure(self.location)
-
-        self.connection = sqlite3.connect(database_path)
-        self.cursor = self.connection.cursor()
+            create_project_structure(str(pathlib.Path(database_path).parents[0]))
+        self.connect(database_path)
 
         # indicates a new project - add initial files
         if files is not None:
             self.create_initial_tables()
             for file, patient in files.items():
                 self.add_file(file, patient)
-            self.settings = QSettings(self.location + '/settings', QSettings.Format.NativeFormat)
+            self.settings = QSettings(self.location + Structure.SETTINGS_FILE, QSettings.Format.NativeFormat)
             self.update_settings(SETTINGS)
         else:
-            self.settings = QSettings(self.location + '/settings', QSettings.Format.NativeFormat)
+            self.create_initial_tables()
+            self.settings = QSettings(self.location + Structure.SETTINGS_FILE, QSettings.Format.NativeFormat)
 
         with self.connection:
             self.cursor.execute(f"PRAGMA foreign_keys = ON;")
+        self.replay_journal()
+        self.journal_writer = journal.JournalWriter(database_path, ADD_JOURNAL_RECORD, JOURNAL_INTERVAL, BUSY_TIMEOUT)
+        self.journal_writer.start()
 
         self.is_initialized = True
-        self.update_gui()
+        self.sProjectOpened.emit(self.location)
+        file_uid = self.get_first_file()
+        self.update_label_classes()
+        self.update_file_list(file_uid)
+        self.update_gui(file_uid)
+        self.send_work_queue()
         settings = self.get_settings()
         self.sApplySettings.emit(settings)
 
+    def import_file(self, filepath: str, patient: str):
+        """adds a file to the database and refreshes the file list"""
+        self.add_file(filepath, patient)
+        self.update_file_list(-1)
+
+    def invalidate_caches(self):
+        """clears all lookup caches, e.g. when connecting to another database"""
+        for cache in self.caches:
+            cache.invalidate()
+            cache.reset_statistics()
+
+    def next_queued_file(self, file_uid: int):
+        """completes the given file (if the user has claimed it) and displays the next file of the work queue,
+        the given file stays displayed if there is none"""
+        self.complete_file(file_uid)
+        next_file_uid = self.claim_file()
+        if next_file_uid == file_uid:
+            # the displayed file was open, the user has already worked on it
+            self.complete_file(file_uid)
+            next_file_uid = self.claim_file()
+        self.send_work_queue()
+        if next_file_uid != -1:
+            self.update_gui(next_file_uid)
+
+    def open_statistics(self):
+        """emits a signal to open the statistics dialog"""
+        self.sOpenStatistics.emit(self.get_statistics())
+
     def open_settings(self):
         """emits a signal to open the settings dialog"""
         settings = self.get_settings()
         self.sOpenSettings.emit(settings)
 
-    def prepare_files(self, files: list) -> list:
-        """goes through all filenames and returns them as full paths,
-        in a tuple together with a boolean indicating whether there is at least 1 annotation in the image"""
-        result = list()
-        for file in files:
-            labels = self.get_label_from_image(file)
-            populated = True if labels else False
-            file = self.location + Structure.IMAGES_DIR + file
-            result.append((file, populated))
-        return result
+    def overwrite(self, current_labels: list, file_uid: int, frame: int = 0):
+        """stores the given shapes even if someone else has saved the file since it was displayed"""
+        self.save(current_labels, file_uid, frame, force=True)
+
+    @timed()
+    def prepare_files(self, modality: int = 1) -> list:
+        """goes through all files of the modality and returns them as full paths,
+        in a tuple together with a boolean indicating whether there is at least 1 annotation in the image,
+        the registry uid and the content hash of the file"""
+        with self.connection:
+            files = self.cursor.execute("""SELECT f.filename, s.annotations IS NOT NULL, f.uid, f.hash
+                                           FROM files AS f LEFT JOIN file_statistics AS s
+                                           ON s.modality = f.modality AND s.file = f.file
+                                           WHERE f.modality = ? ORDER BY f.sort_key""",
+                                        (modality,)).fetchall()
+        directory = self.location + Structure.MODALITY_DIRS[modality]
+        return [(directory + filename, bool(populated), uid, content_hash)
+                for filename, populated, uid, content_hash in files]
 
     def preview_database(self, table_name: str):
         """collects all information from the specified table and emits a signal"""
@@ -339,68 +1085,362 @@ class SQLiteDatabase(QObject):
             content = self.cursor.execute("SELECT * FROM {}".format(table_name)).fetchall()
         self.sPreviewDatabase.emit(headers, content)
 
-    def save(self, current_labels: list, img_idx: int):
-        files = self.get_images()
-        if files:
-            file = files[img_idx]
+    def queue_files(self, expression: str = "annotations:0", modality: int = 1) -> int:
+        """
+        adds the files matching the filter to the work queue, in the order of the file list
+        :param expression: the filter, see taplt.utils.filters - the files without annotations by default
+        :param modality: the modality of the files
+        :return: the number of files which were added - files which are queued already are skipped
+        """
+        condition, params = filters.compile_filter(expression)
+        with self.connection:
+            self.cursor.execute("""INSERT OR IGNORE INTO work_queue (file, position)
+                                   SELECT f.uid, f.sort_key FROM files AS f LEFT JOIN file_statistics AS s
+                                   ON s.modality = f.modality AND s.file = f.file
+                                   WHERE f.modality = ? {}""".format("AND " + condition if condition else ""),
+                                (modality, *params))
+            return self.cursor.rowcount
+
+    def release_claims(self):
+        """hands the files the user has claimed (but not completed) back to the work queue,
+        e.g. when the project is closed"""
+        if self.connection is None:
+            return
+        with self.connection:
+            self.cursor.execute("""UPDATE work_queue SET claimed_by = NULL, lease_until = 0
+                                   WHERE claimed_by = ? AND done = 0""", (self.user,))
+
+    def renew_claim(self, file_uid: int, lease: float = LEASE_DURATION):
+        """extends the claim of the user on the file"""
+        with self.connection:
+            self.cursor.execute("""UPDATE work_queue SET lease_until = ?
+                                   WHERE file = ? AND claimed_by = ? AND done = 0""",
+                                (time.time() + lease, file_uid, self.user))
+
+    def replay_journal(self):
+        """stores the edits the user journaled but did not save, e.g. because the program crashed.
+        the edits of other annotators are left to them, records from before the journal had users are replayed.
+        the records refer to the shapes by their position, so the edits of a file which someone else has saved
+        since are not replayed but kept, until the user saves or dismisses their changes of the file"""
+        with self.connection:
+            files = self.cursor.execute("SELECT DISTINCT file, frame FROM journal WHERE " + USER_RECORDS,
+                                        (self.user,)).fetchall()
+        for file_uid, frame in files:
+            file_row = self.get_file(file_uid)
+            if file_row is not None:
+                with self.connection:
+                    records = self.cursor.execute("""SELECT operation, delta, version FROM journal
+                                                     WHERE file = ? AND frame = ? AND {} ORDER BY uid""".format(
+                                                  USER_RECORDS), (file_uid, frame, self.user)).fetchall()
+                # records without a version were written before the journal had versions
+                versions = {version for _, _, version in records}
+                if len(versions) > 1:
+                    continue
+                label_dicts = journal.replay(self.get_annotations(file_row[1], file_row[2], frame),
+                                             [(operation, delta) for operation, delta, _ in records])
+                entries = list()
+                for label_dict in label_dicts:
+                    self.add_label(label_dict['label'])
+                    entries.append(self.create_annotation_entry(file_row[3], label_dict, label_dict['label'],
+                                                                file_row, frame))
+                if self.update_file_annotations(modality=file_row[1], file=file_row[2], entries=entries,
+                                                frame=frame, version=versions.pop()) is None:
+                    continue
+            with self.connection:
+                self.cursor.execute("DELETE FROM journal WHERE file = ? AND frame = ? AND " + USER_RECORDS,
+                                    (file_uid, frame, self.user))
+
+    def run_maintenance(self, operations: list, repair: bool = False) -> bool:
+        """runs the maintenance operations in the background, see taplt.utils.maintenance;
+        returns False if the maintenance is running already"""
+        if self.maintenance_worker is not None and self.maintenance_worker.is_alive():
+            return False
+        self.flush_journal()
+        self.maintenance_worker = maintenance.MaintenanceWorker(
+            self.location + Structure.DATABASE_DEFAULT_NAME, operations, repair, self.sMaintenanceProgress.emit,
+            self.sMaintenanceFinished.emit, BUSY_TIMEOUT)
+        self.maintenance_worker.start()
+        return True
+
+    @timed()
+    def save(self, current_labels: list, file_uid: int, frame: int = 0, force: bool = False):
+        """stores the given shapes as the annotations of the file with the given registry uid
+        (and the given frame in case of a video). if someone else has saved the file since it was displayed,
+        nothing is stored and sSaveConflict is emitted - unless the save is forced"""
+        file_row = self.get_file(file_uid)
+        if file_row is not None:
+            was_populated = self.is_populated(file_row[1], file_row[2])
+            new_classes = False
             entries = list()
             for lbl in current_labels:
                 label_dict, label_class = lbl.to_dict()
-                self.add_label(label_class)
-                entries.append(self.create_annotation_entry(file, label_dict, label_class))
-            self.update_image_annotations(image_name=file, entries=entries)
+                # new classes keep the color they were drawn with
+                color = lbl.line_color.name() if lbl.line_color.isValid() else None
+                new_classes |= self.add_label(label_class, color)
+                entries.append(self.create_annotation_entry(file_row[3], label_dict, label_class, file_row, frame))
+            version = None if force else self.versions.get((file_uid, frame))
+            version = self.update_file_annotations(modality=file_row[1], file=file_row[2], entries=entries,
+                                                   frame=frame, version=version)
+            if version is None:
+                self.sSaveConflict.emit(file_uid, frame, self.get_version(file_row[1], file_row[2], frame)[1] or "")
+                return
+            self.versions[(file_uid, frame)] = version
+            self.renew_claim(file_uid)
+            self.clear_journal(file_uid, frame)
+
+            # only refresh what has actually changed
+            if new_classes:
+                self.update_label_classes()
+            is_populated = self.is_populated(file_row[1], file_row[2])
+            if was_populated != is_populated:
+                self.sUpdateFileState.emit(file_uid, is_populated)
+
+    @timed()
+    def search(self, text: str = "", label_class: str = None, patient: str = None, min_annotations: int = None,
+               max_annotations: int = None, limit: int = SEARCH_LIMIT) -> list:
+        """
+        finds the files matching all of the given criteria
+        :param text: words (or word prefixes) which occur in a comment of an annotation of the file
+        :param label_class: a label class of which the file holds annotations
+        :param patient: the id of the patient of the file
+        :param min_annotations: the minimal number of annotations of the file
+        :param max_annotations: the maximal number of annotations of the file
+        :param limit: the maximal number of results
+        :return: (file uid, modality, filename, patient id, number of annotations) of the files in the file list order
+        """
+        # the search starts from the matches of the full-text index, of the label class or of the annotation count,
+        # the other criteria are checked for these files only; only without them the files are scanned
+        conditions, params = list(), list()
+        if text.strip():
+            source = SEARCH_BY_COMMENT
+            params.append(filters.fts_query(text))
+        elif label_class is not None:
+            source = SEARCH_BY_LABEL
+            conditions.append("l.label = (SELECT uid FROM labels WHERE label_class = ?)")
+            params.append(label_class)
+        elif min_annotations is not None and min_annotations > 0:
+            source = SEARCH_BY_ANNOTATIONS  # files without annotations have no statistics
+        else:
+            source = SEARCH_ALL
+        if label_class is not None and source != SEARCH_BY_LABEL:
+            conditions.append(filters.LABEL_CONDITION)
+            params.append(label_class)
+        if patient is not None:
+            conditions.append(filters.PATIENT_CONDITION)
+            params.append(patient)
+        if min_annotations is not None:
+            conditions.append(filters.ANNOTATIONS_COUNT + " >= ?")
+            params.append(min_annotations)
+        if max_annotations is not None:
+            conditions.append(filters.ANNOTATIONS_COUNT + " <= ?")
+            params.append(max_annotations)
+
+        with self.connection:
+            return self.cursor.execute("""SELECT f.uid, f.modality, f.filename, p.some_id, COALESCE(s.annotations, 0)
+                                          FROM {} LEFT JOIN patients AS p ON p.uid = f.patient
+                                          {} ORDER BY f.modality, f.sort_key LIMIT ?""".format(
+                source, "WHERE " + " AND ".join(conditions) if conditions else ""), (*params, limit)).fetchall()
 
     def send_import_info(self):
         existing_patients = self.get_patients()
         self.sImportFile.emit(existing_patients)
 
+    def send_file_page(self, modality: int, expression: str, after: int, limit: int):
+        """emits the next page of the filtered files of the modality (see filter_files),
+        an invalid filter results in an empty page"""
+        try:
+            files = self.filter_files(expression, modality, after, limit)
+        except filters.FilterError:
+            files = list()
+        self.sFilePage.emit(modality, expression, files)
+
+    def send_search_results(self, criteria: dict):
+        """searches the files with the given criteria (see search) and emits the results"""
+        self.sSearchResults.emit(self.search(**criteria))
+
+    def send_work_queue(self):
+        """emits the state of the work queue"""
+        self.sWorkQueue.emit(*self.get_work_queue())
+
+    def start_campaign(self, expression: str):
+        """adds the images matching the filter to the work queue (see queue_files) and emits its state"""
+        self.queue_files(expression or "annotations:0")
+        self.send_work_queue()
+
     def update_image_annotations(self, image_name: str, entries: list):
         """
         updates the annotations associated with a given image
         :param image_name: the image to be updated
         :param entries: list of dictionaries representing the annotation entries
         """
+        modality, file = self.get_uids_from_filename(image_name)
+        self.update_file_annotations(modality, file, entries)
+
+    @timed()
+    def update_file_annotations(self, modality: int, file: int, entries: list, frame: int = 0, version: int = None):
+        """
+        updates the annotations associated with a given file
+        :param modality: the modality of the file
+        :param file: the uid of the file in its modality's table
+        :param entries: list of dictionaries representing the annotation entries
+        :param frame: the frame number in case of a video
+        :param version: the version of the annotations the entries are based on, None to store them regardless
+        :return: the new version of the annotations, None if they were saved by someone else since the given
+        version - nothing is stored in that case
+        """
         with self.connection:
+            new_version = self.cursor.execute(BUMP_VERSION, {'modality': modality, 'file': file, 'frame': frame,
+                                                             'user': self.user, 'time': time.time(),
+                                                             'version': version}).fetchone()
+            if new_version is None:
+                return None
 
-            # delete all currently stored annotations for the image
-            modality, file = self.get_uids_from_filename(image_name)
+            # unchanged annotations keep the annotator who last modified them
+            modified_by = dict(self.cursor.execute("""SELECT shape, modified_by FROM annotations
+                                                      WHERE modality = ? AND file = ? AND frame = ?""",
+                                                   (modality, file, frame)).fetchall())
+
+            # delete all currently stored annotations for the file (frame)
             self.cursor.execute("""DELETE FROM annotations WHERE modality = ?
-                                AND file = ?""", (modality, file))
+                                AND file = ? AND frame = ?""", (modality, file, frame))
 
             # add new, updated list of annotations
             for entry in entries:
-                self.cursor.execute("""INSERT INTO annotations (modality, file, patient, shape, label) 
-                    VALUES (:modality, :file, :patient, :shape, :label)""", entry)
-
-    def update_gui(self, img_idx: int = 0):
-        """gathers all information about the project and updates the database"""
-        files = self.get_images()
-        if files:
-            file = files[img_idx]
-            labels = self.get_label_from_image(file)
-            patient = self.get_patient_by_uid(self.get_patient_by_filename(file))
+                entry.setdefault('frame', frame)
+                entry.setdefault('comment', "")
+                entry.setdefault('created_by', self.user)
+                entry['modified_by'] = modified_by.get(entry['shape']) or self.user
+            self.cursor.executemany("""INSERT INTO annotations (modality, file, patient, shape, label, frame, comment,
+                created_by, modified_by) VALUES (:modality, :file, :patient, :shape, :label, :frame, :comment,
+                :created_by, :modified_by)""", entries)
+            self.update_file_comments(modality, file)
+        return new_version[0]
+
+    def update_file_comments(self, modality: int, file: int):
+        """refreshes the document of the file in the full-text index of the comments"""
+        with self.connection:
+            self.cursor.execute("""DELETE FROM file_comments WHERE rowid =
+                                   (SELECT uid FROM files WHERE modality = ? AND file = ?)""", (modality, file))
+            self.cursor.execute(FILL_COMMENT_INDEX.format("AND a.modality = ? AND a.file = ?"), (modality, file))
+
+    @timed()
+    def update_geometry(self) -> int:
+        """computes the measures of the annotations which are not in the geometry table yet,
+        returns the number of computed annotations"""
+        computed, last = 0, -1
+        while True:
+            with self.connection:
+                chunk = self.cursor.execute("""SELECT a.uid, a.shape FROM annotations AS a WHERE a.uid > ?
+                                               AND NOT EXISTS (SELECT 1 FROM geometry AS g WHERE g.annotation = a.uid)
+                                               ORDER BY a.uid LIMIT ?""", (last, GEOMETRY_CHUNK)).fetchall()
+                if not chunk:
+                    break
+                shapes = analytics.ShapeArrays.from_label_dicts(pickle.loads(shape) for _, shape in chunk)
+                measures = analytics.measures(shapes).tolist()
+                self.cursor.executemany(ADD_GEOMETRY, [(uid, *values) for (uid, _), values in zip(chunk, measures)])
+            computed += len(chunk)
+            last = chunk[-1][0]
+        return computed
+
+    @timed()
+    def update_gui(self, file_uid: int = -1, frame: int = 0):
+        """gathers the information about the file (and frame) with the given registry uid and updates the gui;
+        falls back to the first image (or video) if the file does not exist"""
+        file_row = self.get_file(file_uid)
+        if file_row is None:
+            file_row = self.get_file(self.get_first_file())
+        if file_row is None:
+            file_row = self.get_file(self.get_first_file(modality=0))
+        if file_row is None:
+            self.sUpdateFile.emit(-1, "", "", [])
+            return
+
+        file_uid, modality, file, filename, patient = file_row
+        # read before the annotations: a save in between makes the next save conflict rather than overwrite it
+        self.versions[(file_uid, frame)] = self.get_version(modality, file, frame)[0]
+        labels = self.get_annotations(modality, file, frame)
+        patient = self.get_patient_by_uid(patient)
+        filepath = self.location + Structure.MODALITY_DIRS[modality] + filename
+        if modality == 0:
+            # an empty index tells the gui that the video can not be decoded
+            index = self.get_video_index(file, filepath).to_dict() if video.load_av() is not None else dict()
+            self.sUpdateVideo.emit(file_uid, filepath, patient, labels, frame, index)
         else:
-            labels, patient = [], ""
-        files = self.prepare_files(files)
-        classes = self.get_label_classes()
-        self.sUpdate.emit(files, img_idx, patient, classes, labels)
+            self.sUpdateFile.emit(file_uid, filepath, patient, labels)
+
+    @timed()
+    def update_file_list(self, file_uid: int = -1):
+        """emits the lists of all images and videos, to be called whenever files are added or removed"""
+        for modality in (1, 0):
+            self.sUpdateFileList.emit(self.prepare_files(modality), file_uid, modality)
+
+    def set_file_hash(self, file_uid: int, content_hash: str):
+        """stores the content hash of a file which was imported without one"""
+        with self.connection:
+            self.cursor.execute("UPDATE files SET hash = ? WHERE uid = ?", (content_hash, file_uid))
+
+    @timed()
+    def update_label_classes(self):
+        """emits all label classes with their colors, to be called whenever label classes are added"""
+        self.sUpdateClasses.emit(self.get_label_colors())
 
     def update_labels(self, classes: list):
         """
-        goes through a list of label class names and adds them to database if they don't already exist
+        goes through a list of label class names and adds them to database if they don't already exist,
+        new label classes get the next colors of the sequence (see add_label)
         :param classes: list of label classes
         """
         with self.connection:
-            for label_class in classes:
-                self.cursor.execute("""SELECT * FROM labels WHERE label_class = ?""", (label_class,))
-                if not self.cursor.fetchone():
-                    self.cursor.execute("""INSERT INTO labels (label_class) VALUES (?)""", (label_class,))
+            existing = {label_class for label_class, in self.cursor.execute("SELECT label_class FROM labels")}
+            new_classes = [label_class for label_class in dict.fromkeys(classes) if label_class not in existing]
+            if not new_classes:
+                return
+            self.cursor.executemany(ADD_LABEL, [(label_class, color_for_index(len(existing) + idx))
+                                                for idx, label_class in enumerate(new_classes)])
+            rows = self.cursor.execute("SELECT label_class, uid FROM labels").fetchall()
+        for label_class, uid in rows:
+            if label_class not in existing:
+                self.label_cache.put(label_class, uid)
 
     def update_settings(self, settings: list):
         """saves the specified settings in the QSettings file"""
         for setting in settings:
             self.settings.setValue(setting[0], setting[1])
 
+    def _query_patient_by_filename(self, filename: str):
+        """cache loader: retrieves the patient uid of an image from the database"""
+        with self.connection:
+            result = self.cursor.execute("""SELECT patient FROM files WHERE filename = ?
+                                            ORDER BY modality LIMIT 1""", (filename,)).fetchone()
+        return result[0] if result is not None else None
+
+    def _query_patient_by_uid(self, patient_uid: int):
+        """cache loader: retrieves the patient id from the database"""
+        with self.connection:
+            result = self.cursor.execute("SELECT some_id FROM patients WHERE uid = ?", (patient_uid,)).fetchone()
+        return result[0] if result is not None else None
+
+    def _query_uids_from_filename(self, filename: str):
+        """cache loader: resolves the filename with a single lookup in the file registry"""
+        with self.connection:
+            result = self.cursor.execute("""SELECT modality, file FROM files WHERE filename = ?
+                                            ORDER BY modality LIMIT 1""", (filename,)).fetchone()
+        return tuple(result) if result is not None else None
+
+    def _query_uid_from_label(self, label: str):
+        """cache loader: retrieves the uid of a label class from the database"""
+        with self.connection:
+            result = self.cursor.execute("SELECT uid FROM labels WHERE label_class = ?", (label,)).fetchone()
+        return result[0] if result is not None else None
+
+
+def current_user() -> str:
+    """returns the name of the annotator: the TAPLT_USER environment variable or the login name"""
+    try:
+        return os.environ.get("TAPLT_USER") or getpass.getuser()
+    except (KeyError, OSError):
+        return "unknown"
+
 
 def check_for_bytes(lst: List[tuple]) -> Union[List[list], list]:
     """ Iterates over a list of tuples and de-pickles byte objects. The output is converted depending on how many entries
@@ -0,0 +1,182 @@
+"""A small language filtering the files of a project by their annotations, compiled to the WHERE clause
+of a query of the file registry ('files AS f' joined with 'file_statistics AS s'). For example
+    label:tumor and annotations > 50
+    patient:12 and not label:"tumor core"
+    (label:nerve >= 3 or comment:artifact) and name:2021
+Conditions are 'field OP value', a bare word matches the filenames containing it:
+    label:CLASS [OP COUNT]  files with annotations of the class (or with COUNT of them, e.g. label:tumor < 3)
+    patient:ID              files of the patient
+    comment:WORDS           files with a comment containing the words (or words starting with them)
+    name:TEXT               files whose name contains the text
+    annotations OP COUNT    files with COUNT annotations
+where OP is one of : = != < <= > >= (only : = != for text). Conditions are combined with 'and' (also implied
+by juxtaposition), 'or', 'not' and parentheses. Values with spaces are quoted with double quotes.
+The query reads the files of the modality in the file list order (the index on the sort key), which the pages of the
+filtered list continue from; each file is checked with lookups in indexes and summary tables, so none of the
+conditions reads the annotations, but a filter matching few files reads most of the file list to fill a page"""
+import re
+from typing import List, Tuple
+
+# the conditions by field, the parameters are the value (and the count)
+LABEL_CONDITION = """EXISTS (SELECT 1 FROM file_label_statistics AS l
+                     WHERE l.label = (SELECT uid FROM labels WHERE label_class = ?)
+                     AND l.modality = f.modality AND l.file = f.file)"""
+LABEL_COUNT = """COALESCE((SELECT l.annotations FROM file_label_statistics AS l
+                 WHERE l.label = (SELECT uid FROM labels WHERE label_class = ?)
+                 AND l.modality = f.modality AND l.file = f.file), 0)"""
+PATIENT_CONDITION = "f.patient = (SELECT uid FROM patients WHERE some_id = ?)"
+# '+' keeps SQLite from looking up all matches first, the files are scanned in the file list order instead
+COMMENT_CONDITION = "+f.uid IN (SELECT rowid FROM file_comments WHERE file_comments MATCH ?)"
+NAME_CONDITION = r"f.filename LIKE ? ESCAPE '\'"
+ANNOTATIONS_COUNT = "COALESCE(s.annotations, 0)"
+
+TEXT_FIELDS = ("label", "patient", "comment", "name")
+COUNT_FIELDS = ("annotations",)
+EQUALITY = (":", "=", "!=")
+COMPARISONS = EQUALITY + ("<", "<=", ">", ">=")
+
+TOKEN = re.compile(r'\s*(?:(?P<string>"[^"]*")|(?P<operator><=|>=|!=|[:=<>()])|(?P<word>[^\s:=<>!()"]+)|(?P<error>\S))')
+
+
+class FilterError(ValueError):
+    """raised for an invalid filter expression, position is the index of the offending character"""
+
+    def __init__(self, message: str, position: int):
+        super(FilterError, self).__init__("{} at position {}".format(message, position + 1))
+        self.position = position
+
+
+def compile_filter(expression: str) -> Tuple[str, list]:
+    """returns the condition (an empty string for an empty expression) and its parameters"""
+    parser = _Parser(tokenize(expression), len(expression))
+    if parser.peek() is None:
+        return "", []
+    sql = parser.expression()
+    if parser.peek() is not None:
+        raise FilterError("unexpected '{}'".format(parser.peek()[1]), parser.peek()[2])
+    return sql, parser.params
+
+
+def fts_query(text: str) -> str:
+    """turns the words of a search text into a full-text query, which matches comments containing
+    all words - or words starting with them"""
+    return " ".join('"{}"*'.format(word.replace('"', '""')) for word in text.split())
+
+
+def like_pattern(text: str) -> str:
+    """returns a LIKE pattern (with '\\' as escape character) matching the values containing the text"""
+    return "%{}%".format(re.sub(r"([\\%_])", r"\\\1", text))
+
+
+def tokenize(expression: str) -> List[Tuple[str, str, int]]:
+    """splits the expression into (kind, text, position) with kind 'string', 'operator' or 'word'"""
+    tokens = list()
+    for match in TOKEN.finditer(expression):
+        kind = match.lastgroup
+        if kind == "error":
+            raise FilterError("unexpected '{}'".format(match.group(kind)), match.start(kind))
+        tokens.append((kind, match.group(kind), match.start(kind)))
+    return tokens
+
+
+class _Parser:
+    """recursive descent parser, each rule returns the SQL of its part and appends the parameters"""
+
+    def __init__(self, tokens: list, end: int):
+        self.tokens = tokens
+        self.end = end
+        self.index = 0
+        self.params = list()
+
+    def peek(self):
+        return self.tokens[self.index] if self.index < len(self.tokens) else None
+
+    def next(self, description: str):
+        token = self.peek()
+        if token is None:
+            raise FilterError("expected {}".format(description), self.end)
+        self.index += 1
+        return token
+
+    def keyword(self, *keywords: str) -> bool:
+        token = self.peek()
+        if token is not None and token[0] == "word" and token[1].lower() in keywords:
+            self.index += 1
+            return True
+        return False
+
+    def expression(self) -> str:
+        terms = [self.term()]
+        while self.keyword("or"):
+            terms.append(self.term())
+        return terms[0] if len(terms) == 1 else "({})".format(" OR ".join(terms))
+
+    def term(self) -> str:
+        factors = [self.factor()]
+        while True:
+            token = self.peek()
+            if self.keyword("and"):
+                factors.append(self.factor())
+            elif token is not None and token[1] != ")" and not (token[0] == "word" and token[1].lower() == "or"):
+                factors.append(self.factor())
+            else:
+                return factors[0] if len(factors) == 1 else "({})".format(" AND ".join(factors))
+
+    def factor(self) -> str:
+        if self.keyword("not"):
+            return "NOT {}".format(self.factor())
+        kind, text, position = self.next("a condition")
+        if text == "(":
+            sql = self.expression()
+            if self.next("')'")[1] != ")":
+                raise FilterError("expected ')'", self.tokens[self.index - 1][2])
+            return "({})".format(sql)
+        if kind == "operator":
+            raise FilterError("unexpected '{}'".format(text), position)
+        token = self.peek()
+        if kind == "word" and token is not None and token[0] == "operator" and token[1] in COMPARISONS:
+            return self.condition(text.lower(), position)
+        self.params.append(like_pattern(self.value(kind, text)))
+        return NAME_CONDITION
+
+    def condition(self, field: str, position: int) -> str:
+        if field not in TEXT_FIELDS + COUNT_FIELDS:
+            raise FilterError("unknown field '{}'".format(field), position)
+        _, operator, position = self.next("an operator")
+        if field in COUNT_FIELDS:
+            return self.comparison(ANNOTATIONS_COUNT, operator, position)
+        if operator not in EQUALITY:
+            raise FilterError("'{}' compares numbers only".format(operator), position)
+        kind, text, position = self.next("a value")
+        if kind == "operator":
+            raise FilterError("expected a value", position)
+        value = self.value(kind, text)
+        if field == "label":
+            token = self.peek()
+            if operator != "!=" and token is not None and token[0] == "operator" and token[1] in COMPARISONS:
+                self.params.append(value)
+                return self.comparison(LABEL_COUNT, token[1], self.next("an operator")[2])
+            sql = LABEL_CONDITION
+        elif field == "patient":
+            sql = PATIENT_CONDITION
+        elif field == "comment":
+            sql, value = COMMENT_CONDITION, fts_query(value)
+            if not value:
+                raise FilterError("expected words", position)
+        else:
+            sql, value = NAME_CONDITION, like_pattern(value)
+        self.params.append(value)
+        return "NOT {}".format(sql) if operator == "!=" else sql
+
+    def comparison(self, count: str, operator: str, position: int) -> str:
+        if operator not in COMPARISONS:
+            raise FilterError("expected a comparison", position)
+        kind, text, position = self.next("a number")
+        if kind != "word" or not text.isdigit():
+            raise FilterError("expected a number", position)
+        self.params.append(int(text))
+        return "{} {} ?".format(count, "=" if operator == ":" else operator)
+
+    @staticmethod
+    def value(kind: str, text: str) -> str:
+        return text[1:-1] if kind == "string" else text
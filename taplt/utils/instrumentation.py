@@ -0,0 +1,161 @@
+"""Opt-in timing of the hot paths. Functions are decorated with @timed, code blocks are wrapped in span();
+while the instrumentation is disabled both only cost a check of a global flag.
+Once enabled (in the debug dialog, by 'python -m taplt --trace FILE' or the TAPLT_TRACE environment variable),
+each call is added to a histogram of its operation and recorded as an event of a Chrome trace,
+which can be inspected in chrome://tracing or https://ui.perfetto.dev"""
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List
+
+BUCKETS = 25  # the histograms have logarithmic buckets: < 1us, < 2us, < 4us, ... >= 8s
+MAX_EVENTS = 200000  # only the most recent events are kept for the trace
+
+_enabled = bool(os.environ.get("TAPLT_TRACE"))
+_lock = threading.Lock()
+_origin = time.perf_counter_ns()
+
+
+class Histogram:
+    """the distribution of the durations of one operation"""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0  # ns
+        self.max = 0  # ns
+        self.buckets = [0] * BUCKETS
+
+    def add(self, duration: int):
+        self.count += 1
+        self.total += duration
+        self.max = max(self.max, duration)
+        self.buckets[min((duration // 1000).bit_length(), BUCKETS - 1)] += 1
+
+    def mean(self) -> float:
+        """returns the mean duration in ms"""
+        return self.total / self.count / 1e6 if self.count else 0.0
+
+    def percentile(self, p: float) -> float:
+        """returns the upper bound of the bucket containing the p-th percentile in ms"""
+        rank = p / 100 * self.count
+        seen = 0
+        for idx, n in enumerate(self.buckets):
+            seen += n
+            if n and seen >= rank:
+                return min(2 ** idx / 1000, self.max / 1e6)
+        return self.max / 1e6
+
+
+_histograms = dict()  # type: Dict[str, Histogram]
+_events = deque(maxlen=MAX_EVENTS)  # (operation, start, duration, thread id)
+
+
+class _Span:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        record(self.name, self.start, time.perf_counter_ns() - self.start)
+        return False
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def enable():
+    global _enabled
+    _enabled = True
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def record(operation: str, start: int, duration: int):
+    """adds a measurement; start and duration are perf_counter_ns values"""
+    with _lock:
+        histogram = _histograms.get(operation)
+        if histogram is None:
+            histogram = _histograms[operation] = Histogram()
+        histogram.add(duration)
+        _events.append((operation, start, duration, threading.get_ident()))
+
+
+def reset():
+    """removes all measurements"""
+    with _lock:
+        _histograms.clear()
+        _events.clear()
+
+
+def span(name: str):
+    """context manager measuring the enclosed block"""
+    return _Span(name) if _enabled else _NULL_SPAN
+
+
+def timed(name: str = None) -> Callable:
+    """decorator measuring each call of the function; the operation is named after the function by default"""
+    def decorator(function: Callable) -> Callable:
+        operation = name or function.__qualname__
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return function(*args, **kwargs)
+            start = time.perf_counter_ns()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                record(operation, start, time.perf_counter_ns() - start)
+        return wrapper
+    return decorator
+
+
+def statistics() -> List[tuple]:
+    """returns (operation, histogram) of all measured operations, the most expensive ones first"""
+    with _lock:
+        return sorted(_histograms.items(), key=lambda item: item[1].total, reverse=True)
+
+
+def chrome_trace() -> dict:
+    """returns the recorded events in the Chrome trace event format"""
+    pid = os.getpid()
+    with _lock:
+        events = list(_events)
+    return {"traceEvents": [{"name": operation,
+                             "cat": "taplt",
+                             "ph": "X",
+                             "ts": (start - _origin) / 1000,
+                             "dur": duration / 1000,
+                             "pid": pid,
+                             "tid": tid} for operation, start, duration, tid in events],
+            "displayTimeUnit": "ms"}
+
+
+def dump_chrome_trace(filepath: str):
+    with open(filepath, "w") as f:
+        json.dump(chrome_trace(), f)
@@ -0,0 +1,100 @@
+"""Compact records of the edits of the annotations of the displayed file. The records are written to the journal
+table of the database as they happen and are replayed on the stored annotations after a crash.
+Shapes are referenced by their id in the AnnotationGroup, i.e. their position in the stored annotations
+(new shapes get the next free id), so a record only holds what has changed.
+Appending a record only queues it, a background thread writes the queued records at a fixed interval"""
+import json
+import sqlite3
+import threading
+from typing import Dict, Iterable, List, Tuple
+
+BASE = "base"  # {"ids": [id, ...]}, the ids of the stored annotations in their order, written after saving
+ADD = "add"  # {"shapes": [[id, label dict], ...]}
+DELETE = "delete"  # {"ids": [id, ...]}
+MOVE = "move"  # {"id": id, "dx": dx, "dy": dy}
+VERTEX = "vertex"  # {"id": id, "vertices": [[vertex index, x, y], ...]}
+LABEL = "label"  # {"id": id, "label": label class}
+COMMENT = "comment"  # {"id": id, "comment": comment}
+
+
+def apply(shapes: Dict[int, dict], operation: str, delta: dict):
+    """applies a record to the label dicts of a file, given by their shape id"""
+    if operation == BASE:
+        stored = [shapes[shape_id] for shape_id in sorted(shapes)]
+        shapes.clear()
+        shapes.update(zip(delta["ids"], stored))
+    elif operation == ADD:
+        for shape_id, label_dict in delta["shapes"]:
+            shapes[shape_id] = label_dict
+    elif operation == DELETE:
+        for shape_id in delta["ids"]:
+            shapes.pop(shape_id, None)
+    elif delta["id"] in shapes:
+        label_dict = shapes[delta["id"]]
+        if operation == MOVE:
+            label_dict["points"] = [[x + delta["dx"], y + delta["dy"]] for x, y in label_dict["points"]]
+        elif operation == VERTEX:
+            for index, x, y in delta["vertices"]:
+                label_dict["points"][index] = [x, y]
+        elif operation == LABEL:
+            label_dict["label"] = delta["label"]
+        elif operation == COMMENT:
+            label_dict["comment"] = delta["comment"]
+
+
+def dumps(delta: dict) -> str:
+    return json.dumps(delta, separators=(",", ":"))
+
+
+def replay(label_dicts: List[dict], records: Iterable[Tuple[str, str]]) -> List[dict]:
+    """returns the label dicts after applying the records (operation, delta as JSON) in order"""
+    shapes = dict(enumerate(label_dicts))
+    for operation, delta in records:
+        apply(shapes, operation, json.loads(delta))
+    return [shapes[shape_id] for shape_id in sorted(shapes)]
+
+
+class JournalWriter(threading.Thread):
+    """writes the journal records to the database in the background, using a connection of its own"""
+
+    def __init__(self, database_path: str, insert: str, interval: float = 1.0, timeout: float = 5.0):
+        """
+        :param database_path: path to the database
+        :param insert: the statement adding a record to the journal table
+        :param interval: the seconds between two writes; the edits of that period are lost on a crash
+        :param timeout: the seconds a write waits for the lock of the database held by another connection
+        """
+        super(JournalWriter, self).__init__(name="journal writer", daemon=True)
+        self.insert = insert
+        self.interval = interval
+        self.connection = sqlite3.connect(database_path, timeout=timeout, check_same_thread=False)
+        self.pending = list()
+        self.lock = threading.Lock()  # guards the pending records
+        self.write_lock = threading.Lock()  # serializes the writes of the thread and of flush
+        self.stopped = threading.Event()
+
+    def append(self, record: tuple):
+        """queues a record, the parameters of the insert statement"""
+        with self.lock:
+            self.pending.append(record)
+
+    def close(self):
+        """stops the thread after writing the pending records"""
+        self.stopped.set()
+        if self.is_alive():
+            self.join()
+        self.flush()
+        self.connection.close()
+
+    def flush(self):
+        """writes the pending records and returns once they are stored"""
+        with self.write_lock:
+            with self.lock:
+                records, self.pending = self.pending, list()
+            if records:
+                with self.connection:
+                    self.connection.executemany(self.insert, records)
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            self.flush()
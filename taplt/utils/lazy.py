@@ -0,0 +1,18 @@
+import importlib.util
+import sys
+
+
+def lazy_import(name: str):
+    """returns the module with the given name, but executes it only once one of its attributes is accessed.
+    used for heavy dependencies which are not needed to show the welcome screen"""
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ImportError("No module named '{}'".format(name), name=name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
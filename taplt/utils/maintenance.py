@@ -0,0 +1,161 @@
+"""Maintenance of the database of a project. Saving replaces the annotations of a file, which leaves free pages
+behind and fragments the tables over time; the statistics of the query planner get outdated as the project grows.
+As 'file' of the annotations references either the videos, the images or the whole slide images, there is no foreign
+key on it, so annotations of deleted files are found here. Each operation reports its result as lines of text.
+The operations run in a background thread with a connection of their own, therefore they must not depend on Qt"""
+import os
+import sqlite3
+import threading
+from typing import Callable, List, Optional
+
+from taplt.utils.project_structure import Structure
+
+ANALYZE = "analyze"
+INTEGRITY = "integrity"
+ORPHANS = "orphans"
+MISSING = "missing"
+VACUUM = "vacuum"
+# the operations in the order they are run, the space released last includes the space freed by the others
+OPERATIONS = {INTEGRITY: "Check the integrity of the database",
+              ORPHANS: "Find annotations of files which no longer exist",
+              MISSING: "Find files which are missing on disk",
+              ANALYZE: "Update the statistics of the query planner",
+              VACUUM: "Release unused space of the database"}
+
+VACUUM_STEP = 1024  # pages released per step of the incremental vacuum, other connections may write in between
+CHECK_STEP = 1000  # files checked for existence per step
+REPORT_LIMIT = 20  # problems listed per operation, the others are counted only
+
+FIND_ORPHANS = """SELECT a.modality, a.file, COUNT(*) FROM annotations AS a
+                  WHERE NOT EXISTS (SELECT 1 FROM files AS f WHERE f.modality = a.modality AND f.file = a.file)
+                  GROUP BY a.modality, a.file ORDER BY a.modality, a.file"""
+DELETE_ORPHANS = """DELETE FROM annotations AS a
+                    WHERE NOT EXISTS (SELECT 1 FROM files AS f WHERE f.modality = a.modality AND f.file = a.file)"""
+
+Progress = Callable[[int, int, str], None]  # steps done, steps in total (0 if unknown), current step
+
+
+def analyze(connection: sqlite3.Connection, progress: Progress) -> List[str]:
+    progress(0, 0, "Updating the statistics of the query planner")
+    connection.execute("ANALYZE")
+    connection.commit()
+    return ["The statistics of the query planner are up to date"]
+
+
+def check_integrity(connection: sqlite3.Connection, progress: Progress) -> List[str]:
+    progress(0, 0, "Checking the integrity of the database")
+    problems = [row[0] for row in connection.execute("PRAGMA integrity_check({})".format(REPORT_LIMIT))]
+    if problems == ["ok"]:
+        return ["The database is intact"]
+    return ["The database is damaged, restore a snapshot:"] + ["  " + problem for problem in problems]
+
+
+def find_missing_files(connection: sqlite3.Connection, progress: Progress, project_path: str) -> List[str]:
+    """lists the files of the registry which do not exist in the data directories"""
+    files = connection.execute("SELECT modality, filename FROM files ORDER BY modality, sort_key").fetchall()
+    missing = list()
+    for start in range(0, len(files), CHECK_STEP):
+        progress(start, len(files), "Looking for missing files")
+        missing += [filename for modality, filename in files[start:start + CHECK_STEP]
+                    if not os.path.exists(project_path + Structure.MODALITY_DIRS[modality] + filename)]
+    if not missing:
+        return ["All {:,} files exist".format(len(files))]
+    return ["{:,} of {:,} files are missing:".format(len(missing), len(files))] + \
+        ["  " + filename for filename in missing[:REPORT_LIMIT]] + more(len(missing))
+
+
+def find_orphans(connection: sqlite3.Connection, progress: Progress, repair: bool = False) -> List[str]:
+    """lists the files (by modality and uid) which are referenced by annotations but do not exist,
+    the annotations are deleted on repair"""
+    progress(0, 0, "Looking for annotations of deleted files")
+    orphans = connection.execute(FIND_ORPHANS).fetchall()
+    if not orphans:
+        return ["All annotations belong to a file"]
+    lines = ["{:,} annotations belong to {:,} deleted files{}:".format(
+        sum(count for _, _, count in orphans), len(orphans), ", they were deleted" if repair else "")]
+    lines += ["  {} {}: {:,} annotations".format(Structure.MODALITY_DIRS[modality].strip("/").split("/")[-1], file,
+                                                 count) for modality, file, count in orphans[:REPORT_LIMIT]]
+    if repair:
+        with connection:
+            connection.execute(DELETE_ORPHANS)
+    return lines + more(len(orphans))
+
+
+def more(count: int) -> List[str]:
+    return ["  and {:,} more".format(count - REPORT_LIMIT)] if count > REPORT_LIMIT else []
+
+
+def run(database_path: str, operations: List[str], progress: Optional[Progress] = None, repair: bool = False,
+        timeout: float = 5.0) -> List[str]:
+    """
+    runs the maintenance operations on the database of a project
+    :param operations: the operations to run, see OPERATIONS
+    :param progress: called with the progress of the current operation
+    :param repair: delete the annotations of files which no longer exist
+    :param timeout: the seconds a write waits for the lock of the database held by another connection
+    :return: the report of the operations
+    """
+    progress = progress or (lambda done, total, step: None)
+    connection = sqlite3.connect(database_path, timeout=timeout)
+    project_path = os.path.dirname(os.path.abspath(database_path))
+    report = list()
+    try:
+        for operation in [operation for operation in OPERATIONS if operation in operations]:
+            if operation == ANALYZE:
+                report += analyze(connection, progress)
+            elif operation == INTEGRITY:
+                report += check_integrity(connection, progress)
+            elif operation == ORPHANS:
+                report += find_orphans(connection, progress, repair)
+            elif operation == MISSING:
+                report += find_missing_files(connection, progress, project_path)
+            elif operation == VACUUM:
+                report += vacuum(connection, progress)
+    finally:
+        connection.close()
+    return report
+
+
+def vacuum(connection: sqlite3.Connection, progress: Progress) -> List[str]:
+    """releases the free pages of the database in steps. databases created before incremental vacuum was enabled
+    are rebuilt once, which takes as long as copying the database and blocks other writers meanwhile"""
+    page_size = connection.execute("PRAGMA page_size").fetchone()[0]
+    if connection.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+        progress(0, 0, "Rebuilding the database for incremental vacuum")
+        size = connection.execute("PRAGMA page_count").fetchone()[0]
+        connection.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        connection.execute("VACUUM")
+        released = size - connection.execute("PRAGMA page_count").fetchone()[0]
+    else:
+        free = connection.execute("PRAGMA freelist_count").fetchone()[0]
+        for start in range(0, free, VACUUM_STEP):
+            progress(start, free, "Releasing unused space")
+            # each step of the statement releases one page, execute would run only the first one
+            connection.executescript("PRAGMA incremental_vacuum({})".format(VACUUM_STEP))
+        released = free
+    return ["{:,.1f} MB of unused space released".format(released * page_size / 1e6)]
+
+
+class MaintenanceWorker(threading.Thread):
+    """runs the maintenance operations in the background, see run"""
+
+    def __init__(self, database_path: str, operations: List[str], repair: bool, progress: Progress,
+                 finished: Callable[[list], None], timeout: float = 5.0):
+        """
+        :param progress: called with the progress of the current operation
+        :param finished: called with the report, which holds the error if an operation failed
+        """
+        super(MaintenanceWorker, self).__init__(name="maintenance", daemon=True)
+        self.database_path = database_path
+        self.operations = operations
+        self.repair = repair
+        self.progress = progress
+        self.finished = finished
+        self.timeout = timeout
+
+    def run(self):
+        try:
+            report = run(self.database_path, self.operations, self.progress, self.repair, self.timeout)
+        except (OSError, sqlite3.Error) as error:
+            report = ["Maintenance failed: {}".format(error)]
+        self.finished(report)
@@ -0,0 +1,156 @@
+"""Debug mode of the database: a proxy of the sqlite3 cursor records every statement with its parameters,
+duration and number of rows, attributed to the SQLiteDatabase method which (directly or indirectly) executed it.
+The query plan of each distinct statement is checked once for full table scans"""
+import re
+import sys
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from typing import Dict, List
+
+MAX_RECORDS = 100000  # only the most recent statements are kept
+FULL_SCAN = re.compile(r"^SCAN (?!.*USING (COVERING )?INDEX)")  # a SCAN step without an index
+EXPLAINED = ("SELECT", "UPDATE", "DELETE", "WITH")
+
+
+class QueryRecord:
+    __slots__ = ("operation", "sql", "params", "duration", "rows", "full_scan")
+
+    def __init__(self, operation: str, sql: str, params, duration: float, rows: int, full_scan: bool):
+        self.operation = operation
+        self.sql = sql
+        self.params = params
+        self.duration = duration  # s
+        self.rows = rows  # fetched rows / rows changed by a DML statement
+        self.full_scan = full_scan
+
+    def __repr__(self):
+        return "{}: {} {} ({:.3f} ms, {} rows{})".format(self.operation, " ".join(self.sql.split()), self.params,
+                                                         self.duration * 1000, self.rows,
+                                                         ", full scan" if self.full_scan else "")
+
+
+class QueryProfiler:
+    """collects the statements executed through a ProfilingCursor"""
+
+    def __init__(self, owner):
+        self.owner = owner  # the database whose methods the statements are attributed to
+        self.records = deque(maxlen=MAX_RECORDS)  # type: deque[QueryRecord]
+        self.counts = Counter()  # operation -> number of statements
+        self.durations = Counter()  # operation -> s
+        self.plans = dict()  # statement -> query plan
+        self._listeners = list()
+
+    def explain(self, connection, sql: str, params) -> List[str]:
+        """returns the query plan of the statement, which is only determined once per statement"""
+        plan = self.plans.get(sql)
+        if plan is None:
+            plan = list()
+            if sql.lstrip().upper().startswith(EXPLAINED):
+                try:
+                    plan = [row[-1] for row in connection.execute("EXPLAIN QUERY PLAN " + sql, params).fetchall()]
+                except Exception:
+                    pass  # e.g. statements with named parameters executed by executemany
+            self.plans[sql] = plan
+        return plan
+
+    def full_scans(self) -> List[QueryRecord]:
+        """returns one record of each statement whose query plan contains a full table scan"""
+        scans = dict()
+        for record in self.records:
+            if record.full_scan:
+                scans.setdefault(record.sql, record)
+        return list(scans.values())
+
+    @contextmanager
+    def measure(self):
+        """collects the statements executed inside the block, e.g. to assert the number of queries in tests"""
+        records = list()
+        self._listeners.append(records)
+        try:
+            yield records
+        finally:
+            self._listeners.remove(records)
+
+    def operation(self) -> str:
+        """returns the outermost method of the database on the call stack"""
+        operation = "<external>"
+        frame = sys._getframe(2)
+        while frame is not None:
+            if frame.f_locals.get("self") is self.owner:
+                operation = frame.f_code.co_name
+            frame = frame.f_back
+        return operation
+
+    def record(self, record: QueryRecord):
+        self.records.append(record)
+        self.counts[record.operation] += 1
+        self.durations[record.operation] += record.duration
+        for listener in self._listeners:
+            listener.append(record)
+
+    def report(self) -> str:
+        """summarizes the number of statements per operation and the statements running full scans"""
+        lines = ["{} ran {:,} queries ({:.1f} ms)".format(operation, count, self.durations[operation] * 1000)
+                 for operation, count in self.counts.most_common()]
+        lines += ["full scan in {}".format(record) for record in self.full_scans()]
+        return "\n".join(lines)
+
+    def reset(self):
+        self.records.clear()
+        self.counts.clear()
+        self.durations.clear()
+
+
+class ProfilingCursor:
+    """proxy of a sqlite3 cursor, which passes each statement to the profiler"""
+
+    def __init__(self, cursor, profiler: QueryProfiler):
+        self.cursor = cursor
+        self.profiler = profiler
+        self.current = None  # type: QueryRecord
+
+    def __getattr__(self, name: str):
+        return getattr(self.cursor, name)
+
+    def __iter__(self):
+        for row in self.cursor:
+            self._count(1)
+            yield row
+
+    def execute(self, sql: str, params=()):
+        return self._run(self.cursor.execute, sql, params, params)
+
+    def executemany(self, sql: str, seq_of_params):
+        seq_of_params = list(seq_of_params)
+        return self._run(self.cursor.executemany, sql, seq_of_params, seq_of_params[0] if seq_of_params else ())
+
+    def fetchall(self) -> list:
+        rows = self.cursor.fetchall()
+        self._count(len(rows))
+        return rows
+
+    def fetchmany(self, *args) -> list:
+        rows = self.cursor.fetchmany(*args)
+        self._count(len(rows))
+        return rows
+
+    def fetchone(self):
+        row = self.cursor.fetchone()
+        self._count(row is not None)
+        return row
+
+    def _count(self, rows: int):
+        if self.current is not None:
+            self.current.rows += rows
+
+    def _run(self, method, sql: str, params, plan_params):
+        operation = self.profiler.operation()
+        plan = self.profiler.explain(self.cursor.connection, sql, plan_params)
+        start = time.perf_counter()
+        method(sql, params)
+        duration = time.perf_counter() - start
+        self.current = QueryRecord(operation, sql, params, duration, max(self.cursor.rowcount, 0),
+                                   any(FULL_SCAN.match(step) for step in plan))
+        self.profiler.record(self.current)
+        return self
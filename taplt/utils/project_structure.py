@@ -1,6 +1,9 @@
 import os
 import shutil
-import filetype
+
+from taplt.utils.lazy import lazy_import
+
+filetype = lazy_import("filetype")
 
 
 class Structure:
@@ -8,7 +11,11 @@ class Structure:
     VIDEOS_DIR = "/data/videos/"
     WSI_DIR = "/data/whole slide images/"
     FILE_DIRS = [IMAGES_DIR, VIDEOS_DIR, WSI_DIR]
+    MODALITY_DIRS = [VIDEOS_DIR, IMAGES_DIR, WSI_DIR]  # indexed by the modality value
+    THUMBNAILS_DIR = "/cache/thumbnails/"
+    PYRAMIDS_DIR = "/cache/pyramids/"
     DATABASE_DEFAULT_NAME = '/database.db'
+    SETTINGS_FILE = '/settings'
 
 
 def check_environment(project_path: str) -> bool:
@@ -1,15 +1,25 @@
 import os.path as osp
-import numpy as np
 import colorsys
 from typing import List, Tuple, Union
 
+from taplt.utils.cache import LookupCache
+from taplt.utils.lazy import lazy_import
+
 from PyQt6.QtWidgets import QListWidgetItem
 from PyQt6.QtGui import QPixmap, QIcon, QColor
 from PyQt6.QtGui import QPainter
 from PyQt6.QtCore import QRect
 
+np = lazy_import("numpy")
+
+ICONS_DIR = osp.join(osp.dirname(osp.abspath(__file__)), "../icons")
+
+# icons are immutable and can be shared by all widgets - each one is created only once
+icon_cache = LookupCache("icons")
+square_icon_cache = LookupCache("square icons", max_entries=256)  # (rgba, size) -> QIcon
+
 
-def closest_euclidean_distance(point: np.ndarray, points: np.ndarray):
+def closest_euclidean_distance(point: "np.ndarray", points: "np.ndarray"):
     dist_2 = np.sum((points - point) ** 2, axis=1)
     return int(np.argmin(dist_2))
 
@@ -34,6 +44,23 @@ def colormap_rgb(n: int, ret_type: str = "qt") -> Union[Tuple[List[QColor], QCol
 
 
 def createListWidgetItemWithSquareIcon(text: str, color: QColor, size: int = 5) -> QListWidgetItem:
+    return QListWidgetItem(create_square_icon(color, size), text)
+
+
+def create_square_icon(color: QColor, size: int = 10) -> QIcon:
+    """returns a square icon filled with the color"""
+    return square_icon_cache.get((color.rgba(), size), lambda key: _paint_square_icon(color, size))
+
+
+def get_icon(icon):
+    return icon_cache.get(icon, _load_icon)
+
+
+def _load_icon(icon: str) -> QIcon:
+    return QIcon(osp.join(":/", ICONS_DIR, "%s.png" % icon))
+
+
+def _paint_square_icon(color: QColor, size: int) -> QIcon:
     pixmap = QPixmap(size, size)
     painter = QPainter()
     painter.begin(pixmap)
@@ -42,10 +69,4 @@ def createListWidgetItemWithSquareIcon(text: str, color: QColor, size: int = 5)
     painter.drawRect(QRect(0, 0, size, size))
     icon = QIcon(pixmap)
     painter.end()
-    return QListWidgetItem(icon, text)
-
-
-def get_icon(icon):
-    this_file = osp.dirname(osp.abspath(__file__))
-    icons_dir = osp.join(this_file, "../icons")
-    return QIcon(osp.join(":/", icons_dir, "%s.png" % icon))
+    return icon
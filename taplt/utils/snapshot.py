@@ -0,0 +1,177 @@
+"""Snapshots of a project in a backup directory. The database is copied with the online backup API of SQLite,
+so the project stays in use meanwhile; the data files and the settings of the project are stored by their content
+hash, so a snapshot copies only the files which are new or have changed since the previous snapshot.
+The backup directory holds
+    objects/XX/HASH                 the content of the data files and the settings
+    snapshots/NAME/database.db      the database
+    snapshots/NAME/manifest.json    {path relative to the project: [content hash, size, modification time]}
+The functions in this module run in a background thread, therefore they must not depend on Qt"""
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from taplt.utils.project_structure import Structure
+from taplt.utils.thumbnails import file_hash
+
+BACKUP_PAGES = 1024  # pages of the database copied per step unless in WAL mode, writers wait only for one step
+MANIFEST = "manifest.json"
+OBJECTS_DIR = "objects"
+SNAPSHOTS_DIR = "snapshots"
+
+Progress = Callable[[int, int, str], None]  # steps done, steps in total, current step
+
+
+def backup_database(database_path: str, target_path: str, timeout: float = 5.0):
+    """copies the database while other connections may use it"""
+    source = sqlite3.connect(database_path, timeout=timeout)
+    target = sqlite3.connect(target_path)
+    try:
+        # readers do not block writers in WAL mode, so the database is copied at once from a consistent state;
+        # otherwise a write in between two steps restarts the copy
+        wal = source.execute("PRAGMA journal_mode").fetchone()[0].lower() == "wal"
+        source.backup(target, pages=-1 if wal else BACKUP_PAGES)
+    finally:
+        target.close()
+        source.close()
+
+
+def create_snapshot(project_path: str, backup_path: str, progress: Optional[Progress] = None) -> str:
+    """
+    stores a snapshot of the project in the backup directory
+    :param project_path: the directory of the project
+    :param backup_path: the backup directory, it may hold snapshots of the project already
+    :param progress: called before each step, the database is the first step and each data file one more
+    :return: the path of the snapshot
+    """
+    snapshots = os.path.join(backup_path, SNAPSHOTS_DIR)
+    name = time.strftime("%Y-%m-%d_%H-%M-%S")
+    snapshot = os.path.join(snapshots, name)
+    suffix = 1
+    while os.path.exists(snapshot):
+        suffix += 1
+        snapshot = os.path.join(snapshots, "{}_{}".format(name, suffix))
+    # the snapshot is written to a temporary directory, so an interrupted snapshot is never taken for a complete one
+    temporary = snapshot + ".tmp"
+    os.makedirs(temporary)
+    previous = load_manifest(latest_snapshot(backup_path)) if list_snapshots(backup_path) else dict()
+    files = data_files(project_path)
+
+    # the database first: files imported meanwhile are stored needlessly, but none the database refers to is missed
+    report = progress or (lambda done, total, step: None)
+    report(0, len(files) + 1, "database")
+    backup_database(project_path + Structure.DATABASE_DEFAULT_NAME, os.path.join(temporary, "database.db"))
+
+    manifest = dict()
+    for done, relative_path in enumerate(files, 1):
+        report(done, len(files) + 1, relative_path)
+        manifest[relative_path] = store_file(backup_path, os.path.join(project_path, relative_path),
+                                             previous.get(relative_path))
+    with open(os.path.join(temporary, MANIFEST), "w") as f:
+        json.dump(manifest, f)
+    os.replace(temporary, snapshot)
+    return snapshot
+
+
+def data_files(project_path: str) -> List[str]:
+    """returns the paths of the data files of the project and its settings file, relative to the project directory"""
+    files = list()
+    for file_dir in Structure.FILE_DIRS:
+        for directory, _, filenames in os.walk(project_path + file_dir):
+            files.extend(os.path.relpath(os.path.join(directory, filename), project_path) for filename in filenames)
+    if os.path.isfile(project_path + Structure.SETTINGS_FILE):
+        files.append(Structure.SETTINGS_FILE.strip("/"))
+    return sorted(files)
+
+
+def latest_snapshot(backup_path: str) -> str:
+    return os.path.join(backup_path, SNAPSHOTS_DIR, list_snapshots(backup_path)[-1])
+
+
+def list_snapshots(backup_path: str) -> List[str]:
+    """returns the names of the complete snapshots in the backup directory, the latest one last"""
+    snapshots = os.path.join(backup_path, SNAPSHOTS_DIR)
+    if not os.path.isdir(snapshots):
+        return list()
+    return sorted((name for name in os.listdir(snapshots) if os.path.exists(os.path.join(snapshots, name, MANIFEST))),
+                  key=lambda name: os.path.getmtime(os.path.join(snapshots, name, MANIFEST)))
+
+
+def load_manifest(snapshot_path: str) -> Dict[str, list]:
+    with open(os.path.join(snapshot_path, MANIFEST)) as f:
+        return json.load(f)
+
+
+def object_path(backup_path: str, content_hash: str) -> str:
+    return os.path.join(backup_path, OBJECTS_DIR, content_hash[:2], content_hash)
+
+
+def restore_snapshot(snapshot_path: str, project_path: str, progress: Optional[Progress] = None):
+    """
+    recreates the project of a snapshot
+    :param snapshot_path: the directory of the snapshot, inside the backup directory
+    :param project_path: the directory of the restored project, it must not exist yet
+    :param progress: called before each step, the database is the first step and each data file one more
+    """
+    backup_path = os.path.dirname(os.path.dirname(os.path.abspath(snapshot_path)))
+    manifest = load_manifest(snapshot_path)
+    os.makedirs(project_path)
+    for file_dir in Structure.FILE_DIRS:
+        os.makedirs(project_path + file_dir)
+
+    report = progress or (lambda done, total, step: None)
+    report(0, len(manifest) + 1, "database")
+    shutil.copyfile(os.path.join(snapshot_path, "database.db"), project_path + Structure.DATABASE_DEFAULT_NAME)
+    for done, (relative_path, (content_hash, _, _)) in enumerate(sorted(manifest.items()), 1):
+        report(done, len(manifest) + 1, relative_path)
+        target = os.path.join(project_path, relative_path)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        shutil.copy2(object_path(backup_path, content_hash), target)
+
+
+def store_file(backup_path: str, filepath: str, previous: Optional[list] = None) -> list:
+    """
+    stores the content of a data file in the backup directory, unless it is stored already
+    :param previous: the entry of the file in the manifest of the previous snapshot; the file is not read
+    if its size and modification time have not changed since
+    :return: the entry of the file in the manifest
+    """
+    stat = os.stat(filepath)
+    if previous is not None and previous[1:] == [stat.st_size, stat.st_mtime_ns] and \
+            os.path.exists(object_path(backup_path, previous[0])):
+        return previous
+    content_hash = file_hash(filepath)
+    target = object_path(backup_path, content_hash)
+    if not os.path.exists(target):
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        temporary = "{}.{}.tmp".format(target, os.getpid())
+        shutil.copy2(filepath, temporary)
+        os.replace(temporary, target)
+    return [content_hash, stat.st_size, stat.st_mtime_ns]
+
+
+class SnapshotWriter(threading.Thread):
+    """creates a snapshot in the background, see create_snapshot"""
+
+    def __init__(self, project_path: str, backup_path: str, progress: Progress,
+                 finished: Callable[[str, str], None]):
+        """
+        :param progress: called before each step
+        :param finished: called with the path of the snapshot and an error message, which is empty on success
+        """
+        super(SnapshotWriter, self).__init__(name="snapshot writer", daemon=True)
+        self.project_path = project_path
+        self.backup_path = backup_path
+        self.progress = progress
+        self.finished = finished
+
+    def run(self):
+        try:
+            snapshot = create_snapshot(self.project_path, self.backup_path, self.progress)
+        except (OSError, sqlite3.Error) as error:
+            self.finished("", str(error))
+        else:
+            self.finished(snapshot, "")
@@ -0,0 +1,153 @@
+"""Generation of synthetic projects for benchmarks, stress and load tests.
+The files are tiny placeholders and all rows are inserted with bulk SQL, so even projects
+with 100k images and millions of annotations are created within seconds"""
+import math
+import os
+import pickle
+import random
+import shutil
+import sqlite3
+import zlib
+import struct
+from typing import Iterator, List
+
+from PyQt6.QtCore import QSettings
+
+from taplt.utils.colors import color_for_index
+from taplt.utils.database import (SQLiteDatabase, ADD_ANNOTATION, ADD_IMAGE, ADD_LABEL, ADD_PATIENT,
+                                  CREATE_STATISTICS_TABLES, FILL_COMMENT_INDEX, STATISTICS_TRIGGERS)
+from taplt.utils.project_structure import create_project_structure, Structure
+from taplt.utils.settings import SETTINGS
+from taplt.utils.thumbnails import file_hash
+
+IMAGE_SIZE = (512, 512)  # the coordinate space of the generated polygons
+SHAPE_VARIANTS = 64  # distinct polygons per label class, the annotations reuse them
+COMMENTS = ["", "", "", "unclear margin", "artifact", "ask a pathologist", "blurred region", "follow-up"]
+
+
+def placeholder_png(width: int = 8, height: int = 8) -> bytes:
+    """returns a valid, gray PNG image"""
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+    rows = b"".join(b"\x00" + b"\x80" * width for _ in range(height))
+    return (b"\x89PNG\r\n\x1a\n" +
+            chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 0, 0, 0, 0)) +
+            chunk(b"IDAT", zlib.compress(rows)) +
+            chunk(b"IEND", b""))
+
+
+def polygon_points(rng: random.Random, vertices: int, width: int, height: int) -> List[List[float]]:
+    """returns the vertices of a star-shaped polygon at a random position inside the image"""
+    radius = rng.uniform(10, min(width, height) / 8)
+    cx, cy = rng.uniform(radius, width - radius), rng.uniform(radius, height - radius)
+    points = list()
+    for i in range(vertices):
+        angle = 2 * math.pi * i / vertices
+        r = radius * rng.uniform(0.6, 1.0)
+        points.append([cx + r * math.cos(angle), cy + r * math.sin(angle)])
+    return points
+
+
+def label_dicts(shapes: int, vertices: int, labels: int = 5, seed: int = 0, size=IMAGE_SIZE) -> List[dict]:
+    """returns polygons in the serialized representation of Shape.to_dict"""
+    rng = random.Random(seed)
+    return [{'label': label_name(rng.randrange(labels)),
+             'points': polygon_points(rng, vertices, *size),
+             'shape_type': 'polygon',
+             'flags': None,
+             'group_id': None,
+             'comment': ""} for _ in range(shapes)]
+
+
+def label_name(idx: int) -> str:
+    return "Class {}".format(idx)
+
+
+def generate_project(project_path: str, images: int = 1000, patients: int = 10, labels: int = 5,
+                     polygons: int = 10, vertices: int = 8, sparse: bool = False, seed: int = 0) -> str:
+    """
+    creates a project with synthetic content; an existing project at the location is replaced
+    :param project_path: the directory of the project
+    :param images: the number of images
+    :param patients: the number of patients, the images are distributed evenly
+    :param labels: the number of label classes
+    :param polygons: the number of polygons per image
+    :param vertices: the number of vertices per polygon
+    :param sparse: create empty sparse files instead of (hard linked) placeholder images
+    :param seed: the seed of the random polygons
+    :return: the path to the database
+    """
+    create_project_structure(project_path)
+    filenames = ["image_{:07d}.png".format(i) for i in range(images)]
+    content_hash = create_placeholders(project_path + Structure.IMAGES_DIR, filenames, sparse)
+
+    database_path = project_path + Structure.DATABASE_DEFAULT_NAME
+    connection = sqlite3.connect(database_path)
+    cursor = connection.cursor()
+    cursor.execute("PRAGMA journal_mode = OFF;")
+    cursor.execute("PRAGMA synchronous = OFF;")
+
+    # the tables (including the file registry and its triggers) are created by the database class itself
+    database = SQLiteDatabase()
+    database.connection, database.cursor = connection, cursor
+    database.create_initial_tables()
+
+    # the summary tables are filled from the annotations at once, which is much faster than by their triggers
+    with connection:
+        for trigger in STATISTICS_TRIGGERS:
+            cursor.execute("DROP TRIGGER {}".format(trigger))
+        for table_name in CREATE_STATISTICS_TABLES:
+            cursor.execute("DROP TABLE {}".format(table_name))
+
+    patients = max(min(patients, images), 1)
+    with connection:
+        cursor.executemany(ADD_PATIENT, (("Patient {}".format(i), 2) for i in range(patients)))
+        cursor.executemany(ADD_LABEL, ((label_name(i), color_for_index(i)) for i in range(labels)))
+        cursor.executemany(ADD_IMAGE, ((filename, 1 + i % patients) for i, filename in enumerate(filenames)))
+        cursor.execute("UPDATE files SET hash = ?", (content_hash,))
+        if labels and polygons:
+            cursor.executemany(ADD_ANNOTATION, annotation_rows(images, patients, labels, polygons, vertices, seed))
+            cursor.execute(FILL_COMMENT_INDEX.format(""))
+    database.create_statistics()
+    cursor.execute("ANALYZE;")
+    connection.close()
+
+    settings = QSettings(project_path + Structure.SETTINGS_FILE, QSettings.Format.NativeFormat)
+    for setting in SETTINGS:
+        settings.setValue(setting[0], setting[1])
+    settings.sync()
+    return database_path
+
+
+def annotation_rows(images: int, patients: int, labels: int, polygons: int, vertices: int,
+                    seed: int) -> Iterator[tuple]:
+    """yields the annotation rows; each polygon is picked from a pool of pickled polygons per label class"""
+    rng = random.Random(seed)
+    variants = list()
+    for label in range(labels):
+        for label_dict in label_dicts(SHAPE_VARIANTS, vertices, labels, seed=rng.random()):
+            label_dict['label'] = label_name(label)
+            label_dict['comment'] = rng.choice(COMMENTS)
+            variants.append((pickle.dumps(label_dict), label + 1, label_dict['comment']))
+    for image in range(images):
+        patient = 1 + image % patients
+        for shape, label, comment in rng.choices(variants, k=polygons):
+            yield 1, image + 1, patient, shape, label, 0, comment
+
+
+def create_placeholders(directory: str, filenames: List[str], sparse: bool = False) -> str:
+    """writes one placeholder file and links it under all filenames; returns the content hash of the files"""
+    template = os.path.join(directory, ".placeholder")
+    with open(template, "wb") as f:
+        if sparse:
+            f.truncate(1 << 20)
+        else:
+            f.write(placeholder_png())
+    content_hash = file_hash(template)
+    for filename in filenames:
+        try:
+            os.link(template, os.path.join(directory, filename))
+        except OSError:
+            shutil.copyfile(template, os.path.join(directory, filename))
+    os.remove(template)
+    return content_hash
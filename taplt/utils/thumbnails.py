@@ -0,0 +1,145 @@
+"""Generation of downscaled file previews. The functions in this module run in worker processes,
+therefore they must not depend on Qt"""
+import hashlib
+import os
+import shutil
+from typing import List, Optional, Tuple
+
+from taplt.utils.lazy import lazy_import
+
+Image = lazy_import("PIL.Image")
+
+THUMBNAIL_SIZE = 128
+HASH_CHUNK_SIZE = 1 << 20
+PYRAMID_MIN_SIZE = 2048  # images up to this width and height are displayed without a pyramid
+
+
+def copy_with_hash(filepath: str, target: str) -> str:
+    """copies a file like shutil.copy (target may be a directory) and returns its content hash (see file_hash),
+    the file is read only once"""
+    if os.path.isdir(target):
+        target = os.path.join(target, os.path.basename(filepath))
+    digest = hashlib.blake2b(digest_size=16)
+    with open(filepath, "rb") as source, open(target, "wb") as f:
+        for chunk in iter(lambda: source.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+            f.write(chunk)
+    shutil.copymode(filepath, target)
+    return digest.hexdigest()
+
+
+def file_hash(filepath: str) -> str:
+    """returns the content hash of a file, used as key of the thumbnail cache"""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(filepath, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def thumbnail_path(cache_dir: str, content_hash: str) -> str:
+    return os.path.join(cache_dir, content_hash + ".png")
+
+
+def create_thumbnail(filepath: str, cache_dir: str, content_hash: str = None,
+                     size: int = THUMBNAIL_SIZE) -> Tuple[str, Optional[str]]:
+    """
+    creates the thumbnail of an image or video, unless it is cached already
+    :param filepath: the file to create the thumbnail for
+    :param cache_dir: the directory holding the thumbnails
+    :param content_hash: the hash of the file, computed if not known
+    :param size: the maximum width and height of the thumbnail
+    :return: the hash of the file and the path to the thumbnail (None if the file can not be read)
+    """
+    if content_hash is None:
+        content_hash = file_hash(filepath)
+    target = thumbnail_path(cache_dir, content_hash)
+    if os.path.exists(target):
+        return content_hash, target
+
+    image = open_preview(filepath, size)
+    if image is None:
+        return content_hash, None
+    image.thumbnail((size, size))
+    if image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA")
+
+    # write to a temporary file first, so other processes never see a partial thumbnail
+    os.makedirs(cache_dir, exist_ok=True)
+    temporary = "{}.{}.tmp".format(target, os.getpid())
+    image.save(temporary, format="PNG")
+    os.replace(temporary, target)
+    return content_hash, target
+
+
+def open_image(filepath: str) -> "Image.Image":
+    # project files are trusted - allow decoding large microscopy images
+    Image.MAX_IMAGE_PIXELS = None
+    return Image.open(filepath)
+
+
+def open_preview(filepath: str, size: int) -> Optional["Image.Image"]:
+    """opens an image (decoding a reduced version if the format allows it) or the first frame of a video"""
+    try:
+        image = open_image(filepath)
+        image.draft("RGB", (size, size))  # lets the JPEG decoder skip the full resolution
+        image.load()
+        return image
+    except OSError:
+        pass
+
+    try:
+        import av
+    except ImportError:
+        return None
+    try:
+        with av.open(filepath) as container:
+            for frame in container.decode(video=0):
+                return frame.to_image()
+    except (av.FFmpegError, IndexError):
+        return None
+    return None
+
+
+def image_pyramid(filepath: str, cache_dir: str,
+                  min_size: int = PYRAMID_MIN_SIZE) -> Tuple[Optional[Tuple[int, int]], List[str]]:
+    """
+    returns the mipmap pyramid of a large image, creating it on the first call
+    every level has half the width and height of the previous one, level 0 (the file itself) is not part of the list
+    :param filepath: the image
+    :param cache_dir: the directory holding the pyramids of the project
+    :param min_size: levels are created until the image fits into min_size x min_size
+    :return: the full resolution size of the image (None if it can not be read) and the paths to the levels 1..n
+    """
+    try:
+        with open_image(filepath) as image:
+            size = image.size
+            if max(size) <= min_size:
+                return size, []
+
+            # the file's name, size and modification time identify its version - hashing a huge image is too slow
+            stat = os.stat(filepath)
+            key = hashlib.blake2b("{}:{}:{}".format(os.path.basename(filepath), stat.st_size, stat.st_mtime_ns)
+                                  .encode(), digest_size=16).hexdigest()
+            directory = os.path.join(cache_dir, key)
+            if not os.path.isdir(directory):
+                _create_levels(image, directory, min_size)
+    except OSError:
+        return None, []
+    levels = sorted(os.listdir(directory), key=lambda name: int(name.split("_")[1].split(".")[0]))
+    return size, [os.path.join(directory, level) for level in levels]
+
+
+def _create_levels(image: "Image.Image", directory: str, min_size: int):
+    """decodes the image once and writes the reduced levels; the directory appears only once it is complete"""
+    image.load()
+    if image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA")
+    temporary = "{}.{}.tmp".format(directory, os.getpid())
+    os.makedirs(temporary, exist_ok=True)
+    level = 0
+    while max(image.size) > min_size:
+        image = image.reduce(2)
+        level += 1
+        image.save(os.path.join(temporary, "level_{}.png".format(level)), format="PNG", compress_level=1)
+    os.replace(temporary, directory)
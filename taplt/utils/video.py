@@ -0,0 +1,154 @@
+from bisect import bisect_right
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+from PyQt6.QtGui import QImage
+
+# PyAV is an optional dependency - without it, videos can be imported but not displayed.
+# it is imported on first use (see load_av), importing it takes longer than starting the application
+av = None
+_av_checked = False
+
+
+class VideoIndex:
+    """the keyframe index of a video: the number of frames, the frame rate and
+    the (frame number, presentation timestamp) of every keyframe"""
+
+    def __init__(self, frame_count: int, fps: float, keyframes: List[Tuple[int, int]]):
+        self.frame_count = frame_count
+        self.fps = fps
+        self.keyframes = sorted(keyframes)
+        self._keyframe_numbers = [frame for frame, _ in self.keyframes]
+
+    def keyframe_before(self, frame: int) -> Tuple[int, int]:
+        """returns the (frame number, timestamp) of the last keyframe at or before the given frame"""
+        idx = max(bisect_right(self._keyframe_numbers, frame) - 1, 0)
+        return self.keyframes[idx]
+
+    def to_dict(self) -> dict:
+        return {'frame_count': self.frame_count, 'fps': self.fps, 'keyframes': self.keyframes}
+
+    @classmethod
+    def from_dict(cls, dictionary: dict):
+        return cls(dictionary['frame_count'], dictionary['fps'], [tuple(kf) for kf in dictionary['keyframes']])
+
+
+def load_av():
+    """returns the PyAV module / None if it is not installed"""
+    global av, _av_checked
+    if not _av_checked:
+        _av_checked = True
+        try:
+            import av as module
+            av = module
+        except ImportError:
+            pass
+    return av
+
+
+def check_video_support():
+    """raises an ImportError if videos can not be decoded"""
+    if load_av() is None:
+        raise ImportError("Displaying videos requires PyAV. Install it with 'pip install av'.")
+
+
+def build_keyframe_index(filepath: str) -> VideoIndex:
+    """demuxes (without decoding) the first video stream of the file and collects the keyframes.
+    frame numbers refer to the presentation order of the frames"""
+    check_video_support()
+    with av.open(filepath) as container:
+        stream = container.streams.video[0]
+        timestamps, keyframe_timestamps = list(), list()
+        for packet in container.demux(stream):
+            if packet.pts is None:
+                continue
+            timestamps.append(packet.pts)
+            if packet.is_keyframe:
+                keyframe_timestamps.append(packet.pts)
+        fps = float(stream.average_rate) if stream.average_rate else 0.0
+
+    timestamps.sort()
+    frame_numbers = {pts: frame for frame, pts in enumerate(timestamps)}
+    keyframes = [(frame_numbers[pts], pts) for pts in keyframe_timestamps]
+    return VideoIndex(len(timestamps), fps, keyframes)
+
+
+class VideoReader:
+    """random access to the frames of a video
+    uses the keyframe index to seek and keeps an LRU cache of decoded frames.
+    decoding continues a few frames past the requested one (read-ahead), so stepping forward hits the cache"""
+
+    def __init__(self, filepath: str, index: VideoIndex, cache_size: int = 64, read_ahead: int = 8):
+        check_video_support()
+        self.filepath = filepath
+        self.index = index
+        self.cache_size = cache_size
+        self.read_ahead = read_ahead
+        self.cache = OrderedDict()  # frame number -> QImage
+        self.hits = 0
+        self.misses = 0
+
+        self._container = av.open(filepath)
+        self._stream = self._container.streams.video[0]
+        self._stream.thread_type = "AUTO"
+        self._decoder = None
+        self._next_frame = -1  # the frame number the running decoder will produce next
+
+    def close(self):
+        self._decoder = None
+        self._container.close()
+
+    def frame(self, frame: int) -> Optional[QImage]:
+        """returns the decoded frame with the given number"""
+        frame = min(max(frame, 0), self.index.frame_count - 1)
+        if frame in self.cache:
+            self.hits += 1
+            self.cache.move_to_end(frame)
+            return self.cache[frame]
+        self.misses += 1
+
+        # continue the running decoder if the frame lies shortly ahead, otherwise seek to the nearest keyframe
+        keyframe, pts = self.index.keyframe_before(frame)
+        ahead = frame - self._next_frame
+        if self._decoder is None or ahead < 0 or (self._next_frame < keyframe and ahead > self.read_ahead):
+            self._seek(keyframe, pts)
+        self._decode_until(frame + self.read_ahead, keep_from=frame)
+        return self.cache.get(frame)
+
+    def _seek(self, keyframe: int, pts: int):
+        self._container.seek(pts, stream=self._stream, backward=True, any_frame=False)
+        self._decoder = self._frames(pts)
+        self._next_frame = keyframe
+
+    def _frames(self, start_pts: int):
+        """generator yielding the decoded frames from the current position, skipping frames
+        which precede the keyframe (they may occur in open GOPs)"""
+        for decoded in self._container.decode(self._stream):
+            if decoded.pts is not None and decoded.pts < start_pts:
+                continue
+            yield decoded
+
+    def _decode_until(self, last_frame: int, keep_from: int):
+        """decodes frames up to last_frame and caches all frames from keep_from on"""
+        last_frame = min(last_frame, self.index.frame_count - 1)
+        while self._next_frame <= last_frame:
+            decoded = next(self._decoder, None)
+            if decoded is None:
+                self._decoder = None
+                break
+            if self._next_frame >= keep_from:
+                self._store(self._next_frame, to_qimage(decoded))
+            self._next_frame += 1
+
+    def _store(self, frame: int, image: QImage):
+        self.cache[frame] = image
+        self.cache.move_to_end(frame)
+        while len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+
+
+def to_qimage(frame) -> QImage:
+    """converts a decoded PyAV frame into a QImage"""
+    array = frame.to_ndarray(format="rgb24")
+    height, width, _ = array.shape
+    return QImage(array.data, width, height, 3 * width, QImage.Format.Format_RGB888).copy()
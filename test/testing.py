@@ -96,11 +96,8 @@ def test_file_viewing_widget():
     file_widget = FileViewingWidget()
     images = ["Picture1", "Picture2", "PicThree", "importantPicture"]
     wsi = ["WholeSlideImage0001", "WholeSlideImage0002", "anotherWSI"]
-    for i, w in zip(images, wsi):
-        item1 = QListWidgetItem(i)
-        file_widget.image_list.addItem(item1)
-        item2 = QListWidgetItem(w)
-        file_widget.wsi_list.addItem(item2)
+    file_widget.update_list([(name, False, uid, None) for uid, name in enumerate(images)], -1, 1)
+    file_widget.update_list([(name, False, uid, None) for uid, name in enumerate(wsi)], -1, 2)
     file_widget.show()
     app.exec()
 
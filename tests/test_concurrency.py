@@ -0,0 +1,170 @@
+"""Several annotators saving the same project at once, each in a process of its own.
+A save states the version of the annotations it is based on; a save based on an outdated version is refused
+and retried on the current annotations, so no annotation of any annotator may get lost"""
+import multiprocessing
+
+import pytest
+
+ANNOTATORS = 4
+SAVES = 25
+
+
+def annotate(database_path: str, user: str, file_uid: int) -> int:
+    """adds one shape per save to the file, returns the number of refused saves"""
+    from taplt.utils.database import SQLiteDatabase
+
+    database = SQLiteDatabase(user=user)
+    database.connect(database_path)
+    _, modality, file, _, _ = file_row = database.get_file(file_uid)
+    conflicts = 0
+    try:
+        for i in range(SAVES):
+            shape = {"label": "Class 0", "points": [[i, i], [i + 5.0, i], [i, i + 5.0]], "shape_type": "polygon",
+                     "comment": "{} {}".format(user, i)}
+            while True:
+                version = database.get_version(modality, file)[0]
+                label_dicts = database.get_annotations(modality, file) + [shape]
+                entries = [database.create_annotation_entry(file_row[3], label_dict, label_dict["label"], file_row)
+                           for label_dict in label_dicts]
+                if database.update_file_annotations(modality, file, entries, version=version) is not None:
+                    break
+                conflicts += 1
+    finally:
+        database.connection.close()
+    return conflicts
+
+
+@pytest.fixture
+def shared_project(create_project):
+    return create_project(user="owner", initialize=False, images=3, polygons=5)
+
+
+def test_concurrent_saves_lose_no_annotations(shared_project):
+    database = shared_project
+    file_uid = database.get_first_file()
+    _, modality, file, _, _ = database.get_file(file_uid)
+    stored = database.get_annotations(modality, file)
+
+    database_path = database.location + "/database.db"
+    users = ["annotator {}".format(i) for i in range(ANNOTATORS)]
+    with multiprocessing.get_context("spawn").Pool(ANNOTATORS) as pool:
+        conflicts = pool.starmap(annotate, [(database_path, user, file_uid) for user in users])
+
+    annotations = database.get_annotations(modality, file)
+    assert len(annotations) == len(stored) + ANNOTATORS * SAVES, conflicts
+    assert sorted(annotation["comment"] for annotation in annotations[len(stored):]) == sorted(
+        "{} {}".format(user, i) for user in users for i in range(SAVES))
+    assert database.get_version(modality, file)[0] == ANNOTATORS * SAVES
+
+    # each annotator is recorded with the shapes they created, earlier shapes keep their annotator
+    attribution = database.cursor.execute("""SELECT comment, created_by, modified_by FROM annotations
+                                             WHERE modality = ? AND file = ? AND comment LIKE 'annotator%'""",
+                                          (modality, file)).fetchall()
+    assert all(comment.startswith(created_by + " ") and created_by == modified_by
+               for comment, created_by, modified_by in attribution)
+    assert database.cursor.execute("PRAGMA integrity_check").fetchone()[0] == "ok"
+
+
+def test_outdated_save_is_refused(shared_project):
+    database = shared_project
+    file_uid = database.get_first_file()
+    file_row = database.get_file(file_uid)
+    version = database.get_version(file_row[1], file_row[2])[0]
+    label_dicts = database.get_annotations(file_row[1], file_row[2])
+    entries = [database.create_annotation_entry(file_row[3], label_dict, label_dict["label"], file_row)
+               for label_dict in label_dicts]
+
+    assert database.update_file_annotations(file_row[1], file_row[2], entries[:1], version=version) == version + 1
+    assert database.update_file_annotations(file_row[1], file_row[2], entries, version=version) is None
+    assert len(database.get_annotations(file_row[1], file_row[2])) == 1
+
+    conflicts = list()
+    database.sSaveConflict.connect(lambda *args: conflicts.append(args))
+    database.versions[(file_uid, 0)] = version
+    database.save([], file_uid)
+    assert conflicts == [(file_uid, 0, "owner")]
+    database.overwrite([], file_uid)
+    assert database.get_annotations(file_row[1], file_row[2]) == []
+    assert database.get_version(file_row[1], file_row[2]) == (version + 2, "owner")
+
+
+def claim_files(database_path: str, user: str) -> list:
+    """claims and completes files of the work queue until it is empty, returns the claimed files"""
+    from taplt.utils.database import SQLiteDatabase
+
+    database = SQLiteDatabase(user=user)
+    database.connect(database_path)
+    claimed = list()
+    try:
+        file_uid = database.claim_file()
+        while file_uid != -1:
+            claimed.append(file_uid)
+            database.complete_file(file_uid)
+            file_uid = database.claim_file()
+    finally:
+        database.connection.close()
+    return claimed
+
+
+def test_work_queue_hands_out_each_file_once(create_project):
+    database = create_project(user="owner", initialize=False, images=60, polygons=1)
+    database.create_initial_tables()
+    queued = [file[2] for file in database.filter_files(limit=-1)]
+    assert database.queue_files("") == len(queued)
+    assert database.queue_files("") == 0
+    plan = " ".join(row[-1] for row in database.cursor.execute(
+        "EXPLAIN QUERY PLAN SELECT file FROM work_queue WHERE done = 0 AND lease_until < 0 ORDER BY position LIMIT 1"))
+    assert "work_queue_open" in plan, plan
+
+    database_path = database.location + "/database.db"
+    users = ["annotator {}".format(i) for i in range(ANNOTATORS)]
+    with multiprocessing.get_context("spawn").Pool(ANNOTATORS) as pool:
+        claimed = pool.starmap(claim_files, [(database_path, user) for user in users])
+    assert sorted(file_uid for files in claimed for file_uid in files) == sorted(queued)
+    assert database.get_work_queue() == (0, 0, len(queued))
+
+
+def test_expired_claims_are_handed_out_again(shared_project):
+    database = shared_project
+    database.create_initial_tables()
+    database.queue_files("")
+    other = type(database)(user="other")
+    other.connect(database.location + "/database.db")
+
+    first = database.claim_file(lease=-1)  # expired right away, e.g. the annotator went home
+    assert other.claim_file() == first
+    second = database.claim_file()
+    assert second != first and database.get_work_queue() == (1, 1, 0)
+    assert other.claim_file() not in (first, second, -1)
+    assert other.claim_file() == -1
+    other.complete_file(second)  # completing is reserved for the claiming annotator
+    assert database.get_work_queue() == (0, 1, 0)
+    database.release_claims()
+    assert database.get_claims() == [("other", 2)] and database.get_work_queue() == (1, 0, 0)
+    other.connection.close()
+
+
+def test_journal_is_replayed_by_its_annotator_only(shared_project):
+    from taplt.utils import journal
+    from taplt.utils.database import SQLiteDatabase
+    alice = shared_project
+    alice.user = "alice"
+    file_uid = alice.get_first_file()
+    file_row = alice.get_file(file_uid)
+    stored = alice.get_annotations(file_row[1], file_row[2])
+    alice.append_journal(file_uid, 0, journal.DELETE, journal.dumps({"ids": [0]}))  # not saved, alice's program crashed
+
+    bob = SQLiteDatabase(user="bob")
+    bob.connect(alice.location + "/database.db")
+    bob.append_journal(file_uid, 0, journal.DELETE, journal.dumps({"ids": [1]}))
+    bob.clear_journal(file_uid)  # bob dismisses his edit
+    bob.replay_journal()  # bob opens the project
+    assert bob.get_annotations(file_row[1], file_row[2]) == stored
+    assert bob.get_version(file_row[1], file_row[2]) == (0, None)
+
+    alice.replay_journal()  # alice opens the project again
+    assert [annotation["points"] for annotation in alice.get_annotations(file_row[1], file_row[2])] == \
+        [annotation["points"] for annotation in stored[1:]]
+    assert alice.get_version(file_row[1], file_row[2]) == (1, "alice")
+    assert alice.cursor.execute("SELECT COUNT(*) FROM journal").fetchone()[0] == 0
+    bob.connection.close()
@@ -0,0 +1,40 @@
+"""The query language of the file list: filters are compiled to SQL, which pages through the file registry
+without reading the annotations"""
+import pytest
+
+
+@pytest.fixture(scope="module")
+def project(create_project):
+    return create_project(profile=True, images=10, polygons=10)
+
+
+def test_filter_matches_annotations(project):
+    """the filter is compiled to lookups in the summary tables, the pages of a filtered list match the annotations"""
+    from taplt.utils.filters import FilterError
+
+    database = project
+    files = dict()
+    for filepath, _, uid, _ in database.prepare_files():
+        file_row = database.get_file(uid)
+        annotations = database.get_annotations(file_row[1], file_row[2])
+        files[uid] = (filepath.split("/")[-1], database.get_patient_by_uid(file_row[4]),
+                      [annotation['label'] for annotation in annotations])
+    patient = files[min(files)][1]
+
+    expressions = {'label:"Class 1"': lambda name, _, labels: "Class 1" in labels,
+                   'not label:"Class 1" or annotations < 5': lambda name, _, labels:
+                       "Class 1" not in labels or len(labels) < 5,
+                   'patient:"{}" label:"Class 0" >= 2'.format(patient): lambda name, patient_id, labels:
+                       patient_id == patient and labels.count("Class 0") >= 2,
+                   '(annotations:0 or annotations > 9) and 00': lambda name, _, labels:
+                       (not labels or len(labels) > 9) and "00" in name}
+    for expression, expected in expressions.items():
+        with database.profiler.measure() as queries:
+            pages = [database.filter_files(expression, limit=3)]
+            while pages[-1]:
+                pages.append(database.filter_files(expression, after=pages[-1][-1][4], limit=3))
+        assert not any("FROM annotations" in query.sql for query in queries)
+        assert [file[2] for page in pages for file in page] == [uid for uid, file in files.items() if expected(*file)]
+
+    with pytest.raises(FilterError):
+        database.filter_files("label:tumor and (annotations > 5")
@@ -0,0 +1,61 @@
+"""Edits of the annotations are journaled before they are saved, so they survive a crash of the application"""
+import shutil
+
+
+def test_journal_replayed_after_crash(create_project, tmp_path):
+    from taplt.utils.database import SQLiteDatabase
+    from taplt.utils.journal import ADD, MOVE, dumps
+    project = create_project(images=3, polygons=5)
+
+    file_row = project.get_file(1)
+    stored = project.get_annotations(file_row[1], file_row[2])
+    shape = {"label": "Crash", "points": [[1.0, 1.0], [5.0, 1.0], [5.0, 5.0]], "shape_type": "polygon"}
+    project.append_journal(1, 0, ADD, dumps({"shapes": [[len(stored), shape]]}))
+    project.append_journal(1, 0, MOVE, dumps({"id": len(stored), "dx": 1.0, "dy": 2.0}))
+    project.flush_journal()  # the background thread writes the records within the interval
+
+    # the copy is what a crash leaves behind: the records are stored, but the annotations are not
+    database_path = shutil.copytree(project.location, str(tmp_path / "crashed")) + "/database.db"
+    project.clear_journal(1)
+    database = SQLiteDatabase()
+    database.initialize(database_path)
+    try:
+        annotations = database.get_annotations(file_row[1], file_row[2])
+        assert len(annotations) == len(stored) + 1
+        assert annotations[-1]["label"] == "Crash"
+        assert annotations[-1]["points"] == [[2.0, 3.0], [6.0, 3.0], [6.0, 7.0]]
+    finally:
+        database.close_journal()
+        database.connection.close()
+
+
+def test_journal_not_replayed_over_a_later_save(create_project, tmp_path):
+    """the records refer to the shapes by their position, which another annotator's save may have changed"""
+    from taplt.utils.database import SQLiteDatabase
+    from taplt.utils.journal import MOVE, dumps
+    alice = create_project(user="alice", images=3, polygons=5)
+    file_row = alice.get_file(1)
+    alice.update_gui(1)  # the version of the annotations is recorded when the file is displayed
+    alice.append_journal(1, 0, MOVE, dumps({"id": 0, "dx": 1.0, "dy": 2.0}))
+    alice.flush_journal()
+
+    # bob deletes the first shape before alice's program crashed
+    bob = SQLiteDatabase(user="bob")
+    bob.connect(alice.location + "/database.db")
+    label_dicts = bob.get_annotations(file_row[1], file_row[2])[1:]
+    bob.update_file_annotations(file_row[1], file_row[2], [
+        bob.create_annotation_entry(file_row[3], label_dict, label_dict["label"], file_row)
+        for label_dict in label_dicts], version=bob.get_version(file_row[1], file_row[2])[0])
+    bob.connection.close()
+
+    database_path = shutil.copytree(alice.location, str(tmp_path / "crashed")) + "/database.db"
+    database = SQLiteDatabase(user="alice")
+    database.initialize(database_path)
+    try:
+        assert [annotation["points"] for annotation in database.get_annotations(file_row[1], file_row[2])] == \
+            [label_dict["points"] for label_dict in label_dicts]
+        assert database.get_version(file_row[1], file_row[2]) == (1, "bob")
+        assert database.cursor.execute("SELECT COUNT(*) FROM journal").fetchone()[0] == 1  # kept for alice
+    finally:
+        database.close_journal()
+        database.connection.close()
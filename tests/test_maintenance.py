@@ -0,0 +1,65 @@
+"""Maintenance of the database: the free pages left behind by saving are released, annotations of deleted files
+and files missing on disk are found"""
+import os
+import sqlite3
+import threading
+
+import pytest
+
+
+@pytest.fixture
+def fragmented_project(create_project):
+    """a project whose annotations were saved again, with annotations of a deleted file and a missing image"""
+    from taplt.utils.project_structure import Structure
+    database = create_project(images=30, polygons=20)
+    for file in database.prepare_files()[::2]:
+        database.save([], file[2])
+    with database.connection:
+        database.cursor.execute("DELETE FROM images WHERE filename = 'image_0000001.png'")
+    os.remove(database.location + Structure.IMAGES_DIR + "image_0000002.png")
+    return database
+
+
+def test_maintenance_finds_and_repairs_problems(fragmented_project):
+    from taplt.utils import maintenance
+    database = fragmented_project
+    database_path = database.location + "/database.db"
+    assert database.cursor.execute("PRAGMA auto_vacuum").fetchone()[0] == 2  # new projects are vacuumed in steps
+    free = database.cursor.execute("PRAGMA freelist_count").fetchone()[0]
+    assert free > 0
+
+    steps = list()
+    report = maintenance.run(database_path, list(maintenance.OPERATIONS),
+                             lambda done, total, step: steps.append(step), repair=True)
+    assert report[0] == "The database is intact"
+    assert report[1:3] == ["20 annotations belong to 1 deleted files, they were deleted:", "  images 2: 20 annotations"]
+    assert report[3:5] == ["1 of 29 files are missing:", "  image_0000002.png"]
+    assert steps[0] == "Checking the integrity of the database" and "Releasing unused space" in steps
+    assert database.cursor.execute("PRAGMA freelist_count").fetchone()[0] == 0
+    assert database.cursor.execute(maintenance.FIND_ORPHANS).fetchall() == []
+    assert database.cursor.execute("SELECT COUNT(*) FROM sqlite_stat1").fetchone()[0] > 0
+    assert maintenance.run(database_path, [maintenance.ORPHANS]) == ["All annotations belong to a file"]
+
+
+def test_vacuum_converts_older_databases(qapp, fragmented_project):
+    from taplt.utils import maintenance
+    database = fragmented_project
+    database.connection.execute("PRAGMA auto_vacuum = NONE")
+    database.connection.execute("VACUUM")  # a database created before incremental vacuum
+    with database.connection:
+        database.cursor.execute("DELETE FROM annotations WHERE file > 10")
+    size = os.path.getsize(database.location + "/database.db")
+
+    finished = threading.Event()
+    reports = list()
+    database.sMaintenanceFinished.connect(lambda report: reports.append(report) or finished.set())
+    assert database.run_maintenance([maintenance.VACUUM])
+    while not finished.wait(0.01):
+        qapp.processEvents()  # the signals of the maintenance thread are queued for the main thread
+
+    assert reports[0][0].endswith("MB of unused space released")
+    connection = sqlite3.connect(database.location + "/database.db")
+    assert connection.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+    connection.close()
+    database.cursor.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    assert os.path.getsize(database.location + "/database.db") < size
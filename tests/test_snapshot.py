@@ -0,0 +1,78 @@
+"""Snapshots of a project, taken while the project is in use. A snapshot copies only the data files which are new
+or have changed since the previous one, unchanged files are recognized by their size and modification time"""
+import os
+import sqlite3
+import threading
+
+import pytest
+
+
+@pytest.fixture
+def project_in_use(create_project):
+    return create_project(images=20, polygons=3)
+
+
+def stored_objects(backup_path: str) -> list:
+    return [filename for _, _, filenames in os.walk(os.path.join(backup_path, "objects")) for filename in filenames]
+
+
+def test_snapshots_copy_changed_files_only(project_in_use, tmp_path, monkeypatch):
+    from taplt.utils import snapshot
+    from taplt.utils.project_structure import Structure
+    database = project_in_use
+    backup_path = str(tmp_path / "backup")
+
+    snapshot.create_snapshot(database.location, backup_path)
+    assert len(stored_objects(backup_path)) == 2  # the settings, the placeholder images share their content
+
+    hashed = list()
+    file_hash = snapshot.file_hash
+    monkeypatch.setattr(snapshot, "file_hash", lambda filepath: hashed.append(filepath) or file_hash(filepath))
+    snapshot.create_snapshot(database.location, backup_path)
+    assert hashed == []
+
+    # the placeholders are hard links of each other, the changed image is replaced instead of written to
+    changed = database.location + Structure.IMAGES_DIR + "image_0000003.png"
+    with open(changed + ".new", "wb") as f:
+        f.write(b"changed content")
+    os.replace(changed + ".new", changed)
+    database.save([], database.get_first_file())
+    latest = snapshot.create_snapshot(database.location, backup_path)
+    assert hashed == [changed] and len(stored_objects(backup_path)) == 3
+    assert len(snapshot.list_snapshots(backup_path)) == 3
+
+    restored = str(tmp_path / "restored")
+    snapshot.restore_snapshot(latest, restored)
+    assert snapshot.data_files(restored) == snapshot.data_files(database.location)
+    with open(restored + Structure.IMAGES_DIR + "image_0000003.png", "rb") as f:
+        assert f.read() == b"changed content"
+    with open(restored + Structure.SETTINGS_FILE) as restored_settings, \
+            open(database.location + Structure.SETTINGS_FILE) as settings:
+        assert restored_settings.read() == settings.read()
+    connection = sqlite3.connect(restored + Structure.DATABASE_DEFAULT_NAME)
+    assert connection.execute("SELECT COUNT(*) FROM annotations").fetchone()[0] == \
+        database.cursor.execute("SELECT COUNT(*) FROM annotations").fetchone()[0]
+    connection.close()
+
+
+def test_snapshot_runs_while_annotations_are_saved(qapp, project_in_use, tmp_path):
+    database = project_in_use
+    finished = threading.Event()
+    results = list()
+    database.sSnapshotFinished.connect(lambda *result: results.append(result) or finished.set())
+    progress = list()
+    database.sSnapshotProgress.connect(lambda done, total, step: progress.append(done))
+
+    assert database.create_snapshot(str(tmp_path / "backup"))
+    assert not database.create_snapshot(str(tmp_path / "backup"))  # one snapshot at a time
+    files = database.prepare_files()
+    while not finished.is_set():
+        for file in files:
+            database.save([], file[2])  # the snapshot does not keep the annotators from saving
+        qapp.processEvents()  # the signals of the snapshot thread are queued for the main thread
+
+    snapshot_path, error = results[0]
+    assert error == "" and progress == list(range(len(files) + 2))  # the database, the files and the settings
+    connection = sqlite3.connect(os.path.join(snapshot_path, "database.db"))
+    assert connection.execute("PRAGMA integrity_check").fetchone()[0] == "ok"
+    connection.close()